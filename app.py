@@ -1,429 +1,814 @@
-import os
-os.environ['STREAMLIT_SERVER_ENABLE_STATIC_FILE_WATCHING'] = 'false'
-
-import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
-import time
-from datetime import datetime
-from utils.detection import detect_ppe
-from utils.alerts import play_alert
-from utils.report import PPE_Reporter
-
-
-
-# Initialize app
-def initialize_app():
-    try:
-        from ultralytics import YOLO
-        import torch
-        model = torch.load("models/best.pt", weights_only=False)
-        if torch.cuda.is_available():
-            model.to('cuda')
-        return model
-    except Exception as e:
-        st.error(f"Model loading failed: {e}")
-        return None
-
-# Load custom CSS
-def cssload():
-    with open("style.css") as f:
-        css = f"<style>{f.read()}</style>"
-        st.markdown(css, unsafe_allow_html=True)
-
-# ============================================
-# 🚀 Main App UI
-# ============================================
-
-
-def main():
-    # Show initial loading animation
-    cssload()
-    # Initialize app
-    model = initialize_app()
-    if model is None:
-        st.error("Failed to initialize PPE detection model")
-        print("🔴 Model loading failed")
-        return
-    print("🟢 Model loaded successfully")
-    
-    # Main header with logo
-    st.markdown("""
-    <div style="display: flex; align-items: center; gap: 15px; margin-bottom: 20px;">
-        <svg xmlns="http://www.w3.org/2000/svg" width="40" height="40" viewBox="0 0 24 24" fill="none" stroke="var(--safety-primary)" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"></path>
-        </svg>
-        <h1 style="color: var(--safety-primary); margin: 0;">SafetyGuard <span style="font-size: 0.8em; color: var(--safety-secondary);">AI</span></h1>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # PPE Compliance Monitoring Card
-    st.markdown("""
-    <div class="card">
-        <h3 style="color: var(--safety-primary); margin-bottom: 15px; display: flex; align-items: center; gap: 10px;">
-            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                <path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"></path>
-            </svg>
-            PPE Compliance Monitoring
-        </h3>
-        <p style="color: #495057;">Advanced detection of essential safety equipment for industrial workers:</p>
-        <div style="display: flex; flex-wrap: wrap; gap: 8px; margin-top: 15px;">
-            <div class="ppe-tag" style="background: #E3F2FD; color: #0D47A1;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
-                    <path d="M2 18v3c0 .6.4 1 1 1h4v-3h3v3h4.5c.3 0 .5-.2.5-.5v-1.5c0-.3-.2-.5-.5-.5H13v-3h-3v3H7v-3H3c-.6 0-1 .4-1 1z"></path>
-                    <path d="M10 10V5c0-1.1.9-2 2-2h1c1.1 0 2 .9 2 2v5"></path>
-                    <path d="M5 12c-1.7 0-3-1.3-3-3v-1a2 2 0 0 1 2-2h3v5H5z"></path>
-                    <path d="M19 12c1.7 0 3-1.3 3-3v-1a2 2 0 0 0-2-2h-3v5h2z"></path>
-                </svg>
-                Hard Hat
-            </div>
-            <div class="ppe-tag" style="background: #E8F5E9; color: #2E7D32;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
-                    <path d="M4 12h8m4 0h4"></path>
-                    <path d="M18 16v4a2 2 0 0 1-2 2H8a2 2 0 0 1-2-2v-4"></path>
-                    <path d="M18 8V4a2 2 0 0 0-2-2h-4"></path>
-                    <path d="M6 8V4a2 2 0 0 1 2-2h4"></path>
-                    <path d="M11 8h2"></path>
-                    <path d="M11 12h2"></path>
-                    <path d="M11 16h2"></path>
-                </svg>
-                Safety Vest
-            </div>
-            <div class="ppe-tag" style="background: #FFEBEE; color: #C62828;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
-                    <path d="M20 17a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2h-3.9a2 2 0 0 1-1.69-.9l-.81-1.2a2 2 0 0 0-1.67-.9H9.6a2 2 0 0 0-1.68.9l-.8 1.2A2 2 0 0 1 6 7H2"></path>
-                    <path d="M3 8v10a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2V8"></path>
-                    <path d="M7 13h10"></path>
-                    <path d="M12 10v4"></path>
-                </svg>
-                Gloves
-            </div>
-            <div class="ppe-tag" style="background: #F3E5F5; color: #7B1FA2;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
-                    <path d="M4 12h16"></path>
-                    <path d="M8 12v8a2 2 0 0 0 2 2h4a2 2 0 0 0 2-2v-8"></path>
-                    <path d="M10 12V5a2 2 0 0 1 2-2h0a2 2 0 0 1 2 2v7"></path>
-                    <path d="M18 12V5a2 2 0 0 0-2-2h0a2 2 0 0 0-2 2v7"></path>
-                </svg>
-                Safety Boots
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Sidebar with settings
-    with st.sidebar:
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 20px;">
-            <h3 style="color: black; display: flex; align-items: center; justify-content: center; gap: 8px;">
-                Settings
-            </h3>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        enable_audio = st.checkbox("🔊 Enable Voice Alerts", value=True)
-
-        st.markdown("""
-        <div style="color: black;">
-            <h4 style="display: flex; align-items: center; gap: 8px;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <circle cx="12" cy="12" r="10"></circle>
-                    <path d="M9.09 9a3 3 0 0 1 5.83 1c0 2-3 3-3 3"></path>
-                    <line x1="12" y1="17" x2="12" y2="17"></line>
-                </svg>
-                About SafetyGuard
-            </h4>
-            <p style="font-size: 0.9rem;">AI-powered workplace safety monitoring system that detects PPE compliance in real-time.</p>
-            <div style="background: rgba(255,255,255,0.1); padding: 10px; border-radius: 8px; margin-top: 10px;">
-                <p style="font-size: 0.9rem; margin-bottom: 4px;"><strong>Version:</strong> 3.0.0</p>
-                <p style="font-size: 0.9rem; margin-bottom: 4px;"><strong>Model:</strong> YOLOv8 (Custom)</p>
-                <p style="font-size: 0.9rem;"><strong>Accuracy:</strong> 94.2% mAP</p>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Main content area
-    tab1, tab2 = st.tabs(["📷 Image Inspection", "🎥 Live Inspection"])
-    
-    with tab1:
-        st.markdown("""
-        <div class="card">
-            <h3 style="color: var(--safety-primary); display: flex; align-items: center; gap: 10px;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <rect x="3" y="3" width="18" height="18" rx="2" ry="2"></rect>
-                    <circle cx="8.5" cy="8.5" r="1.5"></circle>
-                    <polyline points="21 15 16 10 5 21"></polyline>
-                </svg>
-                Upload Worker Photo
-            </h3>
-            <p style="color: #495057;">Analyze PPE compliance from uploaded images of workers</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "png", "jpeg"], 
-                                       help="Upload a clear photo of workers to analyze PPE compliance")
-        
-        if uploaded_file is not None:
-            try:
-                # Custom loading animation
-                with st.spinner(""):
-                    loading_placeholder = st.empty()
-                    loading_placeholder.markdown("""
-                    <div class="loading-container">
-                        <lottie-player src="https://assets1.lottiefiles.com/packages/lf20_5tkzkblw.json" 
-                                     background="transparent" speed="1" style="width: 120px; height: 120px;" loop autoplay>
-                        </lottie-player>
-                        <p style="color: var(--safety-primary); font-weight: 500; margin-top: 15px; text-align: center;">
-                            Analyzing PPE Compliance<br>
-                            <span style="font-size: 0.9rem; color: #6c757d;">Processing image with AI model...</span>
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Process image
-                    image = Image.open(uploaded_file).convert("RGB")
-                    frame = np.array(image)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                    output_frame, missing, detected_items = detect_ppe(model, frame)
-                    output_frame = cv2.cvtColor(output_frame, cv2.COLOR_BGR2RGB)
-                    
-                    # Clear loading animation
-                    loading_placeholder.empty()
-                    
-                    # Display results
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.markdown("#### Original Image")
-                        st.image(image, use_container_width=True, caption="Uploaded Image")
-                    with col2:
-                        st.markdown("#### PPE Detection")
-                        st.image(output_frame, use_container_width=True, caption="AI Analysis Results")
-                    
-                    # Results card
-                    if missing:
-                        st.markdown(f"""
-                        <div class="card pulse" style="border-left: 4px solid var(--safety-accent);">
-                            <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
-                                <lottie-player src="https://assets9.lottiefiles.com/packages/lf20_bujdzzbk.json" 
-                                           background="transparent" speed="1" style="width: 50px; height: 50px;" loop autoplay>
-                                </lottie-player>
-                                <div>
-                                    <h3 style="color: var(--safety-accent); margin: 0;">Safety Violation Detected</h3>
-                                    <p style="color: #495057; font-size: 0.9rem; margin: 0;">{len(missing)} PPE items missing</p>
-                                </div>
-                            </div>
-                            <p style="color: #495057;">Missing safety equipment:</p>
-                            <div style="display: flex; flex-wrap: wrap; gap: 8px; margin-top: 10px;">
-                                {' '.join([f'<div class="ppe-tag" style="background: #FFEBEE; color: var(--safety-accent);">{item.title()}</div>' for item in missing])}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        if enable_audio:
-                            play_alert(f"Safety alert! Missing equipment: {', '.join(missing)}")
-                    else:
-                        st.markdown("""
-                        <div class="card" style="border-left: 4px solid var(--safety-success);">
-                            <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
-                                <lottie-player src="https://assets10.lottiefiles.com/packages/lf20_sk5h1kfn.json" 
-                                           background="transparent" speed="1" style="width: 50px; height: 50px;" loop autoplay>
-                                </lottie-player>
-                                <div>
-                                    <h3 style="color: var(--safety-success); margin: 0;">Full PPE Compliance</h3>
-                                    <p style="color: #495057; font-size: 0.9rem; margin: 0;">All required equipment detected</p>
-                                </div>
-                            </div>
-                            <p style="color: #495057;">Worker is properly equipped with all required safety gear.</p>
-                            <div style="display: flex; flex-wrap: wrap; gap: 8px; margin-top: 10px;">
-                                <div class="ppe-tag" style="background: #E8F5E9; color: var(--safety-success);">
-                                    <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
-                                        <polyline points="20 6 9 17 4 12"></polyline>
-                                    </svg>
-                                    Compliant
-                                </div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        if enable_audio:
-                            play_alert("All safety equipment detected. Good compliance.")
-                    
-                    # Report generation
-                    st.markdown("---")
-                    st.markdown("""
-                    <div class="card">
-                        <h3 style="color: var(--safety-primary); display: flex; align-items: center; gap: 10px;">
-                            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path>
-                                <polyline points="14 2 14 8 20 8"></polyline>
-                                <line x1="16" y1="13" x2="8" y2="13"></line>
-                                <line x1="16" y1="17" x2="8" y2="17"></line>
-                                <polyline points="10 9 9 9 8 9"></polyline>
-                            </svg>
-                            Generate Safety Report
-                        </h3>
-                        <p style="color: #495057;">Document this inspection for your records</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    report_format = st.radio("Select report format:", ["PDF", "HTML"], horizontal=True, 
-                                            help="Choose between PDF (printable) or HTML (interactive) report formats")
-                    
-                    if st.button("📄 Generate Report", key="report_btn"):
-                        with st.spinner(f"Generating {report_format} report..."):
-                            reporter = PPE_Reporter()
-                            report_path, mime_type = reporter.generate_report(
-                                output_frame, 
-                                missing, 
-                                detected_items,
-                                report_format.lower()
-                            )
-                            
-                            with open(report_path, "rb") as f:
-                                btn = st.download_button(
-                                    label=f"⬇️ Download {report_format} Report",
-                                    data=f,
-                                    file_name=f"PPE_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{report_format.lower()}",
-                                    mime=mime_type
-                                )
-                            
-                            os.unlink(report_path)
-                
-            except Exception as e:
-                st.error(f"Error processing image: {str(e)}")
-    
-    with tab2:
-        st.markdown("""
-        <div class="card">
-            <h3 style="color: var(--safety-primary); display: flex; align-items: center; gap: 10px;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <polygon points="23 7 16 12 23 17 23 7"></polygon>
-                    <rect x="1" y="5" width="15" height="14" rx="2" ry="2"></rect>
-                </svg>
-                Live Camera Inspection
-            </h3>
-            <p style="color: #495057;">Real-time PPE monitoring using your webcam</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.info("""
-        **Note:** Live inspection requires camera access. 
-        - Ensure proper lighting for best results
-        - Position worker clearly in frame
-        - System will alert for missing PPE
-        """)
-        
-        if st.button("▶️ Start Live Inspection", key="live_start"):
-            cam = None
-            frame_placeholder = st.empty()
-            stop_button = st.button("⏹️ Stop Inspection")
-            last_alert_time = 0
-            alert_cooldown = 5  # seconds
-            frame_counter = 0
-            processing_frame = False
-            
-            try:
-                # Initialize camera with error handling
-                cam = cv2.VideoCapture(0)
-                if not cam.isOpened():
-                    st.error("Failed to access camera")
-                    return
-                    
-                while not stop_button:
-                    # Skip frames for better performance
-                    frame_counter += 1
-                    if frame_counter % 3 != 0:  # Process every 3rd frame
-                        continue
-                        
-                    # Read frame safely
-                    ret, frame = cam.read()
-                    if not ret:
-                        st.warning("Camera disconnected")
-                        break
-                        
-                    try:
-                        processing_frame = True
-                        
-                        # Process frame with error handling
-                        output_frame, missing, _ = detect_ppe(model, frame)
-                        output_frame = cv2.cvtColor(output_frame, cv2.COLOR_BGR2RGB)
-                        
-                        # Display results
-                        frame_placeholder.image(output_frame, channels="RGB", 
-                                            use_container_width=True,
-                                            caption="Live PPE Detection - Worker View")
-                        
-                        # Handle alerts
-                        current_time = time.time()
-                        if missing:
-                            violation_html = f"""
-                            <div style="background: #FFF3E0; padding: 15px; border-radius: 8px; 
-                                        border-left: 4px solid #FFA000; margin: 10px 0;">
-                                <div style="display: flex; align-items: center; gap: 8px;">
-                                    <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" 
-                                        viewBox="0 0 24 24" fill="none" stroke="#FFA000" 
-                                        stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                        <circle cx="12" cy="12" r="10"></circle>
-                                        <line x1="12" y1="8" x2="12" y2="12"></line>
-                                        <line x1="12" y1="16" x2="12" y2="16"></line>
-                                    </svg>
-                                    <h4 style="color: #FFA000; margin: 0;">Safety Violation Detected</h4>
-                                </div>
-                                <p style="color: #5D4037; margin: 8px 0 0 0;">
-                                    Missing equipment: {', '.join(missing)}
-                                </p>
-                            </div>
-                            """
-                            st.markdown(violation_html, unsafe_allow_html=True)
-                            
-                            if enable_audio and (current_time - last_alert_time) > alert_cooldown:
-                                play_alert_async(f"Warning! Missing safety equipment: {', '.join(missing)}")
-                                last_alert_time = current_time
-                        else:
-                            success_html = """
-                            <div style="background: #E8F5E9; padding: 15px; border-radius: 8px; 
-                                        border-left: 4px solid #4CAF50; margin: 10px 0;">
-                                <div style="display: flex; align-items: center; gap: 8px;">
-                                    <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" 
-                                        viewBox="0 0 24 24" fill="none" stroke="#4CAF50" 
-                                        stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                        <path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path>
-                                        <polyline points="22 4 12 14.01 9 11.01"></polyline>
-                                    </svg>
-                                    <h4 style="color: #4CAF50; margin: 0;">All PPE Detected</h4>
-                                </div>
-                                <p style="color: #2E7D32; margin: 8px 0 0 0;">
-                                    Worker is properly equipped
-                                </p>
-                            </div>
-                            """
-                            st.markdown(success_html, unsafe_allow_html=True)
-                            
-                            if enable_audio and (current_time - last_alert_time) > alert_cooldown:
-                                play_alert_async("All safety equipment detected")
-                                last_alert_time = current_time
-                                
-                        processing_frame = False
-                        
-                    except Exception as e:
-                        st.error(f"Frame processing error: {str(e)}")
-                        processing_frame = False
-                        continue
-                        
-            except Exception as e:
-                st.error(f"Camera error: {str(e)}")
-                
-            finally:
-                # Ensure clean shutdown
-                if cam is not None:
-                    # Wait for current frame to finish processing
-                    while processing_frame:
-                        time.sleep(0.1)
-                        
-                    cam.release()
-                    st.info("Live inspection stopped. Camera resources released.")
-                    
-                # Clear the frame placeholder
-                frame_placeholder.empty()
-
-if __name__ == "__main__":
+import os
+os.environ['STREAMLIT_SERVER_ENABLE_STATIC_FILE_WATCHING'] = 'false'
+
+import streamlit as st
+import cv2
+import numpy as np
+from PIL import Image
+import time
+import zipfile
+from datetime import datetime
+from utils.detection import INPUT_SIZE, detect_ppe, iter_ppe_batches
+from utils.alerts import (
+    camera_messages, camera_violation_message, play_alert, play_alert_async, prerender_alerts,
+    violation_message,
+    ALL_CLEAR_MESSAGE, PRIORITY_ALL_CLEAR, PRIORITY_VIOLATION,
+)
+from utils.report import submit_report, submit_site_report
+from utils.model_registry import get_model
+from utils.backends import DEFAULT_BACKEND, configured_backend
+from utils.cache import result_cache, make_key
+from utils.pipeline import LivePipeline
+from utils.episodes import FRAME_SUBJECT, ViolationEpisodes
+from utils.event_store import get_store
+from utils.streams import StreamManager, parse_source
+from utils.motion import MotionGate
+from utils.quality import QualityController, quality_ladder
+from utils.live_panel import LiveStatusPanel, encode_jpeg
+from utils.worker_pool import get_pool
+from utils.zones import ZoneDetector, load_zones, zones_for
+from utils.evaluation import headline, load_summary
+from utils.inference_client import DEFAULT_SERVER_URL, InferenceClient, InferenceServerError
+from utils import metrics
+
+MODEL_PATH = "models/best.pt"
+CONF_THRESHOLD = 0.5
+
+
+
+# Initialize app
+def initialize_app(backend):
+    try:
+        # Loaded and warmed up once per process, shared across reruns
+        return get_model(MODEL_PATH, backend=backend)
+    except Exception as e:
+        st.error(f"Model loading failed: {e}")
+        return None
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+BULK_BATCH_SIZE = 8
+
+
+def iter_uploaded_images(uploaded_files):
+    """Decode uploaded images and zip archives lazily, yielding (name, BGR frame)"""
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith(".zip"):
+            uploaded.seek(0)
+            with zipfile.ZipFile(uploaded) as archive:
+                for name in sorted(archive.namelist()):
+                    if not name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    data = np.frombuffer(archive.read(name), dtype=np.uint8)
+                    frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                    if frame is not None:
+                        yield name, frame
+        else:
+            data = np.frombuffer(uploaded.getvalue(), dtype=np.uint8)
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield uploaded.name, frame
+
+
+def count_uploaded_images(uploaded_files):
+    """Number of candidate images across uploads (for progress reporting)"""
+    total = 0
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(uploaded) as archive:
+                total += sum(1 for name in archive.namelist() if name.lower().endswith(IMAGE_EXTENSIONS))
+            uploaded.seek(0)
+        else:
+            total += 1
+    return total
+
+
+def bulk_inspection(model, client=None):
+    """Multi-file / zip audit mode; results stream in as each batch finishes"""
+    uploaded_files = st.file_uploader("Choose images or zip archives...", type=["jpg", "png", "jpeg", "zip"],
+                                      accept_multiple_files=True,
+                                      help="Upload many site photos at once, or a zip of photos")
+    if not uploaded_files or not st.button("🔍 Run Bulk Inspection", key="bulk_btn"):
+        return
+
+    names = []
+    total = count_uploaded_images(uploaded_files)
+
+    def frames():
+        for name, frame in iter_uploaded_images(uploaded_files):
+            names.append(name)
+            yield frame
+
+    progress = st.progress(0.0, text="Starting bulk inspection...")
+    summary_placeholder = st.empty()
+    rows = []
+    start = time.time()
+    if client is not None:
+        # Concurrent requests let the server batch them
+        batches = client.iter_batches(frames(), batch_size=BULK_BATCH_SIZE, conf_threshold=CONF_THRESHOLD)
+    else:
+        batches = iter_ppe_batches(model, frames(), batch_size=BULK_BATCH_SIZE, conf_threshold=CONF_THRESHOLD)
+    try:
+        for batch in batches:
+            batch_names = names[len(rows):len(rows) + len(batch)]
+            cols = st.columns(4)
+            for i, (name, (output_frame, missing, detected_items)) in enumerate(zip(batch_names, batch)):
+                rows.append({
+                    "image": name,
+                    "compliant": not missing,
+                    "missing": ", ".join(missing),
+                    "detected": ", ".join(f"{k}×{v}" for k, v in detected_items.items()),
+                })
+                status = "✅ Compliant" if not missing else f"⚠️ Missing: {', '.join(missing)}"
+                cols[i % 4].image(output_frame, channels="BGR", use_container_width=True,
+                                  caption=f"{name} — {status}")
+
+            violations = sum(1 for row in rows if not row["compliant"])
+            elapsed = time.time() - start
+            summary_placeholder.markdown(
+                f"**{len(rows)}** images processed · **{violations}** with violations · "
+                f"{len(rows) / max(elapsed, 1e-6):.1f} images/s"
+            )
+            progress.progress(min(1.0, len(rows) / max(total, 1)), text=f"Processed {len(rows)} of {total} images")
+    except InferenceServerError as e:
+        st.error(f"Inference server error: {e}")
+    except Exception as e:
+        # Images processed so far are kept; the failed batch is not reported as violations
+        st.error(f"Detection failed after {len(rows)} images: {e}")
+
+    progress.empty()
+    if rows:
+        st.dataframe(rows, use_container_width=True)
+    else:
+        st.warning("No readable images found in the upload")
+
+
+def record_result(store, recorder, stream_id, result):
+    """
+    Queue a live result, its episode events and (on a new violation) a snapshot
+
+    Zoned results are recorded per zone - frames, episodes and snapshots
+    alike - so site reports rank zones consistently; the frame is also
+    recorded once as a whole, which is what camera and site totals count.
+    `recorder` is a ViolationEpisodes used only for storage; close it with
+    close_recorder().
+    """
+    ts = result['captured_at']
+    if result.get('zones'):
+        store.record_frame(stream_id, ts, result['missing'], result['counts'], len(result.get('workers') or []))
+    if result.get('zones'):
+        scopes = [(zone_name, zone['missing'], zone['counts'], zone['workers'])
+                  for zone_name, zone in result['zones'].items()]
+    else:
+        scopes = [(None, result['missing'], result['counts'], result.get('workers') or [])]
+    for zone_name, missing, counts, workers in scopes:
+        store.record_frame(stream_id, ts, missing, counts, len(workers), zone=zone_name)
+        events = recorder.update(stream_id, missing, workers, timestamp=ts, zone=zone_name)
+        for event in events:
+            store.record_episode(event)
+        if any(event['type'] == 'start' and event['subject'] == FRAME_SUBJECT for event in events):
+            store.record_snapshot(stream_id, ts, result['frame'], missing, zone=zone_name)
+
+
+def close_recorder(store, recorder):
+    """End the stored episodes still open when inspection stops"""
+    for event in recorder.close_all():
+        store.record_episode(event)
+
+
+def render_metrics(placeholder):
+    """Debug view of stage latencies, rates and queue depths (sidebar)"""
+    if placeholder is None:
+        return
+    snapshot = metrics.registry.snapshot()
+    with placeholder.container():
+        if snapshot['stages']:
+            st.dataframe([
+                {
+                    "stage": row.get('stage', row['metric']) + (f" ({row['stream']})" if 'stream' in row else ""),
+                    "count": row['count'],
+                    "p50 ms": round(row['p50_ms'], 2),
+                    "p95 ms": round(row['p95_ms'], 2),
+                }
+                for row in snapshot['stages']
+            ], use_container_width=True, hide_index=True)
+        else:
+            st.caption("No samples yet")
+        for name, rate in snapshot['rates'].items():
+            st.caption(f"{name}: {rate:.1f} fps")
+        gauges = {**snapshot['counters'], **snapshot['gauges']}
+        if gauges:
+            st.json({name: round(value, 3) if isinstance(value, float) else value for name, value in gauges.items()},
+                    expanded=False)
+
+
+def multi_stream_inspection(model, sources, enable_audio, target_fps=5.0, motion_gating=False,
+                            ui_max_fps=5, jpeg_quality=70, store=None, debug_placeholder=None, pool=None,
+                            zones=None, tiled=False, adaptive=False):
+    """Grid view of several cameras sharing one model (or a worker pool) through the stream manager"""
+    if not st.button("▶️ Start Multi-Camera Inspection", key="multi_start"):
+        return
+
+    stop_button = st.button("⏹️ Stop Inspection", key="multi_stop")
+    manager = StreamManager(model, sources, batch_size=min(len(sources), 16),
+                            target_fps=target_fps, conf_threshold=CONF_THRESHOLD,
+                            motion_gating=motion_gating, pool=pool, zones=zones, tiled=tiled,
+                            adaptive=adaptive)
+    # Debounced per-camera violation episodes; alerts fire on episode start only
+    episodes = ViolationEpisodes()
+    # Stored episodes are tracked per zone for zoned cameras (see record_result)
+    recorder = ViolationEpisodes()
+
+    def on_result(stream_id, result):
+        # Runs on the scheduler thread; only thread-safe state is touched here
+        events = episodes.update(stream_id, result['missing'], result['workers'], timestamp=result['captured_at'])
+        if store is not None:
+            # Non-blocking: rows are queued for the store's writer thread
+            record_result(store, recorder, stream_id, result)
+        # Frame-level starts only: a re-created worker track must not replay the camera's alert
+        if enable_audio and any(event['type'] == 'start' and event['subject'] == FRAME_SUBJECT
+                                for event in events):
+            play_alert(camera_violation_message(stream_id, episodes.active(stream_id)),
+                       PRIORITY_VIOLATION, key=stream_id)
+
+    manager.add_listener(on_result)
+    if enable_audio:
+        # Per-camera alert wording is only known now; cache it before the first violation
+        prerender_alerts(camera_messages([stream.stream_id for stream in manager.streams]))
+    stats_placeholder = st.empty()
+    columns = st.columns(min(len(sources), 4))
+    placeholders = [columns[i % len(columns)].empty() for i in range(len(sources))]
+    rendered = {}
+
+    try:
+        manager.start()
+        while not stop_button and manager.running:
+            for placeholder, (stream_id, result) in zip(placeholders, manager.latest_results().items()):
+                if result is None or rendered.get(stream_id) is result:
+                    continue
+                rendered[stream_id] = result
+                active = episodes.active(stream_id)
+                status = "✅ OK" if not active else f"⚠️ Missing: {', '.join(active)}"
+                placeholder.image(encode_jpeg(result['frame'], jpeg_quality), use_container_width=True,
+                                  caption=f"{stream_id} — {status}")
+            stats = manager.stats()
+            stats_placeholder.caption(
+                f"{len(sources)} streams · {stats['throughput_fps']:.1f} frames/s total · {stats['batches']} batches"
+            )
+            # Bound browser traffic: one grid refresh per UI frame interval
+            render_metrics(debug_placeholder)
+            time.sleep(1.0 / ui_max_fps)
+    finally:
+        manager.stop()
+        episodes.close_all()
+        if store is not None:
+            close_recorder(store, recorder)
+        st.info("Multi-camera inspection stopped. Camera resources released.")
+
+
+def site_report_view(store):
+    """Shift / site compliance reports over the recorded event history"""
+    if store is None:
+        st.info("Enable 'Record events to local database' in the sidebar to build site reports.")
+        return
+
+    today = datetime.now().date()
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("From", today, key="site_from")
+        start_time = st.time_input("Shift start", datetime.min.time(), key="site_start_time")
+    with col2:
+        end_date = st.date_input("To", today, key="site_to")
+        end_time = st.time_input("Shift end", datetime.max.time().replace(microsecond=0), key="site_end_time")
+    cameras = ["All cameras"] + store.streams()
+    camera = st.selectbox("Camera", cameras, key="site_camera")
+    site_format = st.radio("Report format", ["PDF", "HTML"], horizontal=True, key="site_format")
+
+    if st.button("📊 Build Site Report", key="site_report_btn"):
+        start = datetime.combine(start_date, start_time).timestamp()
+        end = datetime.combine(end_date, end_time).timestamp()
+        if end <= start:
+            st.warning("The end of the range must be after its start")
+        else:
+            stream = None if camera == cameras[0] else camera
+            st.session_state["site_report_job"] = (
+                submit_site_report(store, start, end, stream, site_format.lower()), site_format)
+
+    job = st.session_state.get("site_report_job")
+    if job is not None:
+        future, job_format = job
+        if not future.done():
+            st.info(f"Aggregating events for the {job_format} report...")
+            time.sleep(0.2)
+            st.rerun()
+        report_data, mime_type = future.result()
+        st.download_button(
+            label=f"⬇️ Download Site {job_format} Report",
+            data=report_data,
+            file_name=f"Site_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{job_format.lower()}",
+            mime=mime_type,
+            key="site_download",
+        )
+
+
+# Load custom CSS
+def cssload():
+    with open("style.css") as f:
+        css = f"<style>{f.read()}</style>"
+        st.markdown(css, unsafe_allow_html=True)
+
+# ============================================
+# 🚀 Main App UI
+# ============================================
+
+
+def main():
+    # Show initial loading animation
+    cssload()
+    # Initialize app
+    # Sidebar selectbox below writes this key; rerun picks up the new backend
+    backend = st.session_state.get("backend", configured_backend())
+    model = initialize_app(backend)
+    if model is None and backend != DEFAULT_BACKEND:
+        # e.g. ONNX / OpenVINO picked before exporting; keep the app (and the selector) usable
+        st.warning(f"The {backend} backend could not be loaded; using {DEFAULT_BACKEND} instead. "
+                   "Run export_model.py or pick another backend in the sidebar.")
+        backend = DEFAULT_BACKEND
+        model = initialize_app(backend)
+    if model is None:
+        st.error("Failed to initialize PPE detection model")
+        print("🔴 Model loading failed")
+        return
+    print("🟢 Model loaded successfully")
+    # Synthesize standard voice alerts in the background (cached on disk across restarts)
+    if "alerts_prerendered" not in st.session_state:
+        prerender_alerts()
+        st.session_state["alerts_prerendered"] = True
+    
+    # Main header with logo
+    st.markdown("""
+    <div style="display: flex; align-items: center; gap: 15px; margin-bottom: 20px;">
+        <svg xmlns="http://www.w3.org/2000/svg" width="40" height="40" viewBox="0 0 24 24" fill="none" stroke="var(--safety-primary)" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+            <path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"></path>
+        </svg>
+        <h1 style="color: var(--safety-primary); margin: 0;">SafetyGuard <span style="font-size: 0.8em; color: var(--safety-secondary);">AI</span></h1>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # PPE Compliance Monitoring Card
+    st.markdown("""
+    <div class="card">
+        <h3 style="color: var(--safety-primary); margin-bottom: 15px; display: flex; align-items: center; gap: 10px;">
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                <path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"></path>
+            </svg>
+            PPE Compliance Monitoring
+        </h3>
+        <p style="color: #495057;">Advanced detection of essential safety equipment for industrial workers:</p>
+        <div style="display: flex; flex-wrap: wrap; gap: 8px; margin-top: 15px;">
+            <div class="ppe-tag" style="background: #E3F2FD; color: #0D47A1;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
+                    <path d="M2 18v3c0 .6.4 1 1 1h4v-3h3v3h4.5c.3 0 .5-.2.5-.5v-1.5c0-.3-.2-.5-.5-.5H13v-3h-3v3H7v-3H3c-.6 0-1 .4-1 1z"></path>
+                    <path d="M10 10V5c0-1.1.9-2 2-2h1c1.1 0 2 .9 2 2v5"></path>
+                    <path d="M5 12c-1.7 0-3-1.3-3-3v-1a2 2 0 0 1 2-2h3v5H5z"></path>
+                    <path d="M19 12c1.7 0 3-1.3 3-3v-1a2 2 0 0 0-2-2h-3v5h2z"></path>
+                </svg>
+                Hard Hat
+            </div>
+            <div class="ppe-tag" style="background: #E8F5E9; color: #2E7D32;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
+                    <path d="M4 12h8m4 0h4"></path>
+                    <path d="M18 16v4a2 2 0 0 1-2 2H8a2 2 0 0 1-2-2v-4"></path>
+                    <path d="M18 8V4a2 2 0 0 0-2-2h-4"></path>
+                    <path d="M6 8V4a2 2 0 0 1 2-2h4"></path>
+                    <path d="M11 8h2"></path>
+                    <path d="M11 12h2"></path>
+                    <path d="M11 16h2"></path>
+                </svg>
+                Safety Vest
+            </div>
+            <div class="ppe-tag" style="background: #FFEBEE; color: #C62828;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
+                    <path d="M20 17a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2h-3.9a2 2 0 0 1-1.69-.9l-.81-1.2a2 2 0 0 0-1.67-.9H9.6a2 2 0 0 0-1.68.9l-.8 1.2A2 2 0 0 1 6 7H2"></path>
+                    <path d="M3 8v10a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2V8"></path>
+                    <path d="M7 13h10"></path>
+                    <path d="M12 10v4"></path>
+                </svg>
+                Gloves
+            </div>
+            <div class="ppe-tag" style="background: #F3E5F5; color: #7B1FA2;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
+                    <path d="M4 12h16"></path>
+                    <path d="M8 12v8a2 2 0 0 0 2 2h4a2 2 0 0 0 2-2v-8"></path>
+                    <path d="M10 12V5a2 2 0 0 1 2-2h0a2 2 0 0 1 2 2v7"></path>
+                    <path d="M18 12V5a2 2 0 0 0-2-2h0a2 2 0 0 0-2 2v7"></path>
+                </svg>
+                Safety Boots
+            </div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Sidebar with settings
+    with st.sidebar:
+        st.markdown("""
+        <div style="text-align: center; margin-bottom: 20px;">
+            <h3 style="color: black; display: flex; align-items: center; justify-content: center; gap: 8px;">
+                Settings
+            </h3>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        enable_audio = st.checkbox("🔊 Enable Voice Alerts", value=True)
+        backend_options = ["pytorch", "onnx", "onnx-int8", "openvino", "openvino-int8"]
+        st.selectbox("Inference backend", backend_options, key="backend",
+                     index=backend_options.index(backend) if backend in backend_options else 0,
+                     help="ONNX / OpenVINO need models exported with export_model.py")
+        detect_interval = st.slider("Live detection interval (frames)", 1, 10, 3,
+                                    help="Run the full model every N frames and track boxes in between")
+        motion_gating = st.checkbox("Skip static scenes (motion gating)", value=False,
+                                    help="Only run the model when the camera view changes")
+        ui_max_fps = st.slider("Live view refresh rate (fps)", 1, 15, 5,
+                               help="Upper bound on frames pushed to the browser")
+        jpeg_quality = st.slider("Live view JPEG quality", 30, 95, 70)
+        zones_path = st.text_input("Zones of interest (JSON file)", os.environ.get("PPE_ZONES", ""),
+                                   help="Per-camera polygons; only these regions are inferred")
+        zones = {}
+        if zones_path.strip():
+            try:
+                zones = load_zones(zones_path.strip())
+            except (OSError, ValueError, KeyError) as e:
+                st.warning(f"Could not load zones: {e}")
+        tiled = st.checkbox("Tiled inference for high-resolution cameras", value=False,
+                            help="Infer overlapping full-resolution tiles so small items like gloves stay visible")
+        adaptive = st.checkbox("Adaptive quality", value=False,
+                               help="Lower resolution, stride or detection rate automatically to stay real-time")
+        target_fps = st.slider("Target inference rate (fps)", 1, 30, 5, disabled=not adaptive,
+                               help="Per camera; quality is restored when there is headroom")
+        cpu_workers = st.number_input("CPU worker processes (multi-camera)", 0, os.cpu_count() or 1, 0,
+                                      help="0 runs inference in this process; N spreads cameras over N model copies")
+        record_events = st.checkbox("Record events to local database", value=True,
+                                    help="Store live results and violation episodes for reports")
+        store = get_store() if record_events else None
+        inference_url = st.text_input("Inference server URL (optional)", DEFAULT_SERVER_URL,
+                                      help="Send image inspections to inference_server.py instead of the local model")
+        client = InferenceClient(inference_url) if inference_url.strip() else None
+        if store is not None:
+            store_stats = store.stats()
+            st.caption(f"Event store: {store_stats['written']} rows written · {store_stats['dropped']} dropped")
+
+        with st.expander("🛠 Diagnostics"):
+            # Metrics are process-wide (shared by every session), so they are
+            # switched on at startup rather than from a per-session control
+            debug_placeholder = None
+            if metrics.enabled():
+                port = metrics.endpoint_port()
+                if port:
+                    st.caption(f"Prometheus endpoint: http://localhost:{port}/metrics")
+                debug_placeholder = st.empty()
+                render_metrics(debug_placeholder)
+            else:
+                st.caption("Performance metrics are off. Start the app with PPE_METRICS=1 "
+                           "(and PPE_METRICS_PORT=<port> for a Prometheus endpoint) to collect them.")
+
+        cache_stats = result_cache.stats()
+        st.caption(
+            f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"· {cache_stats['bytes'] / 1e6:.1f} MB"
+        )
+
+        # Measured by evaluate.py on a labeled site dataset, if one has been run
+        evaluation = headline(load_summary(), backend, INPUT_SIZE, CONF_THRESHOLD)
+        accuracy = (f"{evaluation['map50']:.1%} mAP@0.5 · {evaluation['latency_ms']:.0f} ms/img "
+                    f"({evaluation['backend']}, {evaluation['input_size']}px)" if evaluation else "Not evaluated")
+        st.markdown(f"""
+        <div style="color: black;">
+            <h4 style="display: flex; align-items: center; gap: 8px;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <circle cx="12" cy="12" r="10"></circle>
+                    <path d="M9.09 9a3 3 0 0 1 5.83 1c0 2-3 3-3 3"></path>
+                    <line x1="12" y1="17" x2="12" y2="17"></line>
+                </svg>
+                About SafetyGuard
+            </h4>
+            <p style="font-size: 0.9rem;">AI-powered workplace safety monitoring system that detects PPE compliance in real-time.</p>
+            <div style="background: rgba(255,255,255,0.1); padding: 10px; border-radius: 8px; margin-top: 10px;">
+                <p style="font-size: 0.9rem; margin-bottom: 4px;"><strong>Version:</strong> 3.0.0</p>
+                <p style="font-size: 0.9rem; margin-bottom: 4px;"><strong>Model:</strong> YOLOv8 (Custom)</p>
+                <p style="font-size: 0.9rem;"><strong>Accuracy:</strong> {accuracy}</p>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Main content area
+    tab1, tab2, tab3 = st.tabs(["📷 Image Inspection", "🎥 Live Inspection", "📊 Site Reports"])
+    
+    with tab1:
+        st.markdown("""
+        <div class="card">
+            <h3 style="color: var(--safety-primary); display: flex; align-items: center; gap: 10px;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <rect x="3" y="3" width="18" height="18" rx="2" ry="2"></rect>
+                    <circle cx="8.5" cy="8.5" r="1.5"></circle>
+                    <polyline points="21 15 16 10 5 21"></polyline>
+                </svg>
+                Upload Worker Photo
+            </h3>
+            <p style="color: #495057;">Analyze PPE compliance from uploaded images of workers</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        inspection_mode = st.radio("Inspection mode:", ["Single Image", "Bulk Upload"], horizontal=True,
+                                   help="Bulk mode accepts many photos or zip archives and batches inference")
+        if inspection_mode == "Bulk Upload":
+            bulk_inspection(model, client)
+            uploaded_file = None
+        else:
+            uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "png", "jpeg"], 
+                                           help="Upload a clear photo of workers to analyze PPE compliance")
+        
+        if uploaded_file is not None:
+            try:
+                # Custom loading animation
+                with st.spinner(""):
+                    loading_placeholder = st.empty()
+                    loading_placeholder.markdown("""
+                    <div class="loading-container">
+                        <lottie-player src="https://assets1.lottiefiles.com/packages/lf20_5tkzkblw.json" 
+                                     background="transparent" speed="1" style="width: 120px; height: 120px;" loop autoplay>
+                        </lottie-player>
+                        <p style="color: var(--safety-primary); font-weight: 500; margin-top: 15px; text-align: center;">
+                            Analyzing PPE Compliance<br>
+                            <span style="font-size: 0.9rem; color: #6c757d;">Processing image with AI model...</span>
+                        </p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Process image (reruns on the same upload hit the cache)
+                    image = Image.open(uploaded_file).convert("RGB")
+                    model_id = client.url if client is not None else f"{MODEL_PATH}:{backend}"
+                    cache_key = make_key(uploaded_file.getvalue(), model_id, CONF_THRESHOLD)
+                    cached = result_cache.get(cache_key)
+                    if cached is None and client is not None:
+                        # Original upload bytes go straight to the server
+                        output_frame, missing, detected_items, workers = client.detect(
+                            cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR), CONF_THRESHOLD,
+                            data=uploaded_file.getvalue())
+                    elif cached is None:
+                        # RGB->BGR swap happens inside the letterbox buffer; output stays BGR.
+                        # Failures raise (shown below) so only real results reach the cache
+                        output_frame, missing, detected_items, workers = detect_ppe(
+                            model, np.asarray(image), CONF_THRESHOLD, return_workers=True, rgb=True,
+                            raise_errors=True)
+                    if cached is None:
+                        output_frame.flags.writeable = False
+                        result_cache.put(cache_key, (output_frame, missing, detected_items, workers))
+                    else:
+                        output_frame, missing, detected_items, workers = cached
+                    
+                    # Clear loading animation
+                    loading_placeholder.empty()
+                    
+                    # Display results
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("#### Original Image")
+                        st.image(image, use_container_width=True, caption="Uploaded Image")
+                    with col2:
+                        st.markdown("#### PPE Detection")
+                        st.image(output_frame, channels="BGR", use_container_width=True, caption="AI Analysis Results")
+                    
+                    # Results card
+                    if missing:
+                        st.markdown(f"""
+                        <div class="card pulse" style="border-left: 4px solid var(--safety-accent);">
+                            <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
+                                <lottie-player src="https://assets9.lottiefiles.com/packages/lf20_bujdzzbk.json" 
+                                           background="transparent" speed="1" style="width: 50px; height: 50px;" loop autoplay>
+                                </lottie-player>
+                                <div>
+                                    <h3 style="color: var(--safety-accent); margin: 0;">Safety Violation Detected</h3>
+                                    <p style="color: #495057; font-size: 0.9rem; margin: 0;">{len(missing)} PPE items missing</p>
+                                </div>
+                            </div>
+                            <p style="color: #495057;">Missing safety equipment:</p>
+                            <div style="display: flex; flex-wrap: wrap; gap: 8px; margin-top: 10px;">
+                                {' '.join([f'<div class="ppe-tag" style="background: #FFEBEE; color: var(--safety-accent);">{item.title()}</div>' for item in missing])}
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        if enable_audio and cached is None:
+                            play_alert(violation_message(missing), PRIORITY_VIOLATION)
+                    else:
+                        st.markdown("""
+                        <div class="card" style="border-left: 4px solid var(--safety-success);">
+                            <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
+                                <lottie-player src="https://assets10.lottiefiles.com/packages/lf20_sk5h1kfn.json" 
+                                           background="transparent" speed="1" style="width: 50px; height: 50px;" loop autoplay>
+                                </lottie-player>
+                                <div>
+                                    <h3 style="color: var(--safety-success); margin: 0;">Full PPE Compliance</h3>
+                                    <p style="color: #495057; font-size: 0.9rem; margin: 0;">All required equipment detected</p>
+                                </div>
+                            </div>
+                            <p style="color: #495057;">Worker is properly equipped with all required safety gear.</p>
+                            <div style="display: flex; flex-wrap: wrap; gap: 8px; margin-top: 10px;">
+                                <div class="ppe-tag" style="background: #E8F5E9; color: var(--safety-success);">
+                                    <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="margin-right: 6px;">
+                                        <polyline points="20 6 9 17 4 12"></polyline>
+                                    </svg>
+                                    Compliant
+                                </div>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        if enable_audio and cached is None:
+                            play_alert(ALL_CLEAR_MESSAGE, PRIORITY_ALL_CLEAR)
+                    
+                    # Per-worker breakdown
+                    if workers:
+                        st.markdown(f"#### Workers Detected: {len(workers)}")
+                        st.dataframe([
+                            {
+                                "worker": i + 1,
+                                "status": "Compliant" if not worker['missing'] else "Violation",
+                                "missing": ", ".join(worker['missing']),
+                            }
+                            for i, worker in enumerate(workers)
+                        ], use_container_width=True, hide_index=True)
+                    
+                    # Report generation
+                    st.markdown("---")
+                    st.markdown("""
+                    <div class="card">
+                        <h3 style="color: var(--safety-primary); display: flex; align-items: center; gap: 10px;">
+                            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                                <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path>
+                                <polyline points="14 2 14 8 20 8"></polyline>
+                                <line x1="16" y1="13" x2="8" y2="13"></line>
+                                <line x1="16" y1="17" x2="8" y2="17"></line>
+                                <polyline points="10 9 9 9 8 9"></polyline>
+                            </svg>
+                            Generate Safety Report
+                        </h3>
+                        <p style="color: #495057;">Document this inspection for your records</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    report_format = st.radio("Select report format:", ["PDF", "HTML"], horizontal=True, 
+                                            help="Choose between PDF (printable) or HTML (interactive) report formats")
+                    
+                    if st.button("📄 Generate Report", key="report_btn"):
+                        # Built in memory on the report pool; this script run doesn't wait for it
+                        st.session_state["report_job"] = (
+                            submit_report(output_frame, missing, detected_items, report_format.lower(), workers),
+                            report_format,
+                            cache_key,
+                        )
+                    
+                    report_job = st.session_state.get("report_job")
+                    # Only offer the report for the image it was generated from
+                    if report_job is not None and report_job[2] == cache_key:
+                        future, job_format, _ = report_job
+                        if not future.done():
+                            st.info(f"Generating {job_format} report...")
+                            time.sleep(0.2)
+                            st.rerun()
+                        report_data, mime_type = future.result()
+                        st.download_button(
+                            label=f"⬇️ Download {job_format} Report",
+                            data=report_data,
+                            file_name=f"PPE_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{job_format.lower()}",
+                            mime=mime_type
+                        )
+                
+            except Exception as e:
+                st.error(f"Error processing image: {str(e)}")
+    
+    with tab2:
+        st.markdown("""
+        <div class="card">
+            <h3 style="color: var(--safety-primary); display: flex; align-items: center; gap: 10px;">
+                <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <polygon points="23 7 16 12 23 17 23 7"></polygon>
+                    <rect x="1" y="5" width="15" height="14" rx="2" ry="2"></rect>
+                </svg>
+                Live Camera Inspection
+            </h3>
+            <p style="color: #495057;">Real-time PPE monitoring using your webcam</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.info("""
+        **Note:** Live inspection requires camera access. 
+        - Ensure proper lighting for best results
+        - Position worker clearly in frame
+        - System will alert for missing PPE
+        """)
+        
+        sources_text = st.text_area("Video sources (one per line)", "0",
+                                    help="Camera index, RTSP URL or local video file. Several lines start multi-camera mode")
+        sources = [line.strip() for line in sources_text.splitlines() if line.strip()] or ["0"]
+        
+        if len(sources) > 1:
+            pool = None
+            if cpu_workers:
+                try:
+                    # Kept warm across reruns and shared with other sessions using the same settings
+                    with st.spinner(f"Starting {cpu_workers} inference workers..."):
+                        pool = get_pool(MODEL_PATH, backend, int(cpu_workers))
+                except RuntimeError as e:
+                    st.warning(f"Worker pool unavailable, using the in-process model: {e}")
+            multi_stream_inspection(model, sources, enable_audio, target_fps=float(target_fps),
+                                    motion_gating=motion_gating, adaptive=adaptive,
+                                    ui_max_fps=ui_max_fps, jpeg_quality=jpeg_quality, store=store,
+                                    debug_placeholder=debug_placeholder, pool=pool, zones=zones, tiled=tiled)
+        elif st.button("▶️ Start Live Inspection", key="live_start"):
+            pipeline = None
+            stop_button = st.button("⏹️ Stop Inspection")
+            panel = LiveStatusPanel(max_fps=ui_max_fps, jpeg_quality=jpeg_quality)
+            quality_placeholder = st.empty()
+            quality_level = None
+            episodes = ViolationEpisodes()
+            recorder = ViolationEpisodes()
+            last_metrics_render = 0.0
+            
+            try:
+                # Capture and inference run on background threads; this loop only renders
+                live_zones = zones_for(zones, "cam0", sources[0])
+                zone_detector = None
+                if live_zones or tiled:
+                    zone_detector = ZoneDetector(model, live_zones, tiled=tiled, conf_threshold=CONF_THRESHOLD)
+                pipeline = LivePipeline(model, source=parse_source(sources[0]), conf_threshold=CONF_THRESHOLD,
+                                        detect_interval=detect_interval,
+                                        motion_gate=MotionGate() if motion_gating else None,
+                                        zone_detector=zone_detector,
+                                        controller=QualityController(
+                                            target_fps=target_fps,
+                                            # Zoned streams are not tracked: no detect_interval levels
+                                            levels=quality_ladder(
+                                                conf_threshold=CONF_THRESHOLD,
+                                                max_detect_interval=1 if zone_detector is not None else 6),
+                                        ) if adaptive else None).start()
+                    
+                while not stop_button:
+                    result = pipeline.get_result(timeout=1.0)
+                    if result is None:
+                        if not pipeline.running:
+                            if pipeline.error:
+                                st.warning(pipeline.error)
+                            break
+                        continue
+                        
+                    try:
+                        # Debounce flicker: UI and alerts follow episodes, not single frames
+                        events = episodes.update("live", result['missing'], result.get('workers'),
+                                                 timestamp=result['captured_at'])
+                        missing = episodes.active("live")
+                        if store is not None:
+                            record_result(store, recorder, "live", result)
+                        
+                        # Display results (placeholders only; page size stays fixed)
+                        panel.update(result['frame'], missing)
+                        if pipeline.controller is not None and pipeline.controller.level != quality_level:
+                            quality_level = pipeline.controller.level
+                            settings = pipeline.controller.settings
+                            quality_placeholder.caption(
+                                f"Adaptive quality level {quality_level}/{len(pipeline.controller.levels) - 1}: "
+                                f"{settings['input_size']}px · detect every {settings['detect_interval']} · "
+                                f"stride {settings['stride']} · conf {settings['conf_threshold']:.2f}")
+                        if debug_placeholder is not None and time.time() - last_metrics_render > 1.0:
+                            render_metrics(debug_placeholder)
+                            last_metrics_render = time.time()
+                        
+                        # Handle alerts (frame-level episodes; worker episodes overlap them)
+                        frame_events = [event for event in events if event['subject'] == FRAME_SUBJECT]
+                        if enable_audio and frame_events:
+                            if missing and any(event['type'] == 'start' for event in frame_events):
+                                play_alert_async(violation_message(missing), PRIORITY_VIOLATION)
+                            elif not missing:
+                                play_alert_async(ALL_CLEAR_MESSAGE, PRIORITY_ALL_CLEAR)
+                        
+                    except Exception as e:
+                        st.error(f"Frame processing error: {str(e)}")
+                        continue
+                        
+            except Exception as e:
+                st.error(f"Camera error: {str(e)}")
+                
+            finally:
+                # Ensure clean shutdown; stop() waits for the in-flight frame
+                if pipeline is not None:
+                    pipeline.stop()
+                    episodes.close_all()
+                    if store is not None:
+                        close_recorder(store, recorder)
+                    st.info("Live inspection stopped. Camera resources released.")
+                    
+                # Clear the live view
+                panel.clear()
+
+    with tab3:
+        site_report_view(store)
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""
+Reproducible CPU benchmarks for the detection, alert and report hot paths
+
+Run with `python -m benchmarks.run --output bench.json`; see benchmarks/run.py.
+"""
@@ -0,0 +1,338 @@
+"""
+Benchmark the detection, alert and report hot paths on CPU
+
+Uses synthetic frames at several resolutions and a stub model by default
+(no weights, no network); pass --model to time a real checkpoint instead.
+Results go to a JSON file, and --compare flags regressions against an
+earlier run.
+
+Example:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --model models/best.pt --compare bench.json
+"""
+import argparse
+import functools
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.stub_model import StubModel
+from utils.detection import (
+    INPUT_SIZE,
+    detect_ppe,
+    detect_ppe_batch,
+    draw_detections,
+    extract_detections,
+    prepare_frame,
+    summarize_detections,
+)
+from utils.preprocess import content_view, unpad_boxes
+
+DEFAULT_RESOLUTIONS = "640x480,1280x720,1920x1080"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the CPU benchmark suite")
+    parser.add_argument("--model", help="Real checkpoint to benchmark (default: stub model)")
+    parser.add_argument("--backend", help="Backend for --model (pytorch, onnx, openvino, ...)")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="Comma-separated WxH list")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed iterations per case")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed iterations per case")
+    parser.add_argument("--batch-sizes", default="1,4,8", help="Batch sizes for throughput")
+    parser.add_argument("--pool-workers", default="",
+                        help="Comma-separated worker counts for the process pool case (e.g. 1,2,4; off by default)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0,
+                        help="Simulated forward-pass cost per image for the stub model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed slowdown of p50 vs the baseline (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def summarize(samples):
+    """Latency stats in milliseconds"""
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        'n': int(ms.size),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'min_ms': round(float(ms.min()), 4),
+    }
+
+
+def timed(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def synthetic_frames(width, height, count, seed):
+    """Noisy frames with a few solid shapes, so JPEG/PNG encoding isn't trivial"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+        for _ in range(6):
+            x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+            w, h = int(rng.integers(20, width // 3)), int(rng.integers(20, height // 3))
+            color = tuple(int(c) for c in rng.integers(60, 255, 3))
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+        frames.append(frame)
+    return frames
+
+
+def bench_detect_stages(model, frames, iterations, warmup):
+    """detect_ppe split into preprocess / predict / post-process / plot"""
+    stages = {'preprocess': [], 'predict': [], 'postprocess': [], 'plot': []}
+    for i in range(warmup + iterations):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        buffer, meta = prepare_frame(frame)
+        t1 = time.perf_counter()
+        results = model.predict(buffer, conf=0.5, imgsz=INPUT_SIZE, verbose=False)
+        t2 = time.perf_counter()
+        boxes, scores, labels = extract_detections(model, results[0])
+        boxes = unpad_boxes(boxes, meta)
+        _, _, workers = summarize_detections(boxes, labels)
+        t3 = time.perf_counter()
+        annotated = content_view(buffer, meta).copy()
+        draw_detections(annotated, boxes, labels, scores, workers=workers, names=model.names)
+        t4 = time.perf_counter()
+        if i >= warmup:
+            for name, elapsed in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                stages[name].append(elapsed)
+
+    output = {name: summarize(samples) for name, samples in stages.items()}
+    cycle = itertools.count()
+    output['total'] = timed(lambda: detect_ppe(model, frames[next(cycle) % len(frames)]), iterations, warmup)
+    return output
+
+
+def bench_batches(model, frames, batch_sizes, iterations, warmup):
+    """Frames per second through detect_ppe_batch"""
+    output = {}
+    rounds = max(1, iterations // 5)
+    for batch_size in batch_sizes:
+        batch = [frames[i % len(frames)] for i in range(batch_size)]
+        stats = timed(lambda: detect_ppe_batch(model, batch, batch_size=batch_size), rounds, min(warmup, 2))
+        stats['fps'] = round(batch_size / (stats['p50_ms'] / 1000.0), 2)
+        output[f"batch_{batch_size}"] = stats
+    return output
+
+
+def bench_reports(frame, iterations, warmup):
+    from utils.report import PPE_Reporter
+
+    reporter = PPE_Reporter()
+    workers = [{'missing': ['gloves'], 'items': {'helmet': 1}}, {'missing': [], 'items': {}}]
+    annotated, missing, counts = frame, ['gloves', 'boots'], {'helmet': 2, 'vest': 2, 'person': 2}
+    rounds = max(1, iterations // 5)
+    return {
+        'pdf': timed(lambda: reporter.generate_report(annotated, missing, counts, 'pdf', workers), rounds, 1),
+        'html': timed(lambda: reporter.generate_report(annotated, missing, counts, 'html', workers), rounds, 1),
+    }
+
+
+def bench_zones(model, frames, iterations, warmup):
+    """Tiled inference over the whole frame vs only a half-frame zone of interest"""
+    from utils.zones import Zone, ZoneDetector
+
+    half = [Zone("left-half", [[0, 0], [0.5, 0], [0.5, 1], [0, 1]])]
+    output = {}
+    rounds = max(1, iterations // 5)
+    for name, detector in (('tiled_full', ZoneDetector(model, tiled=True)),
+                           ('tiled_zone', ZoneDetector(model, half, tiled=True)),
+                           ('zone', ZoneDetector(model, half))):
+        cycle = itertools.count()
+        output[name] = timed(lambda: detector.process(frames[next(cycle) % len(frames)]), rounds, min(warmup, 2))
+        output[name]['inputs_per_frame'] = round(detector.stats()['inputs_per_frame'], 2)
+    return output
+
+
+def bench_pool(frames, worker_counts, iterations, model_path=None, backend=None, stub_latency_ms=0.0):
+    """Aggregate FPS through the shared-memory worker pool, one intra-op thread per worker"""
+    from utils.worker_pool import InferencePool
+
+    output = {}
+    count = max(iterations, 4) * 4
+    for workers in worker_counts:
+        factory = None if model_path else functools.partial(StubModel, per_image_ms=stub_latency_ms)
+        with InferencePool(model_path or "stub", backend, workers=workers, threads_per_worker=1,
+                           model_factory=factory) as pool:
+            list(pool.map(frames[:workers * 2]))
+            start = time.perf_counter()
+            for _ in pool.map(frames[i % len(frames)] for i in range(count)):
+                pass
+            elapsed = time.perf_counter() - start
+        output[f"workers_{workers}"] = {**summarize([elapsed / count]), 'fps': round(count / elapsed, 2)}
+    return output
+
+
+class _FakeChannel:
+    def __init__(self, duration):
+        self.until = time.perf_counter() + duration
+
+    def get_busy(self):
+        return time.perf_counter() < self.until
+
+    def stop(self):
+        self.until = 0.0
+
+
+class _FakeSound:
+    """Records when playback starts; 'plays' for a fixed duration"""
+
+    def __init__(self, starts, duration):
+        self.starts = starts
+        self.duration = duration
+
+    def play(self):
+        self.starts.append(time.perf_counter())
+        return _FakeChannel(self.duration)
+
+
+def bench_alert_queue(iterations):
+    """
+    Submit-to-playback latency of the alert engine with audio output faked
+
+    Synthesis and the mixer are replaced by an in-memory sound, so this times
+    only the queue, coalescing and worker hand-off.
+    """
+    from utils.alerts import PRIORITY_VIOLATION, AlertEngine
+
+    starts = []
+    sound = _FakeSound(starts, duration=0.0)
+    engine = AlertEngine(cache_dir=tempfile.mkdtemp(prefix="ppe-bench-"), sound_loader=lambda message: sound)
+    samples = []
+    for i in range(iterations):
+        done = len(starts)
+        submitted = time.perf_counter()
+        engine.submit(f"alert {i}", PRIORITY_VIOLATION, key="bench")
+        deadline = submitted + 1.0
+        while len(starts) == done and time.perf_counter() < deadline:
+            time.sleep(0.0001)
+        if len(starts) > done:
+            samples.append(starts[done] - submitted)
+        # Let the worker go back to waiting before the next submit
+        engine.wait_idle(timeout=1.0)
+    return summarize(samples or [float('nan')])
+
+
+def environment(model_name):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'model': model_name,
+    }
+
+
+def flatten(results, prefix=""):
+    """{'a': {'b': {'p50_ms': 1}}} -> {'a.b': {...}} for comparisons"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict) and 'p50_ms' in value:
+            flat[prefix + key] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+    return flat
+
+
+def compare(current, baseline, max_regression):
+    """Cases whose p50 got slower than the baseline by more than max_regression"""
+    regressions = []
+    base = flatten(baseline.get('results', {}))
+    for key, stats in flatten(current['results']).items():
+        old = base.get(key)
+        if not old or not old['p50_ms'] or np.isnan(stats['p50_ms']):
+            continue
+        change = stats['p50_ms'] / old['p50_ms'] - 1.0
+        if change > max_regression:
+            regressions.append((key, old['p50_ms'], stats['p50_ms'], change))
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.model:
+        from utils.model_registry import get_model
+        model = get_model(args.model, backend=args.backend)
+        model_name = f"{args.model}:{args.backend or 'default'}"
+    else:
+        model = StubModel(per_image_ms=args.stub_latency_ms)
+        model_name = "stub"
+
+    resolutions = [tuple(int(v) for v in res.lower().split("x")) for res in args.resolutions.split(",")]
+    batch_sizes = [int(v) for v in args.batch_sizes.split(",")]
+    results = {'detect': {}, 'batch': {}}
+    for width, height in resolutions:
+        label = f"{width}x{height}"
+        frames = synthetic_frames(width, height, 8, args.seed)
+        print(f"Benchmarking {label}...", file=sys.stderr)
+        results['detect'][label] = bench_detect_stages(model, frames, args.iterations, args.warmup)
+        results['batch'][label] = bench_batches(model, frames, batch_sizes, args.iterations, args.warmup)
+
+    width, height = resolutions[-1]
+    print(f"Benchmarking zones / tiling at {width}x{height}...", file=sys.stderr)
+    results['zones'] = bench_zones(model, synthetic_frames(width, height, 4, args.seed), args.iterations, args.warmup)
+
+    if args.pool_workers:
+        width, height = resolutions[-1]
+        worker_counts = [int(v) for v in args.pool_workers.split(",")]
+        print(f"Benchmarking worker pool at {width}x{height}...", file=sys.stderr)
+        results['pool'] = bench_pool(synthetic_frames(width, height, 8, args.seed), worker_counts, args.iterations,
+                                     args.model, args.backend, args.stub_latency_ms)
+
+    width, height = resolutions[0]
+    results['report'] = bench_reports(synthetic_frames(width, height, 1, args.seed)[0], args.iterations, args.warmup)
+    results['alert_queue'] = bench_alert_queue(args.iterations)
+
+    output = {'environment': environment(model_name), 'config': vars(args), 'results': results}
+    for key, stats in flatten(results).items():
+        print(f"{key:<40} p50 {stats['p50_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms"
+              + (f"   {stats['fps']:.1f} fps" if 'fps' in stats else ""), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"🟢 Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(output, baseline, args.max_regression)
+        for key, old, new, change in regressions:
+            print(f"🔴 {key}: {old:.3f} -> {new:.3f} ms (+{change:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"🟢 No regressions beyond {args.max_regression:.0%} vs {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
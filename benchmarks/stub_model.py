@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+
+class _Array:
+    """Minimal stand-in for a torch tensor (.cpu().numpy())"""
+
+    def __init__(self, data):
+        self.data = np.asarray(data)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Array(xyxy)
+        self.conf = _Array(conf)
+        self.cls = _Array(cls)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class _Result:
+    def __init__(self, image, xyxy, conf, cls):
+        self.orig_img = image
+        self.boxes = _Boxes(xyxy, conf, cls)
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class StubModel:
+    """
+    Deterministic Ultralytics-shaped model for benchmarking without weights
+
+    Each image gets `workers` person boxes side by side, each wearing a helmet
+    and vest (every other worker also gloves), so post-processing and drawing
+    see a realistic mix of compliant and non-compliant workers.
+    `latency_ms` simulates the forward pass: a fixed cost per call plus
+    `per_image_ms` for every image in the batch.
+    """
+
+    names = {0: 'helmet', 1: 'vest', 2: 'gloves', 3: 'boots', 4: 'person'}
+
+    def __init__(self, workers=3, latency_ms=0.0, per_image_ms=0.0):
+        self.workers = workers
+        self.latency_ms = latency_ms
+        self.per_image_ms = per_image_ms
+        self.calls = 0
+
+    def _detections(self, height, width):
+        rows = []
+        slot = width / max(self.workers, 1)
+        for i in range(self.workers):
+            x0, x1 = i * slot + slot * 0.1, (i + 1) * slot - slot * 0.1
+            y0, y1 = height * 0.1, height * 0.95
+            w, h = x1 - x0, y1 - y0
+            rows.append((x0, y0, x1, y1, 0.9, 4))
+            rows.append((x0 + w * 0.3, y0, x1 - w * 0.3, y0 + h * 0.12, 0.85, 0))
+            rows.append((x0 + w * 0.1, y0 + h * 0.25, x1 - w * 0.1, y0 + h * 0.6, 0.8, 1))
+            if i % 2 == 0:
+                rows.append((x0, y0 + h * 0.55, x0 + w * 0.2, y0 + h * 0.65, 0.7, 2))
+        table = np.array(rows, dtype=np.float32).reshape(-1, 6)
+        return table[:, :4], table[:, 4], table[:, 5]
+
+    def predict(self, source, conf=0.5, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        self.calls += 1
+        delay = self.latency_ms + self.per_image_ms * len(images)
+        if delay:
+            time.sleep(delay / 1000.0)
+        results = []
+        for image in images:
+            xyxy, scores, cls = self._detections(*image.shape[:2])
+            keep = scores >= conf
+            results.append(_Result(image, xyxy[keep], scores[keep], cls[keep]))
+        return results
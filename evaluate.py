@@ -0,0 +1,141 @@
+"""
+Accuracy / speed evaluation on a local YOLO-format labeled dataset
+
+Runs the detector over every image, scores per-class mAP (@0.5 and
+@0.5:0.95) and frame-level compliance precision/recall for the required
+PPE, and sweeps backend, input size, batch size and confidence threshold
+into a latency-vs-accuracy table with the Pareto front marked.
+
+Predictions are cached on disk per model configuration, so re-scoring at
+new thresholds or after editing this script costs no inference. The
+results JSON (default models/evaluation.json) also feeds the accuracy
+figure shown in the app sidebar.
+
+Example:
+    python evaluate.py --data datasets/site --split val --sizes 640,512,416 --confs 0.25,0.5
+    python evaluate.py --data datasets/site --backends pytorch,onnx,onnx-int8 --objective compliance_f1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from utils.evaluation import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_SUMMARY_PATH,
+    PredictionCache,
+    load_class_names,
+    load_dataset,
+    sweep,
+)
+from utils.model_registry import DEFAULT_MODEL_PATH, get_model
+
+OBJECTIVES = ("map50", "map", "compliance_f1", "compliance_recall")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def float_list(value):
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate PPE detection accuracy and speed on a labeled dataset")
+    parser.add_argument("--data", required=True, help="YOLO dataset root (images/ + labels/, data.yaml for names)")
+    parser.add_argument("--split", help="Sub-folder of images/ to use, e.g. val")
+    parser.add_argument("--limit", type=int, help="Only the first N images")
+    parser.add_argument("--weights", default=DEFAULT_MODEL_PATH, help="PyTorch checkpoint")
+    parser.add_argument("--backends", default="pytorch", help="Comma-separated backends to sweep")
+    parser.add_argument("--sizes", type=int_list, default=[640], help="Comma-separated input sizes")
+    parser.add_argument("--batch-sizes", type=int_list, default=[8], help="Comma-separated batch sizes")
+    parser.add_argument("--confs", type=float_list, default=[0.5], help="Comma-separated confidence thresholds")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="map50", help="Accuracy axis of the Pareto front")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="Image loading threads")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Prediction cache folder")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run inference")
+    parser.add_argument("--output", default=DEFAULT_SUMMARY_PATH, help="Results JSON")
+    return parser.parse_args(argv)
+
+
+def format_table(rows, objective):
+    """Plain-text sweep table, fastest first, Pareto rows starred"""
+    header = ["", "backend", "size", "batch", "conf", "ms/img", "fps", "mAP50", "mAP50-95",
+              "comp P", "comp R", "comp F1"]
+    lines = [header]
+    for row in sorted(rows, key=lambda r: (r['latency_ms'], -r[objective])):
+        lines.append([
+            "*" if row['pareto'] else "",
+            row['backend'], str(row['input_size']), str(row['batch_size']), f"{row['conf']:.2f}",
+            f"{row['latency_ms']:.1f}", f"{row['fps']:.1f}", f"{row['map50']:.3f}", f"{row['map']:.3f}",
+            f"{row['compliance_precision']:.3f}", f"{row['compliance_recall']:.3f}", f"{row['compliance_f1']:.3f}",
+        ])
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(line, widths)) for line in lines)
+
+
+def format_classes(classes):
+    """Per-class AP@0.5 with one column per model configuration"""
+    configs = list(classes)
+    names = sorted({name for per_class in classes.values() for name in per_class})
+    lines = [["class", "labels"] + configs]
+    for name in names:
+        first = next(per_class[name] for per_class in classes.values() if name in per_class)
+        lines.append([name, str(first['labels'])] +
+                     [f"{classes[config][name]['ap50']:.3f}" if name in classes[config] else "-" for config in configs])
+    widths = [max(len(line[i]) for line in lines) for i in range(len(lines[0]))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(line, widths)) for line in lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        dataset = load_dataset(args.data, args.split, args.limit)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not dataset:
+        print(f"No images found under {args.data}", file=sys.stderr)
+        return 2
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    names = load_class_names(args.data)
+    if names is None:
+        # No names file: assume label ids follow the model's own class order
+        names = dict(get_model(args.weights, backend=backends[0]).names)
+    cache = None if args.no_cache else PredictionCache(args.cache_dir)
+
+    started = time.time()
+    results = sweep(dataset, names, args.weights, backends, args.sizes, args.batch_sizes, args.confs,
+                    model_loader=lambda weights, backend: get_model(weights, backend=backend),
+                    cache=cache, load_workers=args.workers, objective=args.objective)
+
+    print()
+    print(format_classes(results['classes']))
+    print()
+    print(format_table(results['rows'], args.objective))
+    print(f"\n* Pareto front (latency vs {args.objective})")
+    if cache is not None:
+        print(f"Prediction cache: {cache.hits} hits / {cache.misses} misses ({args.cache_dir})")
+
+    summary = {
+        'dataset': os.path.abspath(args.data),
+        'split': args.split,
+        'images': len(dataset),
+        'weights': args.weights,
+        'objective': args.objective,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        **results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"🟢 Evaluated {len(dataset)} images in {time.time() - started:.1f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Export the PyTorch checkpoint to CPU inference backends
+
+Writes ONNX (models/best.onnx) or OpenVINO IR (models/best_openvino_model/),
+optionally followed by INT8 post-training quantization calibrated on a local
+image folder, then checks the exported model against the PyTorch path.
+
+Example:
+    python export_model.py --format onnx --int8 --calib-dir calib_images/
+    PPE_BACKEND=onnx-int8 streamlit run app.py
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+
+import cv2
+import numpy as np
+
+from utils.backends import BACKENDS, PyTorchBackend, compare_backends
+from utils.detection import INPUT_SIZE
+from utils.model_registry import DEFAULT_MODEL_PATH
+from utils.preprocess import Letterboxer
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export the PPE model to ONNX / OpenVINO")
+    parser.add_argument("--weights", default=DEFAULT_MODEL_PATH, help="PyTorch checkpoint")
+    parser.add_argument("--format", choices=["onnx", "openvino"], required=True)
+    parser.add_argument("--int8", action="store_true", help="Also write an INT8 quantized model")
+    parser.add_argument("--calib-dir", help="Folder of representative images for INT8 calibration")
+    parser.add_argument("--calib-size", type=int, default=200, help="Max calibration images")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the accuracy check against PyTorch")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Max confidence difference on matched boxes")
+    return parser.parse_args(argv)
+
+
+def calibration_images(folder, limit):
+    """Paths of up to `limit` images from the calibration folder"""
+    paths = []
+    for pattern in IMAGE_PATTERNS:
+        paths.extend(glob.glob(os.path.join(folder, "**", pattern), recursive=True))
+    return sorted(paths)[:limit]
+
+
+def iter_calibration_tensors(paths):
+    """Letterboxed NCHW float32 RGB tensors, as the exported graph expects"""
+    letterboxer = Letterboxer(INPUT_SIZE)
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        buffer, _ = letterboxer(frame, square=True)
+        rgb = cv2.cvtColor(buffer, cv2.COLOR_BGR2RGB)
+        yield np.ascontiguousarray(rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def export_fp32(model, fmt):
+    """Ultralytics export with dynamic axes, so rect and batched inputs both work"""
+    return model.export(format=fmt, imgsz=INPUT_SIZE, dynamic=True, simplify=fmt == "onnx")
+
+
+def quantize_onnx(src, dst, paths):
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FolderReader(CalibrationDataReader):
+        def __init__(self):
+            self._tensors = iter_calibration_tensors(paths)
+
+        def get_next(self):
+            tensor = next(self._tensors, None)
+            return None if tensor is None else {"images": tensor}
+
+    quantize_static(src, dst, FolderReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+
+
+def quantize_openvino(src_dir, dst_dir, paths):
+    import nncf
+    import openvino as ov
+
+    xml = glob.glob(os.path.join(src_dir, "*.xml"))[0]
+    core = ov.Core()
+    ov_model = core.read_model(xml)
+    dataset = nncf.Dataset(list(iter_calibration_tensors(paths)))
+    quantized = nncf.quantize(ov_model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(paths))
+
+    os.makedirs(dst_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(dst_dir, os.path.basename(xml)))
+    # Ultralytics reads class names / imgsz from metadata.yaml next to the IR
+    metadata = os.path.join(src_dir, "metadata.yaml")
+    if os.path.exists(metadata):
+        shutil.copy(metadata, dst_dir)
+
+
+def verify(weights, fmt, int8, paths, tolerance):
+    reference = PyTorchBackend(weights)
+    candidate = BACKENDS[fmt](weights, int8)
+    if paths:
+        frames = (cv2.imread(path) for path in paths[:50])
+        frames = (frame for frame in frames if frame is not None)
+    else:
+        rng = np.random.default_rng(0)
+        frames = (rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(8))
+    report = compare_backends(reference, candidate, frames, score_tol=tolerance)
+    label = f"{fmt}{'-int8' if int8 else ''}"
+    status = "🟢 PASS" if report['passed'] else "🔴 FAIL"
+    print(f"{status} {label}: {report['match_rate']:.1%} boxes matched, "
+          f"max score diff {report['max_score_diff']:.3f}, "
+          f"missing-list agreement {report['missing_agreement']:.1%} over {report['images']} images")
+    return report['passed']
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.int8 and not args.calib_dir:
+        print("--int8 needs --calib-dir with representative site images", file=sys.stderr)
+        return 2
+
+    model = PyTorchBackend(args.weights).model
+    fp32_path = BACKENDS[args.format].artifact_path(args.weights)
+    exported = export_fp32(model, args.format)
+    if os.path.abspath(exported) != os.path.abspath(fp32_path):
+        shutil.move(exported, fp32_path)
+    print(f"🟢 Exported {fp32_path}")
+
+    paths = calibration_images(args.calib_dir, args.calib_size) if args.calib_dir else []
+    if args.int8:
+        if not paths:
+            print(f"No images found in {args.calib_dir}", file=sys.stderr)
+            return 2
+        int8_path = BACKENDS[args.format].artifact_path(args.weights, int8=True)
+        if args.format == "onnx":
+            quantize_onnx(fp32_path, int8_path, paths)
+        else:
+            quantize_openvino(fp32_path, int8_path, paths)
+        print(f"🟢 Quantized {int8_path} with {len(paths)} calibration images")
+
+    if args.no_verify:
+        return 0
+    ok = verify(args.weights, args.format, False, paths, args.tolerance)
+    if args.int8:
+        # INT8 is expected to drift a little more than FP32
+        ok = verify(args.weights, args.format, True, paths, args.tolerance * 2) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Headless HTTP inference service around the shared PPE model
+
+Concurrent requests are coalesced into dynamic batches (bounded by
+--max-batch frames and --max-wait-ms) so throughput rises with the number
+of clients instead of serializing on one forward pass per request.
+
+Endpoints:
+    POST /detect   JPEG/PNG bytes as the request body. Query parameters:
+                   conf=<0-1> and annotate=1 (adds a base64 JPEG overlay).
+                   Returns JSON with missing items, counts, workers and
+                   detections (boxes in original image pixels).
+    GET  /health   Model and batching statistics
+
+Example:
+    python inference_server.py --port 8500 --max-batch 8 --max-wait-ms 10
+    curl --data-binary @site.jpg "http://localhost:8500/detect?annotate=1"
+"""
+import argparse
+import base64
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from utils import metrics
+from utils.batching import DynamicBatcher, QueueFull
+from utils.model_registry import DEFAULT_MODEL_PATH, get_model
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+ANNOTATED_JPEG_QUALITY = 80
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve PPE detection over HTTP with dynamic batching")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Model checkpoint")
+    parser.add_argument("--backend", help="pytorch, onnx, openvino (default: PPE_BACKEND)")
+    parser.add_argument("--conf", type=float, default=0.5, help="Default confidence threshold")
+    parser.add_argument("--max-batch", type=int, default=8, help="Largest batch per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="Longest a request waits for others to share its batch")
+    parser.add_argument("--max-queue", type=int, default=256, help="Pending requests before 503s")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request inference timeout (s)")
+    parser.add_argument("--metrics-port", type=int, help="Also serve Prometheus /metrics on this port")
+    return parser.parse_args(argv)
+
+
+def detection_response(output, image_shape, annotate):
+    """JSON body for one batched detection output"""
+    annotated, missing, counts, workers, detections = output
+    body = {
+        'compliant': not missing,
+        'missing': missing,
+        'counts': counts,
+        'workers': workers,
+        'detections': detections,
+        'image_size': [int(image_shape[1]), int(image_shape[0])],
+    }
+    if annotate and annotated is not None:
+        ok, jpeg = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, ANNOTATED_JPEG_QUALITY])
+        if ok:
+            body['annotated'] = base64.b64encode(jpeg.tobytes()).decode("ascii")
+    return body
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    batcher = None
+    model_id = None
+    default_conf = 0.5
+    timeout = 30.0
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self._send_json(404, {'error': "not found"})
+            return
+        self._send_json(200, {'status': "ok", 'model': self.model_id, **self.batcher.stats()})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path != "/detect":
+            self._send_json(404, {'error': "not found"})
+            return
+        params = parse_qs(url.query)
+        try:
+            conf = float(params.get("conf", [self.default_conf])[0])
+        except ValueError:
+            conf = None
+        # `not 0 <= conf` also rejects NaN, which would break batching by threshold
+        if conf is None or not 0.0 <= conf <= 1.0:
+            self._send_json(400, {'error': "conf must be a number between 0 and 1"})
+            return
+        annotate = params.get("annotate", ["0"])[0].lower() in ("1", "true", "yes")
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {'error': "invalid Content-Length"})
+            return
+        if not length:
+            self._send_json(400, {'error': "empty body; send JPEG/PNG bytes"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': f"image larger than {MAX_BODY_BYTES} bytes"})
+            return
+
+        # Decoding and encoding happen on the handler threads; only inference is batched
+        data = np.frombuffer(self.rfile.read(length), dtype=np.uint8)
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is None:
+            self._send_json(400, {'error': "could not decode image"})
+            return
+
+        try:
+            future = self.batcher.submit(frame, conf, render=annotate)
+        except QueueFull as e:
+            self._send_json(503, {'error': str(e)})
+            return
+        try:
+            output = future.result(timeout=self.timeout)
+        except Exception as e:
+            self._send_json(500, {'error': f"inference failed: {e}"})
+            return
+
+        body = detection_response(output, frame.shape, annotate)
+        body['latency_ms'] = round((time.perf_counter() - started) * 1000.0, 2)
+        metrics.tick("ppe_server_requests")
+        self._send_json(200, body)
+
+    def log_message(self, format, *args):
+        # One line per request would swamp the console at camera rates
+        pass
+
+
+class _InferenceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections from bursts of concurrent clients
+    request_queue_size = 128
+
+
+def make_server(batcher, host="0.0.0.0", port=8500, model_id=None, conf=0.5, timeout=30.0):
+    """Threaded HTTP server bound to `batcher` (call serve_forever() to run)"""
+    handler = type("BoundInferenceHandler", (InferenceHandler,), {
+        'batcher': batcher,
+        'model_id': model_id,
+        'default_conf': conf,
+        'timeout': timeout,
+    })
+    server = _InferenceHTTPServer((host, port), handler)
+    return server
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics_port:
+        metrics.enable(args.metrics_port)
+    model = get_model(args.model, backend=args.backend)
+    batcher = DynamicBatcher(model, args.max_batch, args.max_wait_ms, args.max_queue).start()
+    server = make_server(batcher, args.host, args.port, f"{args.model}:{args.backend or 'default'}",
+                         args.conf, args.timeout)
+    print(f"🟢 Serving PPE detection on http://{args.host}:{server.server_address[1]}/detect "
+          f"(batch ≤ {args.max_batch}, wait ≤ {args.max_wait_ms:g} ms)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
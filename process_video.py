@@ -0,0 +1,250 @@
+"""
+Headless PPE audit of recorded video
+
+Streams a video through the detector without the Streamlit UI, writing an
+annotated MP4 and a JSONL line per processed frame as it goes. With
+--episodes, debounced violation episodes (start/end) are written as well.
+With --db, frames and episodes also go to the event store, stamped with
+wall-clock time (--start-time plus the video time) so site reports can
+find them by date.
+
+Example:
+    python process_video.py cctv.mp4 --output audited.mp4 --jsonl audit.jsonl --stride 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import cv2
+
+from utils.detection import detect_ppe, iter_ppe_batches
+from utils.episodes import ViolationEpisodes
+from utils.event_store import EventStore
+from utils.motion import MotionGate
+from utils.model_registry import get_model, DEFAULT_MODEL_PATH
+from utils.tracker import TrackedDetector
+from utils.video import iter_video_frames, video_info
+from utils.worker_pool import InferencePool
+from utils.zones import DEFAULT_TILE_OVERLAP, ZoneDetector, load_zones, zones_for
+
+
+def parse_start_time(value):
+    """Epoch seconds or 'YYYY-MM-DD HH:MM[:SS]' (local time) -> epoch seconds"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Unrecognised time {value!r}; use epoch seconds or 'YYYY-MM-DD HH:MM[:SS]'")
+
+
+def default_start_time(path, info):
+    """Recording start estimated as the file's modification time minus its duration"""
+    duration = info['frame_count'] / info['fps'] if info['frame_count'] > 0 else 0.0
+    return os.path.getmtime(path) - duration
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run PPE detection over a video file")
+    parser.add_argument("input", help="Input video file")
+    parser.add_argument("--output", help="Annotated MP4 output path")
+    parser.add_argument("--jsonl", help="Per-frame JSONL output path (default: stdout)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Model checkpoint")
+    parser.add_argument("--conf", type=float, default=0.5, help="Confidence threshold")
+    parser.add_argument("--stride", type=int, default=1, help="Process every Nth frame")
+    parser.add_argument("--start", type=float, default=0.0, help="Start time in seconds")
+    parser.add_argument("--end", type=float, default=None, help="End time in seconds")
+    parser.add_argument("--batch-size", type=int, default=8, help="Frames per forward pass")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run inference in N worker processes (0: in this process)")
+    parser.add_argument("--detect-interval", type=int, default=1,
+                        help="Run the full model every N processed frames and track in between")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Skip inference on frames with no scene change, reusing the last result")
+    parser.add_argument("--motion-threshold", type=float, default=0.002,
+                        help="Fraction of changed pixels that counts as motion")
+    parser.add_argument("--zones", help="Zones-of-interest JSON; only these regions are inferred")
+    parser.add_argument("--camera", help="Key of this video in the zones file (default: input path, then 'default')")
+    parser.add_argument("--tiled", action="store_true",
+                        help="Infer overlapping full-resolution tiles (better small-item recall on 4K)")
+    parser.add_argument("--tile-size", type=int, default=640, help="Tile edge in source pixels")
+    parser.add_argument("--tile-overlap", type=float, default=DEFAULT_TILE_OVERLAP, help="Tile overlap fraction")
+    parser.add_argument("--episodes", help="Violation episode JSONL output path")
+    parser.add_argument("--db", help="Also record frames and episodes in this SQLite event store")
+    parser.add_argument("--start-time", type=parse_start_time,
+                        help="Wall-clock time of the video's first frame for --db rows "
+                             "(default: file modification time minus the video duration)")
+    parser.add_argument("--min-duration", type=float, default=2.0,
+                        help="Seconds a violation must persist before an episode starts")
+    return parser.parse_args(argv)
+
+
+def iter_results(model, frames, args, gate=None, pool=None, zone_detector=None):
+    """Batched (or worker pool) detection, or sequential detection when zones / tracking / motion gating are on"""
+    # Overlays are only drawn when an annotated video is requested
+    render = bool(args.output)
+    if zone_detector is not None:
+        for frame in frames:
+            yield [gate.run(frame, zone_detector.process) if gate is not None else zone_detector.process(frame)]
+        return
+    if pool is not None:
+        for output in pool.map(frames, args.conf, render=render):
+            yield [output]
+        return
+    if args.detect_interval <= 1 and gate is None:
+        yield from iter_ppe_batches(model, frames, args.batch_size, args.conf, render)
+        return
+
+    if args.detect_interval > 1:
+        detect = TrackedDetector(model, args.detect_interval, conf_threshold=args.conf,
+                                 render=render).process
+    else:
+        def detect(frame):
+            # Errors abort the run instead of being recorded as violations
+            return detect_ppe(model, frame, args.conf, render=render, raise_errors=True)
+    for frame in frames:
+        yield [gate.run(frame, detect) if gate is not None else detect(frame)]
+
+
+def process_video(args):
+    info = video_info(args.input)
+    gate = MotionGate(min_changed_ratio=args.motion_threshold) if args.motion_gate else None
+    zones = zones_for(load_zones(args.zones), args.camera, args.input) if args.zones else []
+    if args.zones and not zones:
+        print(f"No zones for {args.camera or args.input} in {args.zones}; inferring the whole frame",
+              file=sys.stderr)
+    pool = None
+    zone_detector = None
+    if zones or args.tiled:
+        if args.workers > 0 or args.detect_interval > 1:
+            print("--workers / --detect-interval ignored with --zones / --tiled", file=sys.stderr)
+        model = get_model(args.model)
+        zone_detector = ZoneDetector(model, zones, tiled=args.tiled, tile_size=args.tile_size,
+                                     overlap=args.tile_overlap, conf_threshold=args.conf,
+                                     batch_size=args.batch_size, render=bool(args.output))
+    elif args.workers > 0 and args.detect_interval <= 1 and gate is None:
+        # Workers load their own model copies; none is needed in this process
+        pool = InferencePool(args.model, workers=args.workers).start()
+        model = None
+    else:
+        if args.workers > 0:
+            print("--workers ignored with --detect-interval / --motion-gate", file=sys.stderr)
+        model = get_model(args.model)
+    meta = []
+
+    def frames():
+        # Remember index/timestamp so batched results can be matched back
+        for index, timestamp, frame in iter_video_frames(args.input, args.stride, args.start, args.end):
+            meta.append((index, timestamp))
+            yield frame
+
+    jsonl = open(args.jsonl, "w") if args.jsonl else sys.stdout
+    store = EventStore(args.db) if args.db else None
+    # Store rows use wall-clock time; JSONL output keeps the video time
+    clock = 0.0
+    if store is not None:
+        clock = args.start_time if args.start_time is not None else default_start_time(args.input, info)
+    # With zones the store gets per-zone episodes (like its frame rows) from a separate tracker
+    zoned_store = store is not None and zone_detector is not None and bool(zones)
+    zone_episodes = ViolationEpisodes(min_duration=args.min_duration) if zoned_store else None
+    episodes = (ViolationEpisodes(min_duration=args.min_duration)
+                if args.episodes or (store is not None and not zoned_store) else None)
+    episode_log = open(args.episodes, "w") if args.episodes else None
+    episode_count = 0
+    last_time = None
+
+    def store_episode(event):
+        store.record_episode(dict(event, start=event['start'] + clock,
+                                  end=event['end'] + clock if event['end'] is not None else None))
+
+    def write_episode(event):
+        if episode_log is not None:
+            episode_log.write(json.dumps(event) + "\n")
+        if store is not None and not zoned_store:
+            store_episode(event)
+
+    writer = None
+    processed = 0
+    violations = 0
+    started = time.time()
+    try:
+        for batch in iter_results(model, frames(), args, gate, pool, zone_detector):
+            batch_meta = meta[:len(batch)]
+            del meta[:len(batch)]
+            for (index, timestamp), (output_frame, missing, counts) in zip(batch_meta, batch):
+                if args.output:
+                    if writer is None:
+                        height, width = output_frame.shape[:2]
+                        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                        writer = cv2.VideoWriter(args.output, fourcc, info['fps'] / args.stride, (width, height))
+                    writer.write(output_frame)
+
+                jsonl.write(json.dumps({
+                    'frame': index,
+                    'time': round(timestamp, 3),
+                    'missing': missing,
+                    'counts': counts,
+                }) + "\n")
+                processed += 1
+                violations += bool(missing)
+                last_time = timestamp
+                if store is not None:
+                    # One whole-frame row per frame; zoned audits add one per zone for the ranking
+                    store.record_frame(args.input, clock + timestamp, missing, counts)
+                if zoned_store:
+                    for zone_name, zone in zone_detector.last_zones.items():
+                        store.record_frame(args.input, clock + timestamp, zone['missing'], zone['counts'],
+                                           len(zone['workers']), zone=zone_name)
+                        for event in zone_episodes.update(args.input, zone['missing'], zone['workers'],
+                                                          timestamp=timestamp, zone=zone_name):
+                            store_episode(event)
+                if episodes is not None:
+                    for event in episodes.update(args.input, missing, timestamp=timestamp):
+                        write_episode(event)
+                        episode_count += event['type'] == 'start'
+            jsonl.flush()
+        if episodes is not None:
+            for event in episodes.close_all(last_time):
+                write_episode(event)
+        if zone_episodes is not None:
+            for event in zone_episodes.close_all(last_time):
+                store_episode(event)
+    finally:
+        if pool is not None:
+            pool.close()
+        if episode_log is not None:
+            episode_log.close()
+        if store is not None:
+            store.close()
+        if writer is not None:
+            writer.release()
+        if jsonl is not sys.stdout:
+            jsonl.close()
+
+    elapsed = max(time.time() - started, 1e-6)
+    print(f"🟢 Processed {processed} frames in {elapsed:.1f}s ({processed / elapsed:.1f} fps), "
+          f"{violations} with violations", file=sys.stderr)
+    if episodes is not None:
+        print(f"{episode_count} violation episodes", file=sys.stderr)
+    if gate is not None:
+        print(f"Motion gate skipped {gate.stats()['skip_rate']:.0%} of frames", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.stride < 1:
+        print("--stride must be >= 1", file=sys.stderr)
+        return 2
+    process_video(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
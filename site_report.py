@@ -0,0 +1,63 @@
+"""
+Shift / site compliance report from the recorded event store
+
+Aggregates stored frames and violation episodes over a date range (optionally
+one camera) into a PDF or HTML report.
+
+Example:
+    python site_report.py --start "2024-05-01 06:00" --end "2024-05-01 14:00" --output shift.pdf
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from utils.analytics import aggregate_events
+from utils.event_store import DEFAULT_DB_PATH, EventStore
+from utils.report import get_reporter
+
+
+def parse_time(value):
+    """'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM' -> epoch seconds"""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Unrecognised time {value!r}; use 'YYYY-MM-DD[ HH:MM]'")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build an aggregate PPE compliance report")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Event store path")
+    parser.add_argument("--start", type=parse_time, help="Range start (default: first recorded frame)")
+    parser.add_argument("--end", type=parse_time, help="Range end (default: last recorded frame)")
+    parser.add_argument("--stream", help="Only this camera")
+    parser.add_argument("--output", required=True, help="Report path (.pdf or .html)")
+    parser.add_argument("--title", default="Site Compliance Report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report_format = "html" if args.output.lower().endswith((".html", ".htm")) else "pdf"
+    store = EventStore(args.db)
+    started = time.time()
+    try:
+        summary = aggregate_events(store, args.start, args.end, args.stream)
+    finally:
+        store.close()
+    if not summary['frames']:
+        print("No recorded frames in that range", file=sys.stderr)
+        return 1
+
+    data, _ = get_reporter().generate_site_report(summary, report_format, args.title)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"🟢 {args.output}: {summary['frames']} frames, {summary['compliance_rate']:.1%} compliant "
+          f"({time.time() - started:.1f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
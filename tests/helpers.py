@@ -0,0 +1,29 @@
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.stub_model import StubModel
+
+
+class FailingModel(StubModel):
+    """Loads fine, fails every forward pass"""
+
+    def predict(self, source, **kwargs):
+        raise RuntimeError("out of memory")
+
+
+def write_video(path, frames=12, fps=4.0):
+    """Black MJPG clip at 320x240"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (320, 240))
+    for _ in range(frames):
+        writer.write(np.zeros((240, 320, 3), dtype=np.uint8))
+    writer.release()
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll `condition` until it holds or `timeout` passes; returns its last value"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
@@ -0,0 +1,72 @@
+import threading
+
+from tests.helpers import wait_for
+from utils.alerts import (
+    PRIORITY_INFO, PRIORITY_VIOLATION, AlertEngine, camera_messages, camera_violation_message,
+)
+
+
+class Channel:
+    def __init__(self):
+        self.done = threading.Event()
+
+    def get_busy(self):
+        return not self.done.is_set()
+
+    def stop(self):
+        self.done.set()
+
+
+def test_queue_coalesces_and_plays_highest_priority_first(tmp_path):
+    played, channels = [], []
+
+    class Sound:
+        def __init__(self, message):
+            self.message = message
+
+        def play(self):
+            played.append(self.message)
+            channels.append(Channel())
+            return channels[-1]
+
+    engine = AlertEngine(cache_dir=str(tmp_path), sound_loader=Sound)
+    engine.submit("first", PRIORITY_INFO, key="status")
+    assert wait_for(lambda: played == ["first"])
+    assert not engine.wait_idle(timeout=0.1)
+    # "old" is superseded on its key; the violation interrupts "first" and goes next
+    engine.submit("old", PRIORITY_INFO, key="status")
+    engine.submit("new", PRIORITY_INFO, key="status")
+    engine.submit("no helmet", PRIORITY_VIOLATION, key="violation")
+    assert wait_for(lambda: played == ["first", "no helmet"])
+    channels[-1].stop()
+    assert wait_for(lambda: len(played) == 3)
+    channels[-1].stop()
+    assert engine.wait_idle(timeout=2.0)
+    assert played == ["first", "no helmet", "new"]
+    stats = engine.stats()
+    assert stats['coalesced'] == 1 and stats['preempted'] == 1 and stats['played'] == 3
+
+
+def test_camera_messages_cover_every_alert_the_grid_can_play():
+    messages = camera_messages(["cam0", "cam1"])
+    assert len(messages) == 2 * 15
+    assert messages[:2] == ["Camera cam0: missing helmet", "Camera cam1: missing helmet"]
+    assert camera_violation_message("cam1", ["vest", "boots"]) in messages
+
+
+def test_offline_fallback_audio_is_found_in_online_mode(tmp_path):
+    engine = AlertEngine(cache_dir=str(tmp_path), online=True)
+    synthesized = []
+
+    def offline_only(message, path):
+        # What _synthesize writes when gTTS is unreachable
+        synthesized.append(message)
+        path = path[:-len(".mp3")] + ".wav"
+        open(path, "wb").close()
+        return path
+
+    engine._synthesize = offline_only
+    first = engine.audio_path("hello")
+    assert first.endswith(".wav")
+    # The next lookup hits the disk cache instead of trying gTTS again
+    assert engine.audio_path("hello") == first and synthesized == ["hello"]
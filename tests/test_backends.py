@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from benchmarks.stub_model import StubModel
+from utils.backends import compare_backends, parse_backend
+
+FRAMES = [np.zeros((240, 320, 3), dtype=np.uint8)] * 2
+
+
+class ShiftedScores(StubModel):
+    """Same boxes, every confidence 0.03 lower (like a quantized export)"""
+
+    def _detections(self, height, width):
+        xyxy, scores, cls = super()._detections(height, width)
+        return xyxy, scores - 0.03, cls
+
+
+class NoGloves(StubModel):
+    """Drops the gloves boxes (2 of the 11 the 3-worker stub draws)"""
+
+    def _detections(self, height, width):
+        xyxy, scores, cls = super()._detections(height, width)
+        keep = cls != 2
+        return xyxy[keep], scores[keep], cls[keep]
+
+
+@pytest.mark.parametrize("spec, expected", [("onnx-int8", ("onnx", True)), ("OpenVINO", ("openvino", False)),
+                                            (None, ("pytorch", False))])
+def test_parse_backend(spec, expected):
+    assert parse_backend(spec) == expected
+
+
+def test_identical_backends_pass():
+    report = compare_backends(StubModel(), StubModel(), FRAMES)
+    assert report['passed'] and report['match_rate'] == 1.0 and report['max_score_diff'] == 0.0
+    assert report['images'] == 2 and report['missing_agreement'] == 1.0
+
+
+def test_score_tolerance_decides_shifted_scores():
+    assert compare_backends(StubModel(), ShiftedScores(), FRAMES, score_tol=0.05)['passed']
+    report = compare_backends(StubModel(), ShiftedScores(), FRAMES, score_tol=0.02)
+    assert report['match_rate'] == 1.0 and report['max_score_diff'] == pytest.approx(0.03)
+    assert not report['passed']
+
+
+def test_match_rate_decides_dropped_boxes():
+    report = compare_backends(StubModel(), NoGloves(), FRAMES)
+    assert report['match_rate'] == pytest.approx(9 / 11) and not report['passed']
+    assert compare_backends(StubModel(), NoGloves(), FRAMES, min_match_rate=0.8)['passed']
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from benchmarks.stub_model import StubModel
+from tests.helpers import FailingModel
+from utils import metrics
+from utils.detection import REQUIRED_PPE, detect_ppe, detect_ppe_batch
+
+FRAME = np.zeros((240, 320, 3), dtype=np.uint8)
+
+
+def test_batch_detection_propagates_model_errors():
+    with pytest.raises(RuntimeError, match="out of memory"):
+        detect_ppe_batch(FailingModel(), [FRAME, FRAME], batch_size=2)
+
+
+def test_batch_detection_results_line_up_with_frames():
+    outputs = detect_ppe_batch(StubModel(workers=2), [FRAME, None, FRAME], batch_size=3, render=False)
+    assert len(outputs) == 3
+    assert outputs[1] == (None, [], {})
+    assert outputs[0][2]['person'] == 2
+
+
+def test_detect_ppe_fallback_and_raise_errors():
+    _, missing, counts = detect_ppe(FailingModel(), FRAME)
+    assert missing == REQUIRED_PPE and counts == {}
+    with pytest.raises(RuntimeError):
+        detect_ppe(FailingModel(), FRAME, raise_errors=True)
+
+
+def test_per_frame_thresholds_share_one_forward_pass():
+    model = StubModel(workers=2)
+    mixed = detect_ppe_batch(model, [FRAME, FRAME], batch_size=2, conf_threshold=[0.5, 0.82], return_workers=True)
+    assert model.calls == 1
+    # Each frame matches a pass at its own threshold (the stub's vests score 0.8, gloves 0.7)
+    for output, conf in zip(mixed, [0.5, 0.82]):
+        alone = detect_ppe_batch(StubModel(workers=2), [FRAME], conf_threshold=conf, return_workers=True)[0]
+        assert output[1:] == alone[1:] and output[0].shape == alone[0].shape
+    assert mixed[1][1] == ['vest', 'gloves', 'boots']
+
+
+def test_detect_ppe_fallback_counts_an_inference_error(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.registry.reset()
+    detect_ppe(FailingModel(), FRAME)
+    assert metrics.registry.snapshot()['counters'] == {'ppe_inference_errors_total': 1}
+    metrics.registry.reset()
@@ -0,0 +1,67 @@
+from utils.episodes import ViolationEpisodes
+
+
+def feed(episodes, pattern, start=0.0, step=1.0, workers=None):
+    """One frame per character ('x' = helmet missing); returns all events"""
+    events = []
+    for i, flag in enumerate(pattern):
+        events += episodes.update("cam0", ["helmet"] if flag == "x" else [], workers=workers,
+                                  timestamp=start + i * step)
+    return events
+
+
+def test_episode_starts_after_votes_and_min_duration():
+    episodes = ViolationEpisodes(window=5, votes=3, min_duration=2.0)
+    events = feed(episodes, "xxxxxx")
+    # Third frame reaches 3 votes (t=2), then min_duration holds until t=4
+    assert [(e['type'], e['start']) for e in events] == [('start', 2.0)]
+    assert episodes.active("cam0") == ["helmet"]
+
+
+def test_flicker_does_not_end_episode_and_clean_frames_do():
+    episodes = ViolationEpisodes(window=5, votes=3, min_duration=0.0)
+    assert [e['type'] for e in feed(episodes, "xxx")] == ['start']
+    # One clean frame in between keeps the majority
+    assert feed(episodes, "x.x", start=3.0) == []
+    events = feed(episodes, "...", start=6.0)
+    assert [(e['type'], e['end']) for e in events] == [('end', 7.0)]
+    assert episodes.active("cam0") == []
+
+
+def test_violation_within_cooldown_resumes_the_episode():
+    episodes = ViolationEpisodes(window=3, votes=2, min_duration=0.0, cooldown=10.0)
+    first = feed(episodes, "xx..")
+    assert [e['type'] for e in first] == ['start', 'end']
+    # Back within the cooldown: no new start, and the next end keeps the original start
+    assert feed(episodes, "xx", start=5.0) == []
+    events = feed(episodes, "..", start=7.0)
+    assert [(e['type'], e['start']) for e in events] == [('end', first[0]['start'])]
+
+
+def test_close_all_and_worker_subjects():
+    episodes = ViolationEpisodes(window=2, votes=1, min_duration=0.0)
+    workers = [{'id': 7, 'missing': ['vest']}]
+    events = episodes.update("cam0", ["vest"], workers=workers, timestamp=0.0)
+    assert sorted((e['subject'], e['item']) for e in events) == [('frame', 'vest'), ('worker7', 'vest')]
+    closed = episodes.close_all(timestamp=5.0)
+    assert len(closed) == 2 and all(e['type'] == 'end' and e['duration'] == 5.0 for e in closed)
+    assert episodes.open_episodes() == []
+
+
+def test_zones_are_tracked_separately_from_the_stream():
+    episodes = ViolationEpisodes(window=2, votes=1, min_duration=0.0)
+    events = episodes.update("cam0", ["helmet"], timestamp=0.0, zone="bay")
+    assert [(e['stream'], e['zone'], e['item']) for e in events] == [("cam0", "bay", "helmet")]
+    assert episodes.active("cam0", zone="bay") == ["helmet"] and episodes.active("cam0") == []
+    # A clean stream-level frame does not touch the zone's episode
+    assert episodes.update("cam0", [], timestamp=1.0) == []
+    assert episodes.active("cam0", zone="bay") == ["helmet"]
+
+
+def test_episode_start_is_when_votes_were_reached_with_uneven_frame_times():
+    episodes = ViolationEpisodes(window=4, votes=2, min_duration=2.0)
+    events = []
+    for t in (0.0, 0.5, 1.0, 9.0):
+        events += episodes.update("cam0", ["helmet"], timestamp=t)
+    # Votes reached at t=0.5; a gap in frames must not move the start
+    assert [(e['type'], e['start']) for e in events] == [('start', 0.5)]
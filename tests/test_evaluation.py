@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from utils.evaluation import average_precision, evaluate_compliance, match_predictions, pareto_front
+
+WORKER = np.array([[0, 0, 100, 200], [30, 0, 70, 24], [10, 50, 90, 120], [0, 110, 20, 130],
+                   [10, 180, 90, 200]], dtype=np.float32)
+WORKER_LABELS = ['person', 'helmet', 'vest', 'gloves', 'boots']
+
+
+def test_match_predictions_is_greedy_by_score_and_per_threshold():
+    gt = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    # Exact duplicate (low score) and a box with IoU 0.6 (high score)
+    pred = np.array([[0, 0, 10, 10], [0, 0, 10, 6]], dtype=np.float32)
+    scores = np.array([0.5, 0.9], dtype=np.float32)
+    tp = match_predictions(pred, scores, gt, iou_thresholds=(0.5, 0.75))
+    # At 0.5 the higher score takes the label; at 0.75 only the exact box matches
+    assert tp.tolist() == [[False, True], [True, False]]
+    assert match_predictions(pred, scores, np.zeros((0, 4), dtype=np.float32)).sum() == 0
+
+
+def test_average_precision_101_point():
+    tp = np.array([[True], [False], [True]])
+    scores = np.array([0.9, 0.8, 0.7])
+    # Recall 1/3 at precision 1, 2/3 at precision 2/3; the third label is never found
+    assert average_precision(tp, scores, n_gt=3)[0] == pytest.approx((34 * 1.0 + 33 * 2 / 3) / 101)
+    assert average_precision(np.ones((2, 1), dtype=bool), np.array([0.9, 0.8]), n_gt=2)[0] == pytest.approx(1.0)
+    assert average_precision(tp, scores, n_gt=0).tolist() == [0.0]
+
+
+def test_pareto_front():
+    rows = [
+        {'name': 'slow-best', 'latency_ms': 30.0, 'map50': 0.9},
+        {'name': 'dominated', 'latency_ms': 20.0, 'map50': 0.6},
+        {'name': 'fast', 'latency_ms': 10.0, 'map50': 0.7},
+        {'name': 'tie-worse', 'latency_ms': 10.0, 'map50': 0.5},
+    ]
+    front = pareto_front(rows)
+    assert [row['name'] for row in front] == ['fast', 'slow-best']
+    assert [row['pareto'] for row in rows] == [True, False, True, False]
+
+
+def test_compliance_counts_frames_like_the_app():
+    no_helmet = [i for i, label in enumerate(WORKER_LABELS) if label != 'helmet']
+    ground_truth = [(WORKER, WORKER_LABELS), (WORKER[no_helmet], [WORKER_LABELS[i] for i in no_helmet])]
+    scores = np.full(len(WORKER), 0.9, dtype=np.float32)
+    weak_helmet = scores.copy()
+    weak_helmet[1] = 0.3
+    predictions = [(WORKER, weak_helmet, WORKER_LABELS), (WORKER, scores, WORKER_LABELS)]
+    result = evaluate_compliance(predictions, ground_truth, conf_threshold=0.5)
+    # Frame 1: helmet below threshold -> false alarm; frame 2: missed violation
+    assert result['violation'] == {'precision': 0.0, 'recall': 0.0, 'f1': 0.0, 'tp': 0, 'fp': 1, 'fn': 1}
+    assert result['items']['helmet']['fp'] == 1 and result['items']['vest']['fp'] == 0
+    assert evaluate_compliance(predictions, ground_truth, conf_threshold=0.2)['violation']['fp'] == 0
@@ -0,0 +1,68 @@
+import pytest
+
+from utils.analytics import aggregate_events
+from utils.event_store import ROLLUP_SECONDS, EventStore
+
+# A quarter-hour boundary, so offsets below are easy to read
+BASE = 1_700_000_000 - 1_700_000_000 % ROLLUP_SECONDS
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def record(store, start, count, missing=(), step=1.0, stream="cam0"):
+    for i in range(count):
+        store.record_frame(stream, start + i * step, list(missing))
+    store.flush()
+
+
+def test_unaligned_window_counts_every_frame(store):
+    # 100 frames starting 400 s into a rollup period, half missing a helmet
+    record(store, BASE + 400, 50, missing=["helmet"])
+    record(store, BASE + 450, 50)
+
+    report = aggregate_events(store)
+    assert report['frames'] == 100
+    assert store.stream_counters()['cam0']['frames'] == 100
+    assert store.item_summary(BASE + 400, BASE + 500)['helmet']['missing_frames'] == 50
+
+
+def test_window_spanning_periods_uses_exact_edges(store):
+    # One frame per 10 s across three periods
+    record(store, BASE, 3 * ROLLUP_SECONDS // 10, missing=["vest"], step=10.0)
+
+    start, end = BASE + 455, BASE + 2 * ROLLUP_SECONDS + 105
+    expected = sum(1 for i in range(3 * ROLLUP_SECONDS // 10) if start <= BASE + i * 10.0 < end)
+    assert store.item_summary(start, end)['vest']['missing_frames'] == expected
+    assert aggregate_events(store, start, end)['frames'] == expected
+    # Unbounded windows still see everything
+    assert store.item_summary()['vest']['missing_frames'] == 3 * ROLLUP_SECONDS // 10
+
+
+def test_window_inside_one_period(store):
+    record(store, BASE + 100, 20)
+    assert aggregate_events(store, BASE + 105, BASE + 110)['frames'] == 5
+
+
+def test_zoned_camera_counts_each_frame_once(store):
+    # Two zones; "left" is missing a helmet in every frame, so every frame violates
+    for i in range(10):
+        store.record_frame("cam0", BASE + i, ["helmet"], {'vest': 2})
+        store.record_frame("cam0", BASE + i, ["helmet"], {'vest': 1}, zone="left")
+        store.record_frame("cam0", BASE + i, [], {'vest': 1}, zone="right")
+    store.flush()
+
+    counters = store.stream_counters()['cam0']
+    assert counters['frames'] == 10 and counters['compliance_rate'] == 0.0
+    summary = store.item_summary()
+    assert summary['helmet']['missing_frames'] == 10 and summary['vest']['detections'] == 20
+    report = aggregate_events(store)
+    assert report['frames'] == 10 and report['compliance_rate'] == 0.0
+    assert report['items']['helmet']['missing_frames'] == 10
+    ranked = {zone['zone']: zone for zone in report['zones']}
+    assert set(ranked) == {"left", "right"}
+    assert ranked["left"]['violation_frames'] == 10 and ranked["right"]['violation_frames'] == 0
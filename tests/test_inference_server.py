@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.stub_model import StubModel
+from inference_server import MAX_BODY_BYTES, make_server
+from tests.helpers import FailingModel
+from utils.batching import DynamicBatcher
+
+
+@pytest.fixture
+def server():
+    batcher = DynamicBatcher(StubModel(), max_batch=4, max_wait_ms=1.0).start()
+    server = make_server(batcher, host="127.0.0.1", port=0)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    batcher.stop()
+
+
+def post(port, body, length, path="/detect"):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.putrequest("POST", path)
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    connection.send(body)
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+@pytest.mark.parametrize("length, status", [("-5", 400), ("abc", 400), ("0", 400),
+                                            (str(MAX_BODY_BYTES + 1), 413)])
+def test_rejects_bad_content_length(server, length, status):
+    assert post(server, b"", length)[0] == status
+
+
+def test_detect(server):
+    data = cv2.imencode(".jpg", np.zeros((120, 160, 3), dtype=np.uint8))[1].tobytes()
+    status, body = post(server, data, str(len(data)))
+    assert status == 200
+    assert body['counts']['person'] == 3
+
+
+@pytest.mark.parametrize("conf", ["nan", "5", "-0.1", "abc"])
+def test_rejects_conf_out_of_range(server, conf):
+    status, body = post(server, b"x", "1", path=f"/detect?conf={conf}")
+    assert status == 400 and "conf" in body['error']
+
+
+def test_batcher_fails_futures_on_model_error():
+    batcher = DynamicBatcher(FailingModel(), max_batch=2, max_wait_ms=1.0).start()
+    try:
+        future = batcher.submit(np.zeros((240, 320, 3), dtype=np.uint8))
+        with pytest.raises(RuntimeError, match="out of memory"):
+            future.result(timeout=5)
+        assert batcher.stats()['errors'] == 1
+    finally:
+        batcher.stop()
+
+
+def test_annotated_and_plain_requests_share_a_forward_pass():
+    model = StubModel()
+    batcher = DynamicBatcher(model, max_batch=4, max_wait_ms=50.0)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    # Queued before the worker starts, so all three land in one window
+    futures = [batcher.submit(frame, render=render) for render in (True, False, True)]
+    batcher.start()
+    try:
+        outputs = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.stop()
+    assert model.calls == 1 and batcher.stats()['batches'] == 1
+    assert [output[0] is not None for output in outputs] == [True, False, True]
+    assert outputs[0][1:4] == outputs[1][1:4]
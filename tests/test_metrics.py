@@ -0,0 +1,57 @@
+from utils.metrics import Registry
+
+
+def families(text):
+    """TYPE lines per family name"""
+    types = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line.split()[2:4]
+            types.setdefault(name, []).append(kind)
+    return types
+
+
+def test_type_written_once_per_family_across_label_sets():
+    registry = Registry()
+    for stream in ("cam0", "cam1"):
+        registry.observe("ppe_stage_seconds", 0.01, stage="inference", stream=stream)
+        registry.inc("ppe_quality_changes_total", stream=stream)
+        registry.tick("ppe_inference", stream=stream)
+    registry.register_collector("streams", lambda: [
+        ("ppe_frames_read_total", {'stream': "cam0"}, 10),
+        ("ppe_frames_read_total", {'stream': "cam1"}, 12),
+    ])
+    registry.register_collector("quality", lambda: [("ppe_quality_level", {'stream': "cam1"}, 2)])
+    registry.register_collector("quality2", lambda: [("ppe_quality_level", {'stream': "cam0"}, 0)])
+
+    text = registry.render()
+    types = families(text)
+    assert all(len(kinds) == 1 for kinds in types.values()), types
+    assert types['ppe_stage_seconds'] == ["histogram"]
+    assert types['ppe_inference_fps'] == ["gauge"]
+    assert types['ppe_frames_read_total'] == ["counter"]
+    assert text.count("# HELP ppe_stage_seconds") == 1
+
+
+def test_family_samples_are_contiguous():
+    registry = Registry()
+    registry.register_collector("a", lambda: [("ppe_queue_depth", {'stream': "cam0"}, 1)])
+    registry.register_collector("b", lambda: [("ppe_other", {}, 3)])
+    registry.register_collector("c", lambda: [("ppe_queue_depth", {'stream': "cam1"}, 2)])
+
+    lines = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    names = [line.split("{")[0].split()[0] for line in lines]
+    first, last = names.index("ppe_queue_depth"), len(names) - 1 - names[::-1].index("ppe_queue_depth")
+    assert names[first:last + 1] == ["ppe_queue_depth"] * 2
+    assert 'ppe_queue_depth{stream="cam0"} 1' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    for value in (0.0004, 0.003, 0.003, 10.0):
+        registry.observe("ppe_stage_seconds", value, stage="render")
+    text = registry.render()
+    assert 'ppe_stage_seconds_bucket{stage="render",le="0.0005"} 1' in text
+    assert 'ppe_stage_seconds_bucket{stage="render",le="0.005"} 3' in text
+    assert 'ppe_stage_seconds_bucket{stage="render",le="+Inf"} 4' in text
+    assert 'ppe_stage_seconds_count{stage="render"} 4' in text
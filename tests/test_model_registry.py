@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.stub_model import StubModel
+from tests.helpers import FailingModel
+from utils import model_registry
+
+
+def test_broken_model_raises_and_is_not_cached(monkeypatch):
+    monkeypatch.setattr(model_registry, "load_backend", lambda path, backend: FailingModel())
+    model_registry.clear_models()
+    with pytest.raises(RuntimeError, match="out of memory"):
+        model_registry.get_model("broken.pt", backend="pytorch")
+    assert model_registry.loaded_models() == []
+
+    monkeypatch.setattr(model_registry, "load_backend", lambda path, backend: StubModel())
+    model = model_registry.get_model("broken.pt", backend="pytorch")
+    assert model_registry.get_model("broken.pt", backend="pytorch") is model
+    model_registry.clear_models()
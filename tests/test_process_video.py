@@ -0,0 +1,36 @@
+import json
+
+import process_video
+from benchmarks.stub_model import StubModel
+from tests.helpers import write_video
+from utils.analytics import aggregate_events
+from utils.event_store import EventStore
+
+
+def test_zoned_db_rows_episodes_and_frames_share_zones(tmp_path, monkeypatch):
+    monkeypatch.setattr(process_video, "get_model", lambda path, **kwargs: StubModel(workers=2))
+    video = tmp_path / "cam.avi"
+    write_video(video)
+    zones = tmp_path / "zones.json"
+    zones.write_text(json.dumps({"default": [
+        {"name": "left", "polygon": [[0, 0], [0.5, 0], [0.5, 1], [0, 1]]},
+        {"name": "right", "polygon": [[0.5, 0], [1, 0], [1, 1], [0.5, 1]]},
+    ]}))
+    db = tmp_path / "events.db"
+    process_video.main([str(video), "--jsonl", str(tmp_path / "out.jsonl"), "--zones", str(zones),
+                        "--db", str(db), "--start-time", "1700000000", "--min-duration", "0"])
+
+    store = EventStore(str(db))
+    try:
+        report = aggregate_events(store)
+        ranked = {zone['zone']: zone for zone in report['zones']}
+        assert set(ranked) == {"left", "right"}
+        assert all(zone['frames'] == 12 for zone in ranked.values())
+        # Each frame counts once for the camera, not once per zone
+        assert report['frames'] == 12 and store.stream_counters()[str(video)]['frames'] == 12
+        # Episodes are filed under the same zones as the frames, never under the stream
+        episodes = store.zone_episodes()
+        assert episodes and set(episodes) <= set(ranked)
+        assert sum(zone['episodes'] for zone in ranked.values()) == sum(e['episodes'] for e in episodes.values())
+    finally:
+        store.close()
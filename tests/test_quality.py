@@ -0,0 +1,134 @@
+import numpy as np
+
+from benchmarks.stub_model import StubModel
+from tests.helpers import FailingModel, wait_for
+from utils import metrics
+from utils.pipeline import InferenceWorker, LatestSlot
+from utils.quality import QualityController, quality_ladder
+from utils.zones import ZoneDetector
+
+
+def run(controller, seconds, processing_time, start=0.0, step=0.1):
+    """Feed one observation every `step` seconds; returns the end time"""
+    now = start
+    while now < start + seconds:
+        controller.observe(processing_time, now=now)
+        now += step
+    return now
+
+
+def make_controller(**kwargs):
+    return QualityController(target_fps=10, levels=quality_ladder(max_detect_interval=2), interval=1.0,
+                             patience=2, recover_patience=3, cooldown=2.0, **kwargs)
+
+
+def test_ladder_spends_cheapest_knobs_first():
+    levels = quality_ladder(input_sizes=(640, 320), max_detect_interval=2, max_stride=2,
+                            conf_threshold=0.5, max_conf_threshold=0.55)
+    assert [level['detect_interval'] for level in levels] == [1, 2, 2, 2, 2]
+    assert [level['input_size'] for level in levels] == [640, 640, 320, 320, 320]
+    assert [level['stride'] for level in levels] == [1, 1, 1, 2, 2]
+    assert levels[-1]['conf_threshold'] == 0.55
+
+
+def test_steps_down_when_over_budget_and_back_up_with_headroom():
+    controller = make_controller()
+    try:
+        # 0.2 s per frame against a 0.1 s budget
+        now = run(controller, 2.5, 0.2)
+        assert controller.level == 1
+        assert controller.decisions[-1]['reason'] == "over budget"
+        # Cheap again: recovers after recover_patience checks and the cooldown
+        run(controller, 6.0, 0.01, start=now)
+        assert controller.level == 0
+        assert controller.decisions[-1]['reason'] == "headroom"
+    finally:
+        controller.close()
+
+
+def test_failed_upgrade_is_not_retried_immediately():
+    controller = make_controller(start_level=1, retry_after=30.0)
+    try:
+        now = run(controller, 6.0, 0.01)
+        assert controller.level == 0
+        # Level 0 cannot hold the budget: back to 1, and 0 is blocked for a while
+        now = run(controller, 3.5, 0.2, start=now)
+        assert controller.level == 1
+        now = run(controller, 10.0, 0.01, start=now)
+        assert controller.level == 1
+        run(controller, 30.0, 0.01, start=now)
+        assert controller.level == 0
+    finally:
+        controller.close()
+
+
+class RecordingModel(StubModel):
+    def __init__(self):
+        super().__init__(workers=1)
+        self.calls_seen = []
+
+    def predict(self, source, conf=0.5, **kwargs):
+        self.calls_seen.append((conf, kwargs.get('imgsz')))
+        return super().predict(source, conf=conf, **kwargs)
+
+
+def test_zoned_worker_uses_controller_resolution_and_threshold():
+    model = RecordingModel()
+    levels = [{'input_size': 320, 'detect_interval': 1, 'stride': 1, 'conf_threshold': 0.6}]
+    controller = QualityController(target_fps=10, levels=levels)
+    frame_slot, result_slot = LatestSlot(), LatestSlot()
+    worker = InferenceWorker(model, frame_slot, result_slot, zone_detector=ZoneDetector(model, render=False),
+                             controller=controller)
+    worker.start()
+    try:
+        frame_slot.put((0.0, np.zeros((240, 320, 3), dtype=np.uint8)))
+        _, result = result_slot.get(timeout=5.0)
+        assert result is not None
+        assert model.calls_seen == [(0.6, 320)]
+    finally:
+        frame_slot.put(None)
+        worker.join(timeout=2.0)
+        controller.close()
+
+
+def test_resolution_step_keeps_worker_ids():
+    worker = InferenceWorker(StubModel(workers=2), LatestSlot(), LatestSlot())
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    settings = {'input_size': 640, 'detect_interval': 3, 'stride': 1, 'conf_threshold': 0.5}
+    before = worker._adaptive_process(frame, settings)[3]
+    tracker = worker.tracked.tracker
+    after = worker._adaptive_process(frame, dict(settings, input_size=320))[3]
+    # Same tracks, moved into the half-size letterbox, rather than a fresh tracker with new ids
+    assert worker.tracked.input_size == 320 and worker.tracked.tracker is tracker
+    assert [w['id'] for w in after] == [w['id'] for w in before]
+    assert np.allclose([w['box'] for w in after], np.array([w['box'] for w in before]) / 2)
+
+
+def test_every_frame_level_keeps_tracking_worker_ids():
+    worker = InferenceWorker(StubModel(workers=2), LatestSlot(), LatestSlot())
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    tracked = {'input_size': 640, 'detect_interval': 3, 'stride': 1, 'conf_threshold': 0.5}
+    ids = [w['id'] for w in worker._adaptive_process(frame, tracked)[3]]
+    for _ in range(5):
+        before = worker.tracked.detections_run
+        workers = worker._adaptive_process(frame, dict(tracked, detect_interval=1))[3]
+        # Level 0 detects every frame and still labels workers with their track ids
+        assert worker.tracked.detections_run == before + 1
+        assert [w['id'] for w in workers] == ids
+    assert [w['id'] for w in worker._adaptive_process(frame, tracked)[3]] == ids
+
+
+def test_live_worker_errors_are_counted(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.registry.reset()
+    frame_slot, result_slot = LatestSlot(), LatestSlot()
+    worker = InferenceWorker(FailingModel(), frame_slot, result_slot)
+    worker.start()
+    try:
+        frame_slot.put((0.0, np.zeros((240, 320, 3), dtype=np.uint8)))
+        assert wait_for(lambda: metrics.registry.snapshot()['counters'])
+        assert metrics.registry.snapshot()['counters'] == {'ppe_inference_errors_total{stream="live"}': 1}
+    finally:
+        frame_slot.put(None)
+        worker.join(timeout=2.0)
+        metrics.registry.reset()
@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.report import PPE_Reporter
+
+SYSTEM_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+FRAME = np.zeros((120, 160, 3), dtype=np.uint8)
+
+
+def test_pdf_without_font_file_uses_helvetica(tmp_path):
+    reporter = PPE_Reporter(logo_path=str(tmp_path / "none.png"), font_path=str(tmp_path / "none.ttf"))
+    assert reporter.font_family == 'Helvetica'
+    pdf, mime = reporter.generate_report(FRAME, ['helmet'], {'vest': 1})
+    assert pdf.startswith(b"%PDF-") and mime == "application/pdf"
+
+
+@pytest.mark.skipif(not os.path.exists(SYSTEM_FONT), reason="DejaVu Sans not installed")
+def test_cached_font_serves_many_documents(tmp_path):
+    reporter = PPE_Reporter(logo_path=str(tmp_path / "none.png"), font_path=SYSTEM_FONT)
+    first, _ = reporter.generate_report(FRAME, ['helmet'], {'vest': 1})
+    second, _ = reporter.generate_report(FRAME, ['gloves', 'boots'], {'person': 2}, workers=[
+        {'box': [0, 0, 10, 10], 'missing': ['gloves', 'boots']}])
+    for pdf in (first, second):
+        assert pdf.startswith(b"%PDF-")
+        # The font is embedded once per document
+        assert pdf.count(b"/FontFile2") == 1
@@ -0,0 +1,75 @@
+import threading
+
+from benchmarks.stub_model import StubModel
+from tests.helpers import wait_for, write_video
+from utils.streams import StreamManager
+
+
+def make_manager(tmp_path, **kwargs):
+    video = tmp_path / "cam.avi"
+    write_video(video, frames=40, fps=20.0)
+    return StreamManager(StubModel(workers=2), [str(video), str(video)], target_fps=50.0, **kwargs)
+
+
+def test_motion_skips_are_not_counted_as_drops(tmp_path):
+    # A black, static video: after the first frame every frame is a motion skip
+    manager = make_manager(tmp_path, motion_gating=True).start()
+    try:
+        assert wait_for(lambda: all(s['motion_skipped'] for s in manager.stats()['streams'].values()))
+    finally:
+        manager.stop()
+    # Counters are final once every thread has stopped
+    for stream in manager.stats()['streams'].values():
+        assert stream['frames_processed'] >= 1
+        assert stream['frames_dropped'] <= stream['frames_read'] - stream['frames_processed'] - stream['motion_skipped']
+
+
+def test_results_carry_tracked_workers(tmp_path):
+    manager = make_manager(tmp_path)
+    results = {}
+    done = threading.Event()
+
+    def on_result(stream_id, result):
+        results.setdefault(stream_id, []).append(result)
+        if len(results) == 2 and all(len(r) >= 3 for r in results.values()):
+            done.set()
+
+    manager.add_listener(on_result)
+    manager.start()
+    try:
+        assert done.wait(10)
+    finally:
+        manager.stop()
+    for stream_results in results.values():
+        for result in stream_results:
+            assert result['missing'] == ['gloves', 'boots']
+        # Same two workers every frame, so the same two track ids
+        assert {tuple(w['id'] for w in result['workers']) for result in stream_results} == {(1, 2)}
+    assert manager.stats()['errors'] == 0
+
+
+class ClosedPool:
+    """Pool whose submit fails, like one closed under a running manager"""
+
+    def __init__(self):
+        self.calls = 0
+        self.retried = threading.Event()
+
+    def submit(self, frame, conf_threshold=0.5, key=None, **kwargs):
+        self.calls += 1
+        if self.calls > 2:
+            self.retried.set()
+        raise RuntimeError("Inference pool is closed")
+
+
+def test_pool_submit_errors_fail_frames_not_the_scheduler(tmp_path):
+    pool = ClosedPool()
+    manager = make_manager(tmp_path, pool=pool).start()
+    try:
+        # Later submits mean the scheduler survived the first failures
+        assert pool.retried.wait(10)
+        assert manager.running
+    finally:
+        manager.stop()
+    assert manager.stats()['errors'] >= 2
+    assert all(result is None for result in manager.latest_results().values())
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from tests.helpers import FailingModel
+from utils.tracker import IoUTracker, TrackedDetector, assign_worker_ids, iou_matrix
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    assert iou_matrix(a, b)[0].tolist() == [1.0, np.float32(1 / 3), 0.0]
+    assert iou_matrix(a, np.zeros((0, 4), dtype=np.float32)).shape == (1, 0)
+
+
+def test_tracks_keep_ids_follow_velocity_and_expire():
+    tracker = IoUTracker(max_missed=1)
+    box = np.array([[0, 0, 20, 40]], dtype=np.float32)
+    for step in range(4):
+        tracker.predict()
+        tracker.update(box + [step * 4, 0, step * 4, 0], np.array([0.9]), ['person'])
+    assert tracker.ids.tolist() == [1]
+    # Between detections, predict() moves the box along its learned velocity
+    before = tracker.boxes[0, 0]
+    tracker.predict()
+    assert tracker.boxes[0, 0] > before
+    assert tracker.confidence[0] < 0.9
+
+    # Another class at the same place is a new track, never a match
+    tracker.update(tracker.boxes.copy(), np.array([0.8]), ['helmet'])
+    assert tracker.ids.tolist() == [1, 2]
+    assert tracker.active()[0].tolist() == [2]
+    # The person track was missed once (still kept); a second miss drops it
+    tracker.update(np.zeros((0, 4), dtype=np.float32), np.zeros(0), [])
+    assert tracker.ids.tolist() == [2]
+
+
+def test_tracked_detector_raises_model_errors():
+    detector = TrackedDetector(FailingModel(), detect_interval=3)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        detector.process(np.zeros((240, 320, 3), dtype=np.uint8))
+    assert detector.detections_run == 0
+
+
+def test_assign_worker_ids_keeps_ids_across_frames():
+    tracker = IoUTracker()
+    first = assign_worker_ids(tracker, [{'box': [0, 0, 20, 40]}, {'box': [100, 0, 120, 40]}])
+    second = assign_worker_ids(tracker, [{'box': [102, 0, 122, 40]}, {'box': [2, 0, 22, 40]}])
+    assert [w['id'] for w in first] == [1, 2]
+    assert [w['id'] for w in second] == [2, 1]
+    assert assign_worker_ids(tracker, []) == []
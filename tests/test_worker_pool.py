@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from benchmarks.stub_model import StubModel
+from tests.helpers import FailingModel, wait_for
+from utils import worker_pool
+from utils.detection import detect_ppe
+from utils.worker_pool import InferencePool
+
+FRAME = np.zeros((240, 320, 3), dtype=np.uint8)
+
+
+class FakePool:
+    def __init__(self, model_path, backend, workers):
+        self.key = (model_path, backend, workers)
+        self.closed = False
+
+    def start(self):
+        return self
+
+    def close(self):
+        self.closed = True
+
+
+def test_get_pool_shares_one_pool_per_configuration(monkeypatch):
+    monkeypatch.setattr(worker_pool, "InferencePool", FakePool)
+    monkeypatch.setattr(worker_pool, "_pools", {})
+    first = worker_pool.get_pool("a.pt", "pytorch", 2)
+    assert worker_pool.get_pool("a.pt", "pytorch", 2) is first
+    # Another worker count is another pool; the first may still be in use elsewhere
+    second = worker_pool.get_pool("a.pt", "pytorch", 4)
+    assert second is not first and not first.closed
+    other = worker_pool.get_pool("b.pt", "pytorch", 4)
+    worker_pool.close_pools()
+    assert first.closed and second.closed and other.closed
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with InferencePool(workers=2, threads_per_worker=1, slots_per_worker=2, model_factory=StubModel) as pool:
+        yield pool
+
+
+def test_pool_returns_detect_ppe_results_through_shared_memory(pool):
+    annotated, missing, counts, workers = pool.detect(FRAME, return_workers=True)
+    expected = detect_ppe(StubModel(), FRAME, return_workers=True)
+    assert (missing, counts, workers) == expected[1:]
+    # The annotated frame is copied out of the output slot, not a view into it
+    assert annotated.shape == expected[0].shape and annotated.flags.owndata
+    assert pool.detect(FRAME, render=False)[0] is None
+
+
+def test_keys_stick_to_one_worker_and_spread_across_workers(pool):
+    before = list(pool.stats()['completed'])
+    outputs = list(pool.map([FRAME] * 6, key="cam0"))
+    assert len(outputs) == 6
+    pool.detect(FRAME, key="cam1")
+    stats = pool.stats()
+    assert stats['streams']['cam0'] != stats['streams']['cam1']
+    assert stats['completed'][stats['streams']['cam0']] - before[stats['streams']['cam0']] == 6
+
+
+def test_failed_request_fails_its_future_and_frees_its_slot():
+    with InferencePool(workers=1, threads_per_worker=1, slots_per_worker=1, model_factory=FailingModel) as pool:
+        for _ in range(2):
+            # One slot: the second submit only gets it back if the failure released it
+            with pytest.raises(RuntimeError, match="out of memory"):
+                pool.submit(FRAME, timeout=10).result(timeout=10)
+        assert pool.stats()['alive'] == 1 and pool.stats()['in_flight'] == 0
+
+
+def test_dead_worker_is_routed_around(pool):
+    pool.detect(FRAME, key="cam2")
+    dead = pool.stats()['streams']['cam2']
+    pool._workers[dead].process.kill()
+    assert wait_for(lambda: pool.stats()['alive'] == 1)
+    # The stream moves to the surviving worker
+    assert pool.detect(FRAME, key="cam2")[1] == ['gloves', 'boots']
+    assert pool.stats()['streams']['cam2'] != dead
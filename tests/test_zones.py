@@ -0,0 +1,79 @@
+import numpy as np
+
+from benchmarks.stub_model import StubModel
+from utils.detection import REQUIRED_PPE, detect_ppe
+from utils.zones import Zone, ZoneDetector, merge_detections, points_in_polygon
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_points_in_polygon():
+    square = np.array([[0, 0], [10, 0], [10, 10], [0, 10]], dtype=np.float32)
+    points = np.array([[5, 5], [15, 5], [-1, 5], [9.9, 0.1]], dtype=np.float32)
+    assert points_in_polygon(points, square).tolist() == [True, False, False, True]
+    # Concave "L": the notch is outside
+    ell = np.array([[0, 0], [10, 0], [10, 4], [4, 4], [4, 10], [0, 10]], dtype=np.float32)
+    assert points_in_polygon(np.array([[2, 8], [8, 8]], dtype=np.float32), ell).tolist() == [True, False]
+    assert points_in_polygon(np.zeros((0, 2), dtype=np.float32), square).shape == (0,)
+
+
+def test_merge_joins_halves_from_different_tiles():
+    boxes = np.array([[0, 0, 60, 100], [40, 0, 100, 100]], dtype=np.float32)
+    scores = np.array([0.9, 0.8], dtype=np.float32)
+    merged, kept_scores, labels = merge_detections(boxes, scores, ['person', 'person'], threshold=0.3,
+                                                   sources=[0, 1])
+    assert labels == ['person']
+    assert merged.tolist() == [[0, 0, 100, 100]]
+    assert kept_scores.tolist() == [np.float32(0.9)]
+
+
+def test_merge_keeps_overlapping_boxes_from_one_region():
+    # One worker standing behind another: same tile, heavy overlap
+    boxes = np.array([[0, 0, 50, 100], [10, 10, 50, 90]], dtype=np.float32)
+    scores = np.array([0.9, 0.8], dtype=np.float32)
+    merged, _, labels = merge_detections(boxes, scores, ['person', 'person'], sources=[0, 0])
+    assert labels == ['person', 'person']
+    assert len(merged) == 2
+    # Different classes never merge either
+    _, _, labels = merge_detections(boxes, scores, ['person', 'vest'], sources=[0, 1])
+    assert sorted(labels) == ['person', 'vest']
+
+
+def test_zone_missing_items():
+    zones = [Zone("left", [[0, 0], [0.5, 0], [0.5, 1], [0, 1]]),
+             Zone("right", [[0.5, 0], [1, 0], [1, 1], [0.5, 1]])]
+    detector = ZoneDetector(StubModel(), zones, render=False)
+    boxes = np.array([[100, 50, 200, 400], [120, 50, 180, 90]], dtype=np.float32)
+    labels = ['person', 'helmet']
+    workers = [{'box': [100, 50, 200, 400], 'missing': ['vest', 'gloves', 'boots']}]
+    left = detector._zone_summary(zones[0], 480, 640, boxes, labels, workers)
+    assert left['missing'] == ['vest', 'gloves', 'boots'] and left['counts'] == {'person': 1, 'helmet': 1}
+    # Workers elsewhere in the frame: an empty zone has nothing missing
+    assert detector._zone_summary(zones[1], 480, 640, boxes, labels, workers)['missing'] == []
+    # No person detections at all: the frame-level rule on the zone's items
+    items = detector._zone_summary(zones[0], 480, 640, boxes[1:], labels[1:], [])
+    assert items['missing'] == ['vest', 'gloves', 'boots']
+    empty = detector._zone_summary(zones[1], 480, 640, np.zeros((0, 4), dtype=np.float32), [], [])
+    assert empty == {'missing': REQUIRED_PPE, 'counts': {}, 'workers': []}
+
+
+class NoPersonModel(StubModel):
+    names = {0: 'helmet', 1: 'vest', 2: 'gloves', 3: 'boots'}
+
+    def _detections(self, height, width):
+        boxes, scores, classes = super()._detections(height, width)
+        keep = classes != 4
+        return boxes[keep], scores[keep], classes[keep]
+
+
+def test_zoned_frame_without_persons_matches_detect_ppe():
+    model = NoPersonModel(workers=2)
+    whole = [Zone("all", [[0, 0], [1, 0], [1, 1], [0, 1]])]
+    _, missing, _ = ZoneDetector(model, whole, render=False).process(FRAME)
+    assert missing == detect_ppe(model, FRAME, render=False)[1] == ['boots']
+
+
+def test_worker_in_overlapping_zones_is_counted_once():
+    zones = [Zone("a", [[0, 0], [1, 0], [1, 1], [0, 1]]), Zone("b", [[0, 0], [1, 0], [1, 1], [0, 1]])]
+    _, _, _, workers = ZoneDetector(StubModel(workers=2), zones, render=False).process(FRAME, return_workers=True)
+    assert len(workers) == 2
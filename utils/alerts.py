@@ -1,66 +1,302 @@
-import pygame
-from gtts import gTTS
-import tempfile
-import time
-import os
-import threading
-from queue import Queue
-
-# Initialize pygame mixer
-pygame.mixer.init()
-
-alert_queue = Queue()
-
-def _play_alert_safe(message):
-    """Thread-safe audio playback with cleanup"""
-    temp_path = None
-    try:
-        # Try online TTS first
-        tts = gTTS(text=message, lang='en')
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
-            temp_path = f.name
-        tts.save(temp_path)
-        
-        # Wait for file write to complete
-        time.sleep(0.2)
-        
-        pygame.mixer.music.load(temp_path)
-        pygame.mixer.music.play()
-        
-        # Wait for playback to finish
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-            
-    except Exception as e:
-        print(f"Audio error: {e}")
-        # Fallback to offline TTS
-        try:
-            import pyttsx3
-            engine = pyttsx3.init()
-            engine.say(message)
-            engine.runAndWait()
-        except Exception as e:
-            print(f"Offline TTS failed: {e}")
-            
-    finally:
-        # Cleanup temp file
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
-
-def _process_alerts():
-    """Process alert queue in background"""
-    while True:
-        message = alert_queue.get()
-        _play_alert_safe(message)
-        alert_queue.task_done()
-
-# Start alert processor thread
-alert_thread = threading.Thread(target=_process_alerts, daemon=True)
-alert_thread.start()
-
-def play_alert(message):
-    """Public interface for non-blocking alerts"""
-    alert_queue.put(message)
\ No newline at end of file
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils import metrics
+
+# Higher value wins; a new alert pre-empts playback of a lower-priority one
+PRIORITY_ALL_CLEAR = 0
+PRIORITY_INFO = 1
+PRIORITY_VIOLATION = 2
+
+ALL_CLEAR_MESSAGE = "All safety equipment detected"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "safetyguard", "tts")
+
+
+def violation_message(missing):
+    return f"Warning! Missing safety equipment: {', '.join(missing)}"
+
+
+def camera_violation_message(stream_id, missing):
+    return f"Camera {stream_id}: missing {', '.join(missing)}"
+
+
+def camera_messages(stream_ids, items=("helmet", "vest", "gloves", "boots")):
+    """Every multi-camera violation message for these streams, single items first"""
+    return [
+        camera_violation_message(stream_id, list(combo))
+        for size in range(1, len(items) + 1)
+        for combo in itertools.combinations(items, size)
+        for stream_id in stream_ids
+    ]
+
+
+def standard_messages(items=("helmet", "vest", "gloves", "boots")):
+    """Every message the live view can produce, for pre-rendering"""
+    messages = [ALL_CLEAR_MESSAGE]
+    for size in range(1, len(items) + 1):
+        messages.extend(violation_message(list(combo)) for combo in itertools.combinations(items, size))
+    return messages
+
+
+class AlertEngine:
+    """
+    Offline-first voice alerts with cached audio and a coalescing queue
+
+    Each distinct message is synthesized once (pyttsx3 by default, gTTS only
+    when `online=True`) into an LRU disk cache, and decoded sounds are kept
+    in an in-memory LRU, so a repeated alert starts playing almost at once.
+
+    Pending alerts are keyed by channel (`key`): a newer message on the same
+    channel replaces the queued one, identical messages collapse, and the
+    highest priority is played first. A higher-priority alert interrupts a
+    lower-priority one that is already playing.
+
+    `sound_loader(message)` may replace the cached pygame sounds with any
+    object offering play() -> channel (get_busy(), stop()), e.g. to benchmark
+    or test the queue without audio.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=50 * 1024 * 1024,
+                 max_memory_sounds=64, online=False, sound_loader=None):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_sounds = max_memory_sounds
+        self.online = online
+        self.sound_loader = sound_loader
+        self._sounds = OrderedDict()
+        self._pending = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._synth_lock = threading.Lock()
+        self._tts = None
+        self._mixer = None
+        self._playing_priority = None
+        self._channel = None
+        self._thread = None
+        self.played = 0
+        self.coalesced = 0
+        self.preempted = 0
+
+    # -- synthesis / caching -------------------------------------------------
+
+    def _cache_paths(self, message):
+        """Files `message` may be cached in, preferred first (online mode falls back to the offline .wav)"""
+        stem = os.path.join(self.cache_dir, hashlib.sha1(f"{self.online}:{message}".encode("utf-8")).hexdigest())
+        return [stem + ".mp3", stem + ".wav"] if self.online else [stem + ".wav"]
+
+    def _offline_engine(self):
+        if self._tts is None:
+            import pyttsx3
+            self._tts = pyttsx3.init()
+        return self._tts
+
+    def _synthesize(self, message, path):
+        """Render `message` to `path`; returns the path actually written"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._synth_lock:
+            if self.online:
+                try:
+                    from gtts import gTTS
+                    gTTS(text=message, lang='en').save(path + ".part")
+                    os.replace(path + ".part", path)
+                    return path
+                except Exception as e:
+                    print(f"Online TTS failed, using offline voice: {e}")
+                    path = os.path.splitext(path)[0] + ".wav"
+            engine = self._offline_engine()
+            engine.save_to_file(message, path + ".part")
+            engine.runAndWait()
+            os.replace(path + ".part", path)
+            return path
+
+    def _evict_disk(self):
+        """Drop least recently used audio files beyond the disk budget"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+    def audio_path(self, message):
+        """Cached audio file for `message`, synthesizing it on a miss"""
+        paths = self._cache_paths(message)
+        for path in paths:
+            if os.path.exists(path):
+                # mtime doubles as the LRU timestamp
+                os.utime(path)
+                return path
+        path = self._synthesize(message, paths[0])
+        self._evict_disk()
+        return path
+
+    def _init_mixer(self):
+        if self._mixer is None:
+            import pygame
+            pygame.mixer.init()
+            self._mixer = pygame.mixer
+        return self._mixer
+
+    def _sound(self, message):
+        """Decoded sound from the in-memory LRU (loaded from the disk cache on a miss)"""
+        if self.sound_loader is not None:
+            return self.sound_loader(message)
+        sound = self._sounds.get(message)
+        if sound is not None:
+            self._sounds.move_to_end(message)
+            return sound
+        sound = self._init_mixer().Sound(self.audio_path(message))
+        self._sounds[message] = sound
+        if len(self._sounds) > self.max_memory_sounds:
+            self._sounds.popitem(last=False)
+        return sound
+
+    def prerender(self, messages):
+        """Synthesize and cache audio for `messages` in the background"""
+        def work():
+            for message in messages:
+                try:
+                    self.audio_path(message)
+                except Exception as e:
+                    print(f"Alert pre-render failed: {e}")
+                    return
+        threading.Thread(target=work, name="alert-prerender", daemon=True).start()
+
+    # -- queue / playback ----------------------------------------------------
+
+    def submit(self, message, priority=PRIORITY_INFO, key="status"):
+        """Queue an alert without blocking; supersedes pending alerts on the same key"""
+        self._ensure_thread()
+        with self._cond:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                if pending[2] == message:
+                    return
+            self._pending[key] = (priority, next(self._seq), message, time.time())
+            if self._channel is not None and priority > self._playing_priority:
+                self._channel.stop()
+                self._channel = None
+                self.preempted += 1
+            self._cond.notify_all()
+
+    def _next(self):
+        """Highest-priority pending alert (oldest first within a priority)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending)
+            key = max(self._pending, key=lambda k: (self._pending[k][0], -self._pending[k][1]))
+            entry = self._pending.pop(key)
+            # Busy from here on, so wait_idle() does not return before playback
+            self._playing_priority = entry[0]
+            return entry
+
+    def _play(self, priority, message, submitted):
+        try:
+            sound = self._sound(message)
+            with self._cond:
+                self._channel = sound.play()
+                self._playing_priority = priority
+            # Submit-to-audio latency, including any synthesis on a cache miss
+            metrics.observe_stage("alert", time.time() - submitted)
+            while True:
+                with self._cond:
+                    if self._channel is None or not self._channel.get_busy():
+                        break
+                    self._cond.wait(0.05)
+        except Exception as e:
+            print(f"Audio error: {e}")
+            # No audio device / mixer: speak directly
+            try:
+                with self._synth_lock:
+                    engine = self._offline_engine()
+                    engine.say(message)
+                    engine.runAndWait()
+            except Exception as e:
+                print(f"Offline TTS failed: {e}")
+        finally:
+            with self._cond:
+                self._channel = None
+                self._playing_priority = None
+                self.played += 1
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            priority, _, message, submitted = self._next()
+            self._play(priority, message, submitted)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="alert-engine", daemon=True)
+                self._thread.start()
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until nothing is queued or playing
+
+        Returns:
+            bool: False if `timeout` seconds passed first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and self._playing_priority is None, timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._pending),
+                'played': self.played,
+                'coalesced': self.coalesced,
+                'preempted': self.preempted,
+                'memory_sounds': len(self._sounds),
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide alert engine (created on first use)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AlertEngine(online=os.environ.get("PPE_ONLINE_TTS") == "1")
+                metrics.register_collector("alerts", lambda: [
+                    (f"ppe_alerts_{name}", {}, value) for name, value in _engine.stats().items()
+                ])
+    return _engine
+
+
+def play_alert(message, priority=PRIORITY_INFO, key="status"):
+    """Public interface for non-blocking alerts"""
+    get_engine().submit(message, priority, key)
+
+
+# Name used by the live view; same non-blocking behaviour
+play_alert_async = play_alert
+
+
+def prerender_alerts(messages=None):
+    """Warm the audio cache so first alerts play without synthesis delay"""
+    get_engine().prerender(messages or standard_messages())
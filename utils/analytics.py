@@ -0,0 +1,137 @@
+import numpy as np
+
+from utils.detection import REQUIRED_PPE
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def pick_bucket(span):
+    """Timeline resolution for a report span: hourly up to two days, else daily"""
+    return HOUR if span <= 2 * DAY else DAY
+
+
+def _zone_codes(zone_index, chunk):
+    """Integer code per row for its zone (the stream when no zone is set)"""
+    zones = np.where(chunk['zone'] == None, chunk['stream'], chunk['zone'])  # noqa: E711
+    names, inverse = np.unique(zones.astype(str), return_inverse=True)
+    mapping = np.array([zone_index.setdefault(name, len(zone_index)) for name in names], dtype=np.int64)
+    return mapping[inverse]
+
+
+def aggregate_events(store, start=None, end=None, stream=None, bucket_seconds=None, chunk_size=50000,
+                     top_zones=10, snapshots=6):
+    """
+    Compliance aggregates for a shift / site / camera / date range
+
+    Streams the store's quarter-hour frame rollup chunk by chunk and
+    accumulates it with bincount, so memory stays flat however long the
+    range is. Totals, items and the timeline count whole-frame rows only;
+    zoned cameras' per-zone rows feed the zone ranking, where they replace
+    that camera's whole-frame entry.
+
+    Args:
+        store: EventStore
+        start, end: Range in epoch seconds (default: all stored frames)
+        stream: Restrict to one camera
+        bucket_seconds: Timeline resolution (default: hourly / daily by span)
+        top_zones: Number of worst zones to rank
+        snapshots: Max snapshot thumbnails (one per top zone)
+
+    Returns:
+        dict: totals, per-item compliance, 'timeline', 'zones' and 'snapshots'
+    """
+    if start is None or end is None:
+        first, last = store.time_range(stream)
+        start = first if start is None else start
+        end = (last + 1e-3 if last is not None else None) if end is None else end
+    if start is None or end is None:
+        start = end = 0.0
+    bucket_seconds = bucket_seconds or pick_bucket(end - start)
+    n_buckets = max(1, int(np.ceil((end - start) / bucket_seconds)))
+    n_items = len(REQUIRED_PPE)
+    bits = np.arange(n_items, dtype=np.int64)
+
+    frames_per_bucket = np.zeros(n_buckets, dtype=np.int64)
+    violations_per_bucket = np.zeros(n_buckets, dtype=np.int64)
+    missing_per_bucket = np.zeros((n_items, n_buckets), dtype=np.int64)
+    zone_index = {}
+    zone_frames = np.zeros(0, dtype=np.int64)
+    zone_violations = np.zeros(0, dtype=np.int64)
+    zoned_streams = set()
+
+    for chunk in store.iter_frame_groups(start, end, stream, bucket_seconds, chunk_size):
+        bucket = np.clip(chunk['bucket'], 0, n_buckets - 1)
+        count = chunk['count']
+        violating = np.where(chunk['mask'] != 0, count, 0)
+        whole_frame = chunk['zone'] == None  # noqa: E711
+        zoned_streams.update(chunk['stream'][~whole_frame].tolist())
+        # Zone rows repeat their camera's frames; only whole-frame rows count towards totals
+        frame_count = np.where(whole_frame, count, 0)
+        frames_per_bucket += np.bincount(bucket, frame_count, n_buckets).astype(np.int64)
+        violations_per_bucket += np.bincount(bucket, np.where(whole_frame, violating, 0), n_buckets).astype(np.int64)
+        # (K, rows) 0/1 per missing item, weighted by the group's frame count
+        missing = ((chunk['mask'][None, :] >> bits[:, None]) & 1) * frame_count[None, :]
+        for k in range(n_items):
+            missing_per_bucket[k] += np.bincount(bucket, missing[k], n_buckets).astype(np.int64)
+
+        codes = _zone_codes(zone_index, chunk)
+        size = len(zone_index)
+        zone_frames = np.pad(zone_frames, (0, size - len(zone_frames)))
+        zone_violations = np.pad(zone_violations, (0, size - len(zone_violations)))
+        zone_frames += np.bincount(codes, count, size).astype(np.int64)
+        zone_violations += np.bincount(codes, violating, size).astype(np.int64)
+
+    total = int(frames_per_bucket.sum())
+    missing_totals = missing_per_bucket.sum(axis=1)
+    item_stats = store.item_episodes(start, end, stream)
+    items = {}
+    for k, item in enumerate(REQUIRED_PPE):
+        items[item] = {
+            'missing_frames': int(missing_totals[k]),
+            'compliance_rate': float(1.0 - missing_totals[k] / total) if total else 1.0,
+            'episodes': item_stats.get(item, {}).get('episodes', 0),
+            'violation_seconds': item_stats.get(item, {}).get('violation_seconds', 0.0),
+        }
+
+    episodes_by_zone = store.zone_episodes(start, end, stream)
+    names = [str(name) for name in zone_index]
+    zones = [
+        {
+            'zone': name,
+            'frames': int(zone_frames[i]),
+            'violation_frames': int(zone_violations[i]),
+            'violation_rate': float(zone_violations[i] / zone_frames[i]) if zone_frames[i] else 0.0,
+            'episodes': episodes_by_zone.get(name, {}).get('episodes', 0),
+            'violation_seconds': episodes_by_zone.get(name, {}).get('violation_seconds', 0.0),
+        }
+        for i, name in enumerate(names)
+        # A zoned camera is ranked by its zones, not as a whole
+        if name not in zoned_streams
+    ]
+    zones.sort(key=lambda z: (z['episodes'], z['violation_rate']), reverse=True)
+    zones = zones[:top_zones]
+
+    thumbs = []
+    for zone in zones[:snapshots]:
+        if zone['violation_frames']:
+            thumbs.extend(store.snapshots(zone['zone'], start, end, limit=1))
+
+    return {
+        'start': start,
+        'end': end,
+        'stream': stream,
+        'frames': total,
+        'violation_frames': int(violations_per_bucket.sum()),
+        'compliance_rate': float(1.0 - violations_per_bucket.sum() / total) if total else 1.0,
+        'items': items,
+        'timeline': {
+            'bucket_seconds': bucket_seconds,
+            'bucket_start': start + np.arange(n_buckets) * bucket_seconds,
+            'frames': frames_per_bucket,
+            'violation_frames': violations_per_bucket,
+            'missing': {item: missing_per_bucket[k] for k, item in enumerate(REQUIRED_PPE)},
+        },
+        'zones': zones,
+        'snapshots': thumbs,
+    }
@@ -0,0 +1,200 @@
+import abc
+import os
+
+import numpy as np
+
+DEFAULT_BACKEND = "pytorch"
+
+
+def parse_backend(spec):
+    """
+    "onnx-int8" -> ("onnx", True); "pytorch" -> ("pytorch", False)
+    """
+    spec = (spec or DEFAULT_BACKEND).lower()
+    if spec.endswith("-int8"):
+        return spec[:-5], True
+    return spec, False
+
+
+def configured_backend():
+    """Backend setting from the PPE_BACKEND environment variable"""
+    return os.environ.get("PPE_BACKEND", DEFAULT_BACKEND)
+
+
+class InferenceBackend(abc.ABC):
+    """
+    Common interface behind detect_ppe: `predict(source, **kwargs)` returning
+    Ultralytics-style results, and `names` mapping class id -> name.
+    """
+
+    name = None
+
+    def __init__(self, weights, int8=False):
+        self.weights = weights
+        self.int8 = int8
+        self.path = self.artifact_path(weights, int8)
+        self.model = self.load()
+
+    @staticmethod
+    @abc.abstractmethod
+    def artifact_path(weights, int8=False):
+        """File the backend loads for these weights (exported artifacts live next to them)"""
+
+    @abc.abstractmethod
+    def load(self):
+        """Build the underlying model from `self.path`"""
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, source, **kwargs):
+        return self.model.predict(source, **kwargs)
+
+    def __repr__(self):
+        precision = "int8" if self.int8 else "fp32"
+        return f"<{type(self).__name__} {self.path} ({precision})>"
+
+
+class PyTorchBackend(InferenceBackend):
+    name = "pytorch"
+
+    @staticmethod
+    def artifact_path(weights, int8=False):
+        if int8:
+            raise ValueError("INT8 is only available for the onnx and openvino backends")
+        return weights
+
+    def load(self):
+        import torch
+        from ultralytics import YOLO
+
+        model = torch.load(self.path, weights_only=False)
+        # Plain Ultralytics checkpoints are dicts; let YOLO unpack them
+        if isinstance(model, dict):
+            model = YOLO(self.path)
+        if torch.cuda.is_available():
+            model.to('cuda')
+        return model
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime (CPU) through the Ultralytics AutoBackend"""
+
+    name = "onnx"
+
+    @staticmethod
+    def artifact_path(weights, int8=False):
+        stem = os.path.splitext(weights)[0]
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+
+    def load(self):
+        from ultralytics import YOLO
+
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"{self.path} not found - run export_model.py --format onnx first")
+        return YOLO(self.path, task="detect")
+
+
+class OpenVINOBackend(InferenceBackend):
+    """OpenVINO IR through the Ultralytics AutoBackend"""
+
+    name = "openvino"
+
+    @staticmethod
+    def artifact_path(weights, int8=False):
+        stem = os.path.splitext(weights)[0]
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+
+    def load(self):
+        from ultralytics import YOLO
+
+        if not os.path.isdir(self.path):
+            raise FileNotFoundError(f"{self.path} not found - run export_model.py --format openvino first")
+        return YOLO(self.path, task="detect")
+
+
+BACKENDS = {
+    PyTorchBackend.name: PyTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+}
+
+
+def register_backend(cls):
+    """Add a custom InferenceBackend subclass (keyed by its `name`)"""
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def load_backend(weights, spec=None):
+    """Instantiate the backend for `spec` (e.g. "onnx-int8") over `weights`"""
+    name, int8 = parse_backend(spec or configured_backend())
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](weights, int8)
+
+
+def _match_detections(ref_boxes, ref_scores, ref_labels, boxes, scores, labels, iou_threshold):
+    """Greedy same-class IoU matching; returns (matched, max score difference)"""
+    from utils.tracker import iou_matrix
+
+    iou = iou_matrix(ref_boxes, boxes)
+    if iou.size:
+        same = np.array(ref_labels, dtype=object)[:, None] == np.array(labels, dtype=object)[None, :]
+        iou = np.where(same, iou, 0.0)
+    matched, max_diff, used = 0, 0.0, set()
+    for r in range(len(ref_boxes)):
+        if not iou.size:
+            break
+        candidates = [c for c in np.argsort(-iou[r]) if c not in used and iou[r, c] >= iou_threshold]
+        if candidates:
+            c = candidates[0]
+            used.add(c)
+            matched += 1
+            max_diff = max(max_diff, abs(float(ref_scores[r]) - float(scores[c])))
+    return matched, max_diff
+
+
+def compare_backends(reference, candidate, frames, conf_threshold=0.5, iou_threshold=0.85, score_tol=0.05,
+                     min_match_rate=0.95):
+    """
+    Check a candidate backend reproduces the reference (PyTorch) detections
+
+    Args:
+        reference, candidate: Models/backends usable with detect_ppe
+        frames: Iterable of BGR frames
+        iou_threshold: Minimum IoU for two boxes to count as the same detection
+        score_tol: Maximum allowed confidence difference on matched boxes
+        min_match_rate: Fraction of detections that must be reproduced
+
+    Returns:
+        dict: match statistics and an overall 'passed' flag
+    """
+    from utils.detection import extract_detections, predict_frame, summarize_detections
+
+    total_ref, total_matched, max_diff, same_missing, images = 0, 0, 0.0, 0, 0
+    for frame in frames:
+        outputs = []
+        for model in (reference, candidate):
+            _, _, result = predict_frame(model, frame, conf_threshold)
+            if result is None:
+                outputs.append((np.zeros((0, 4), np.float32), np.zeros(0, np.float32), []))
+            else:
+                outputs.append(extract_detections(model, result))
+        (rb, rs, rl), (cb, cs, cl) = outputs
+        matched, diff = _match_detections(rb, rs, rl, cb, cs, cl, iou_threshold)
+        total_ref += max(len(rl), len(cl))
+        total_matched += matched
+        max_diff = max(max_diff, diff)
+        same_missing += summarize_detections(rb, rl)[0] == summarize_detections(cb, cl)[0]
+        images += 1
+
+    match_rate = total_matched / total_ref if total_ref else 1.0
+    return {
+        'images': images,
+        'match_rate': match_rate,
+        'max_score_diff': max_diff,
+        'missing_agreement': same_missing / images if images else 1.0,
+        'passed': match_rate >= min_match_rate and max_diff <= score_tol,
+    }
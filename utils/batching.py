@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from utils import metrics
+from utils.detection import detect_ppe_batch
+
+
+class QueueFull(Exception):
+    """Raised by DynamicBatcher.submit when the request queue is at capacity"""
+
+
+class _Request:
+    __slots__ = ("frame", "conf", "render", "future", "submitted")
+
+    def __init__(self, frame, conf, render):
+        self.frame = frame
+        self.conf = conf
+        self.render = render
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class DynamicBatcher:
+    """
+    Coalesces concurrent single-frame requests into batched forward passes
+
+    Callers `submit()` a frame from any thread and get a Future. One worker
+    thread blocks for the first queued request, then keeps collecting until
+    it has `max_batch` frames or `max_wait_ms` has passed since that first
+    request, and runs the lot through detect_ppe_batch. Under light load a
+    request waits at most `max_wait_ms`; under heavy load batches fill up and
+    throughput scales with the batch size instead of serializing on one
+    `model.predict` call per request.
+
+    Requests with different confidence thresholds in the same window are
+    split into one forward pass per threshold. Rendering is post-processing,
+    so annotated and plain requests share a pass and only the former are drawn.
+    """
+
+    def __init__(self, model, max_batch=8, max_wait_ms=10.0, max_queue=256):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dynamic-batcher", daemon=True)
+            self._thread.start()
+            metrics.register_collector(f"batcher-{id(self)}", self._metrics)
+        return self
+
+    def submit(self, frame, conf_threshold=0.5, render=False):
+        """
+        Queue one BGR frame for detection
+
+        Returns:
+            Future resolving to (annotated_frame, missing, counts, workers,
+            detections); annotated_frame is None unless render is True
+        """
+        request = _Request(frame, conf_threshold, render)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.rejected += 1
+            raise QueueFull(f"Inference queue full ({self._queue.maxsize} requests)")
+        return request.future
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.conf, []).append(request)
+            for conf, requests in groups.items():
+                self._process(requests, conf)
+
+    def _process(self, requests, conf):
+        start = time.perf_counter()
+        try:
+            outputs = detect_ppe_batch(self.model, [r.frame for r in requests], batch_size=len(requests),
+                                       conf_threshold=conf, render=[r.render for r in requests],
+                                       return_detections=True)
+        except Exception as e:
+            self.errors += 1
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        self.requests += len(requests)
+        self.batches += 1
+        metrics.observe_stage("batch", time.perf_counter() - start)
+        for request, output in zip(requests, outputs):
+            metrics.observe_stage("queue_wait", start - request.submitted)
+            request.future.set_result(output)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'pending': self._queue.qsize(),
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000.0,
+        }
+
+    def _metrics(self):
+        stats = self.stats()
+        return [
+            ("ppe_server_requests_total", {}, stats['requests']),
+            ("ppe_server_batches_total", {}, stats['batches']),
+            ("ppe_server_rejected_total", {}, stats['rejected']),
+            ("ppe_server_queue_depth", {}, stats['pending']),
+            ("ppe_server_mean_batch_size", {}, stats['mean_batch_size']),
+        ]
+
+    def stop(self, timeout=2.0):
+        metrics.unregister_collector(f"batcher-{id(self)}")
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Fail anything still queued rather than leaving callers waiting forever
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("Inference batcher stopped"))
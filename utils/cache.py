@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils import metrics
+
+
+def make_key(data, model_id, conf_threshold):
+    """Cache key from raw upload bytes, model identity and threshold"""
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f"{digest}:{model_id}:{conf_threshold:.3f}"
+
+
+def _entry_size(value):
+    """Approximate memory footprint of a cached detection result"""
+    size = 0
+    for part in value:
+        if hasattr(part, 'nbytes'):
+            size += part.nbytes
+        else:
+            size += len(repr(part))
+    return size
+
+
+class ResultCache:
+    """Thread-safe LRU cache for detection results, bounded in bytes"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return cached (annotated, missing, counts) or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a result, evicting least recently used entries"""
+        size = _entry_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self.current_bytes -= self._sizes.pop(old_key)
+
+    def get_or_compute(self, key, compute):
+        """Return cached value or compute, store and return it"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and memory usage"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Shared across sessions; module state survives Streamlit reruns
+result_cache = ResultCache()
+metrics.register_collector("result_cache", lambda: [
+    (f"ppe_result_cache_{name}", {}, value) for name, value in result_cache.stats().items()
+])
@@ -1,55 +1,500 @@
-import cv2
-
-def detect_ppe(model, frame, conf_threshold=0.5):
-    """
-    Detect PPE equipment with error handling and configurable confidence
-    
-    Args:
-        model: YOLO model instance
-        frame: Input image/frame (BGR format)
-        conf_threshold: Minimum confidence score (0-1)
-        
-    Returns:
-        tuple: (annotated_frame, missing_items, detected_counts)
-    """
-    if frame is None or frame.size == 0:
-        return frame, [], {}
-    
-    try:
-        # Resize with aspect ratio preservation
-        height, width = frame.shape[:2]
-        new_height = 640
-        new_width = int((new_height / height) * width)
-        frame = cv2.resize(frame, (new_width, new_height))
-        
-        # Predict with confidence threshold
-        results = model.predict(frame, conf=conf_threshold)
-        
-        # Handle empty results safely
-        if not results or len(results[0]) == 0:
-            return frame, ["helmet", "vest", "gloves", "boots"], {}
-            
-        # Process detections
-        detected_classes = []
-        if hasattr(results[0], 'boxes'):
-            boxes = results[0].boxes
-            if hasattr(boxes, 'cls'):
-                detected_classes = [model.names[int(cls)] for cls in boxes.cls.cpu().numpy()]
-        
-        # Count detections
-        item_counts = {}
-        for item in detected_classes:
-            item_counts[item] = item_counts.get(item, 0) + 1
-        
-        # Check required PPE
-        required_ppe = ["helmet", "vest", "gloves", "boots"]
-        missing = [item for item in required_ppe if item not in item_counts]
-        
-        # Annotate frame
-        output_frame = results[0].plot()
-        
-        return output_frame, missing, item_counts
-        
-    except Exception as e:
-        print(f"Detection error: {e}")
-        return frame, ["helmet", "vest", "gloves", "boots"], {}
\ No newline at end of file
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from utils import metrics
+from utils.preprocess import Letterboxer, content_view, unpad_boxes
+
+REQUIRED_PPE = ["helmet", "vest", "gloves", "boots"]
+INPUT_SIZE = 640
+PERSON_CLASSES = ("person", "worker")
+# Fraction of an item box that must fall inside a person box to belong to them
+MIN_ITEM_OVERLAP = 0.5
+
+
+def extract_detections(model, result):
+    """
+    Pull boxes, scores and class names out of a prediction result
+
+    Returns:
+        tuple: ((N, 4) float32 xyxy boxes, (N,) float32 scores, list of class names)
+    """
+    boxes = getattr(result, 'boxes', None)
+    if boxes is None or not hasattr(boxes, 'cls'):
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), []
+    labels = [model.names[int(cls)] for cls in boxes.cls.cpu().numpy()]
+    if hasattr(boxes, 'xyxy'):
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float32).reshape(-1, 4)
+    else:
+        xyxy = np.zeros((len(labels), 4), dtype=np.float32)
+    if hasattr(boxes, 'conf'):
+        scores = boxes.conf.cpu().numpy().astype(np.float32).reshape(-1)
+    else:
+        scores = np.ones(len(labels), dtype=np.float32)
+    return xyxy, scores, labels
+
+
+def assign_items_to_persons(person_boxes, item_boxes, min_overlap=MIN_ITEM_OVERLAP):
+    """
+    Assign each PPE item box to the person box that contains most of it
+
+    Works on the full (persons x items) overlap matrix at once, so cost is
+    O(P x I) array work with no Python loops over boxes.
+
+    Args:
+        person_boxes: (P, 4) xyxy array
+        item_boxes: (I, 4) xyxy array
+        min_overlap: Minimum fraction of the item area inside the person box
+
+    Returns:
+        np.ndarray: (I,) index of the owning person, -1 where unassigned
+    """
+    if len(person_boxes) == 0 or len(item_boxes) == 0:
+        return np.full(len(item_boxes), -1, dtype=np.int64)
+
+    p = person_boxes[:, None, :]
+    i = item_boxes[None, :, :]
+    inter_w = np.clip(np.minimum(p[..., 2], i[..., 2]) - np.maximum(p[..., 0], i[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(p[..., 3], i[..., 3]) - np.maximum(p[..., 1], i[..., 1]), 0, None)
+    inter = inter_w * inter_h
+
+    item_area = (item_boxes[:, 2] - item_boxes[:, 0]) * (item_boxes[:, 3] - item_boxes[:, 1])
+    person_area = (person_boxes[:, 2] - person_boxes[:, 0]) * (person_boxes[:, 3] - person_boxes[:, 1])
+    containment = inter / np.maximum(item_area[None, :], 1e-6)
+    iou = inter / np.maximum(person_area[:, None] + item_area[None, :] - inter, 1e-6)
+
+    # Containment decides ownership; IoU breaks ties between overlapping people
+    score = containment + 1e-3 * iou
+    owner = score.argmax(axis=0)
+    owner[containment[owner, np.arange(len(item_boxes))] < min_overlap] = -1
+    return owner
+
+
+def person_compliance(boxes, labels):
+    """
+    Per-worker PPE compliance from one frame's detections
+
+    Returns:
+        list: one dict per detected person with 'box', 'missing' and 'items'
+    """
+    labels = np.asarray(labels, dtype=object)
+    is_person = np.isin(labels, PERSON_CLASSES)
+    person_boxes = boxes[is_person]
+    if len(person_boxes) == 0:
+        return []
+
+    is_item = np.isin(labels, REQUIRED_PPE)
+    item_boxes = boxes[is_item]
+    item_kind = np.array([REQUIRED_PPE.index(label) for label in labels[is_item]], dtype=np.int64)
+    owner = assign_items_to_persons(person_boxes, item_boxes)
+
+    # (P, K) count of each required item kind assigned to each person
+    held = np.zeros((len(person_boxes), len(REQUIRED_PPE)), dtype=np.int64)
+    assigned = owner >= 0
+    np.add.at(held, (owner[assigned], item_kind[assigned]), 1)
+
+    workers = []
+    for box, counts in zip(person_boxes.tolist(), held):
+        workers.append({
+            'box': box,
+            'missing': [item for item, n in zip(REQUIRED_PPE, counts) if n == 0],
+            'items': {item: int(n) for item, n in zip(REQUIRED_PPE, counts) if n},
+        })
+    return workers
+
+
+def summarize_detections(boxes, labels):
+    """
+    Count detected classes and work out which required items are missing
+
+    With persons in the frame, an item only counts for the worker wearing it,
+    and the frame's missing list is the union over all workers.
+
+    Returns:
+        tuple: (missing_items, detected_counts, workers)
+    """
+    item_counts = {}
+    for item in labels:
+        item_counts[item] = item_counts.get(item, 0) + 1
+
+    workers = person_compliance(boxes, labels)
+    if workers:
+        missing_any = {item for worker in workers for item in worker['missing']}
+        missing = [item for item in REQUIRED_PPE if item in missing_any]
+    else:
+        missing = [item for item in REQUIRED_PPE if item not in item_counts]
+    return missing, item_counts, workers
+
+
+def _make_palette(count):
+    """Distinct BGR colours spaced around the hue wheel"""
+    hues = (np.arange(count) * 0.618033988749895 % 1.0 * 180).astype(np.uint8)
+    hsv = np.stack([hues, np.full(count, 200, np.uint8), np.full(count, 230, np.uint8)], axis=1)
+    return cv2.cvtColor(hsv[None], cv2.COLOR_HSV2BGR)[0]
+
+
+class OverlayRenderer:
+    """
+    Draws boxes, labels and per-worker status straight onto a frame
+
+    Label text is rasterised once into small sprites (cached, LRU bounded)
+    and blitted with a slice assignment afterwards, so steady-state drawing
+    is a few rectangle calls and array copies per box. Colours come from a
+    fixed table indexed by class id.
+    """
+
+    OK_COLOR = (60, 180, 75)
+    VIOLATION_COLOR = (40, 40, 220)
+
+    def __init__(self, font_scale=0.5, thickness=2, max_sprites=1024):
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.max_sprites = max_sprites
+        self.palette = _make_palette(64)
+        self._class_ids = {item: i for i, item in enumerate(REQUIRED_PPE + list(PERSON_CLASSES))}
+        self._names = None
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register_names(self, names):
+        """Use the model's class ids for the colour table"""
+        if names is self._names:
+            return
+        self._names = names
+        items = names.items() if isinstance(names, dict) else enumerate(names)
+        self._class_ids.update({label: int(i) for i, label in items})
+
+    def color(self, label):
+        class_id = self._class_ids.get(label)
+        if class_id is None:
+            class_id = self._class_ids[label] = len(self._class_ids)
+        return tuple(int(c) for c in self.palette[class_id % len(self.palette)])
+
+    def _sprite(self, text, color):
+        """Cached filled label image for `text` on a `color` background"""
+        key = (text, color)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                return sprite
+
+        (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, 1)
+        sprite = np.empty((h + baseline + 4, w + 4, 3), dtype=np.uint8)
+        sprite[:] = color
+        cv2.putText(sprite, text, (2, h + 2), cv2.FONT_HERSHEY_SIMPLEX, self.font_scale,
+                    (255, 255, 255), 1, cv2.LINE_AA)
+
+        with self._lock:
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def _blit(frame, sprite, x, y):
+        """Copy a sprite onto the frame with its bottom-left at (x, y), clipped to bounds"""
+        frame_h, frame_w = frame.shape[:2]
+        h, w = sprite.shape[:2]
+        top = y - h if y - h >= 0 else y
+        x0, y0 = max(x, 0), max(top, 0)
+        x1, y1 = min(x + w, frame_w), min(top + h, frame_h)
+        if x1 > x0 and y1 > y0:
+            frame[y0:y1, x0:x1] = sprite[y0 - top:y1 - top, x0 - x:x1 - x]
+
+    def draw(self, frame, boxes, labels, scores=None, track_ids=None, workers=None):
+        """
+        Draw onto `frame` in place
+
+        Args:
+            frame: BGR frame (modified in place)
+            boxes: (N, 4) xyxy boxes in frame coordinates
+            labels: N class names
+            scores: Optional (N,) confidences
+            track_ids: Optional (N,) track ids
+            workers: Optional per-worker dicts from summarize_detections
+
+        Returns:
+            The same frame, for chaining
+        """
+        boxes = np.asarray(boxes).astype(np.int32, copy=False)
+        for i, label in enumerate(labels):
+            if label in PERSON_CLASSES and workers:
+                # Worker boxes get a compliance status instead of a class label
+                continue
+            x1, y1, x2, y2 = boxes[i]
+            color = self.color(label)
+            text = label
+            if track_ids is not None:
+                text = f"#{track_ids[i]} {text}"
+            if scores is not None:
+                text = f"{text} {scores[i]:.2f}"
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, self.thickness)
+            self._blit(frame, self._sprite(text, color), x1, y1)
+
+        for worker in workers or ():
+            x1, y1, x2, y2 = (int(v) for v in worker['box'])
+            if worker['missing']:
+                color, text = self.VIOLATION_COLOR, "Missing: " + ", ".join(worker['missing'])
+            else:
+                color, text = self.OK_COLOR, "PPE OK"
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, self.thickness)
+            self._blit(frame, self._sprite(text, color), x1, y1)
+        return frame
+
+
+_renderer = OverlayRenderer()
+
+
+def draw_detections(frame, boxes, labels, scores=None, track_ids=None, workers=None, names=None):
+    """
+    Draw detections onto `frame` in place with the shared renderer
+
+    Returns:
+        The same frame, for chaining
+    """
+    if names is not None:
+        _renderer.register_names(names)
+    return _renderer.draw(frame, boxes, labels, scores, track_ids, workers)
+
+
+_thread_state = threading.local()
+
+
+def _letterboxer(size=INPUT_SIZE):
+    """Per-thread Letterboxer (one per input size) so concurrent callers never share buffers"""
+    letterboxers = getattr(_thread_state, 'letterboxers', None)
+    if letterboxers is None:
+        letterboxers = _thread_state.letterboxers = {}
+    letterboxer = letterboxers.get(size)
+    if letterboxer is None:
+        letterboxer = letterboxers[size] = Letterboxer(size)
+    return letterboxer
+
+
+def prepare_frame(frame, rgb=False, input_size=INPUT_SIZE):
+    """
+    Letterbox a frame into this thread's reusable model-input buffer
+
+    Returns:
+        tuple: (buffer, meta) - see utils.preprocess.Letterboxer
+    """
+    return _letterboxer(input_size)(frame, rgb=rgb)
+
+
+def predict_frame(model, frame, conf_threshold=0.5, rgb=False, input_size=INPUT_SIZE):
+    """
+    Letterbox a frame into a reusable buffer and run one forward pass
+
+    Returns:
+        tuple: (buffer, meta, result) - buffer is reused by the next call on
+        this thread; use content_view(buffer, meta) for the resized frame
+    """
+    with metrics.stage_timer("preprocess"):
+        buffer, meta = prepare_frame(frame, rgb, input_size)
+    with metrics.stage_timer("inference"):
+        results = model.predict(buffer, conf=conf_threshold, imgsz=input_size, verbose=False)
+    return buffer, meta, (results[0] if results else None)
+
+
+def detect_ppe(model, frame, conf_threshold=0.5, return_workers=False, rgb=False, render=True,
+               input_size=INPUT_SIZE, raise_errors=False):
+    """
+    Detect PPE equipment with error handling and configurable confidence
+
+    Args:
+        model: YOLO model instance
+        frame: Input image/frame (BGR format, or RGB with rgb=True)
+        conf_threshold: Minimum confidence score (0-1)
+        return_workers: Also return per-person compliance
+        rgb: Input is RGB; the channel swap happens during letterboxing
+        render: Draw the overlay; False returns None as the frame (headless use)
+        input_size: Model input edge in pixels (multiple of 32; smaller is faster)
+        raise_errors: Let model errors propagate instead of returning the
+            fallback (input frame, everything missing)
+
+    Returns:
+        tuple: (annotated_frame, missing_items, detected_counts), plus a
+        list of per-worker dicts when return_workers is True. The annotated
+        frame is BGR, resized to fit the model input.
+    """
+    if frame is None or frame.size == 0:
+        return (frame, [], {}, []) if return_workers else (frame, [], {})
+
+    try:
+        # Letterbox once, stride aligned, so the predictor doesn't resize again
+        buffer, meta, result = predict_frame(model, frame, conf_threshold, rgb, input_size)
+
+        # Handle empty results safely
+        detected = result is not None and len(result) > 0
+        with metrics.stage_timer("postprocess"):
+            if detected:
+                boxes, scores, labels = extract_detections(model, result)
+                boxes = unpad_boxes(boxes, meta)
+                missing, item_counts, workers = summarize_detections(boxes, labels)
+            else:
+                missing, item_counts, workers = list(REQUIRED_PPE), {}, []
+
+        annotated = None
+        if render:
+            # Annotate frame
+            with metrics.stage_timer("render"):
+                annotated = content_view(buffer, meta).copy()
+                if detected:
+                    draw_detections(annotated, boxes, labels, scores, workers=workers, names=model.names)
+        output = (annotated, missing, item_counts, workers)
+
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Detection error: {e}")
+        # The fallback looks like a real violation; the counter is how it shows up
+        metrics.inc("ppe_inference_errors_total")
+        output = (frame, list(REQUIRED_PPE), {}, [])
+
+    return output if return_workers else output[:3]
+
+
+def detection_records(boxes, scores, labels, scale=1.0):
+    """JSON-friendly list of {'label', 'score', 'box'} with boxes divided by `scale`"""
+    boxes = np.asarray(boxes, dtype=np.float32) / scale
+    return [
+        {'label': label, 'score': round(float(score), 4), 'box': [round(float(v), 1) for v in box]}
+        for label, score, box in zip(labels, scores, boxes)
+    ]
+
+
+def _detect_chunk(model, frames, conf_threshold, render=True, return_detections=False, input_size=INPUT_SIZE,
+                  return_workers=False):
+    """
+    Letterbox a chunk of frames and run them through one forward pass
+
+    `conf_threshold` may be one value per frame: the pass then runs at the
+    lowest and each frame keeps only detections that meet its own. `render`
+    may likewise be one flag per frame.
+    """
+    thresholds = conf_threshold if isinstance(conf_threshold, (list, tuple)) else None
+    if thresholds is not None:
+        conf_threshold = min(thresholds, default=0.5)
+    letterboxer = _letterboxer(input_size)
+    valid = [i for i, frame in enumerate(frames) if frame is not None and frame.size > 0]
+    padded, metas = [], []
+    with metrics.stage_timer("preprocess"):
+        for slot, i in enumerate(valid):
+            buffer, meta = letterboxer(frames[i], square=True, slot=slot)
+            padded.append(buffer)
+            metas.append(meta)
+
+    results = []
+    if padded:
+        # Equal shapes let the predictor stack the list into one tensor batch.
+        # Model errors propagate: a fabricated "everything missing" result
+        # would be indistinguishable from a real violation downstream.
+        with metrics.stage_timer("inference"):
+            results = model.predict(padded, conf=conf_threshold, imgsz=input_size, verbose=False)
+    if len(results) != len(padded):
+        raise RuntimeError(f"Model returned {len(results)} results for a batch of {len(padded)}")
+
+    # Empty frames pass through like detect_ppe so outputs stay aligned
+    if return_detections:
+        empty = (None, [], {}, [], [])
+    elif return_workers:
+        empty = (None, [], {}, [])
+    else:
+        empty = (None, [], {})
+    outputs = [(frame,) + empty[1:] for frame in frames]
+    for i, buffer, meta, result in zip(valid, padded, metas, results):
+        detected = result is not None and len(result) > 0
+        with metrics.stage_timer("postprocess"):
+            if detected:
+                boxes, scores, labels = extract_detections(model, result)
+                if thresholds is not None and thresholds[i] > conf_threshold:
+                    keep = scores >= thresholds[i]
+                    boxes, scores = boxes[keep], scores[keep]
+                    labels = [label for label, kept in zip(labels, keep) if kept]
+                    detected = bool(labels)
+            if detected:
+                boxes = unpad_boxes(boxes, meta)
+                missing, item_counts, workers = summarize_detections(boxes, labels)
+            else:
+                missing, item_counts, workers = list(REQUIRED_PPE), {}, []
+        annotated = None
+        if render[i] if isinstance(render, (list, tuple)) else render:
+            with metrics.stage_timer("render"):
+                annotated = content_view(buffer, meta).copy()
+                if detected:
+                    draw_detections(annotated, boxes, labels, scores, workers=workers, names=model.names)
+        if return_detections:
+            scale = meta['scale']
+            records = detection_records(boxes, scores, labels, scale) if detected else []
+            workers = [{**worker, 'box': [round(v / scale, 1) for v in worker['box']]} for worker in workers]
+            outputs[i] = (annotated, missing, item_counts, workers, records)
+        elif return_workers:
+            outputs[i] = (annotated, missing, item_counts, workers)
+        else:
+            outputs[i] = (annotated, missing, item_counts)
+    return outputs
+
+
+def iter_ppe_batches(model, frames, batch_size=8, conf_threshold=0.5, render=True, return_detections=False,
+                     input_size=INPUT_SIZE, return_workers=False):
+    """
+    Run detection over an iterable of frames, yielding each finished batch
+
+    Args:
+        model: YOLO model instance
+        frames: Iterable of BGR frames (consumed lazily)
+        batch_size: Frames per forward pass
+        conf_threshold: Minimum confidence score (0-1), or a list with one
+            per frame (each batch then runs one pass at its lowest)
+        render: Draw overlays (False yields None frames), or a list with one
+            flag per frame
+        return_detections: Also return per-worker dicts and detection
+            records, both with boxes in original frame pixels
+        input_size: Model input edge in pixels (multiple of 32)
+        return_workers: Also return per-worker dicts in display coordinates,
+            like detect_ppe (ignored with return_detections)
+
+    Yields:
+        list: (annotated_frame, missing_items, detected_counts) per frame,
+        plus (workers, detections) when return_detections is True, or
+        workers when return_workers is True
+
+    Raises:
+        Whatever the model raises; a failed batch yields no results
+    """
+    def for_chunk(value, start, count):
+        return value[start:start + count] if isinstance(value, (list, tuple)) else value
+
+    chunk, start = [], 0
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) == batch_size:
+            yield _detect_chunk(model, chunk, for_chunk(conf_threshold, start, len(chunk)),
+                                for_chunk(render, start, len(chunk)), return_detections, input_size, return_workers)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield _detect_chunk(model, chunk, for_chunk(conf_threshold, start, len(chunk)),
+                            for_chunk(render, start, len(chunk)), return_detections, input_size, return_workers)
+
+
+def detect_ppe_batch(model, frames, batch_size=8, conf_threshold=0.5, render=True, return_detections=False,
+                     input_size=INPUT_SIZE, return_workers=False):
+    """
+    Batched version of detect_ppe (model errors propagate, as with raise_errors=True)
+
+    `conf_threshold` and `render` may be lists with one value per frame (see iter_ppe_batches).
+
+    Returns:
+        list: (annotated_frame, missing_items, detected_counts) per frame,
+        plus (workers, detections) when return_detections is True, or
+        workers when return_workers is True
+    """
+    outputs = []
+    for batch in iter_ppe_batches(model, frames, batch_size, conf_threshold, render, return_detections,
+                                  input_size, return_workers):
+        outputs.extend(batch)
+    return outputs
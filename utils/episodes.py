@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+
+from utils.detection import REQUIRED_PPE
+
+FRAME_SUBJECT = "frame"
+
+
+class _EpisodeState:
+    """Vote window and episode bookkeeping for one (stream, subject, item)"""
+
+    def __init__(self, window):
+        self.votes = deque(maxlen=window)
+        self.pending_since = None
+        self.episode = None
+        self.last_end = None
+        self.last_episode = None
+
+    def violation_votes(self):
+        return sum(self.votes)
+
+
+class ViolationEpisodes:
+    """
+    Turns noisy per-frame `missing` lists into debounced violation episodes
+
+    For every (stream, subject, item) - subject is the whole frame or a
+    tracked worker - the last `window` frames vote. An episode starts once
+    at least `votes` of them show the item missing and that has held for
+    `min_duration` seconds; it ends when violating votes drop to
+    `window - votes` or fewer (hysteresis, so flicker cannot toggle it).
+    A violation that returns within `cooldown` seconds of the previous
+    episode ending re-opens that episode instead of starting a new one (its
+    next 'end' event carries the original 'start', so consumers can upsert).
+
+    `update()` returns only state changes - dicts with 'type' ('start' or
+    'end'), 'stream', 'zone', 'subject', 'item', 'start', 'end' and
+    'duration' - so alerts, UI and storage see a handful of events instead of
+    every frame. Passing `zone` tracks that zone of the stream separately
+    from the stream as a whole (and from its other zones).
+    """
+
+    def __init__(self, window=10, votes=6, min_duration=2.0, cooldown=30.0, per_worker=True):
+        if not 0 < votes <= window:
+            raise ValueError("votes must be between 1 and window")
+        self.window = window
+        self.votes = votes
+        self.min_duration = min_duration
+        self.cooldown = cooldown
+        self.per_worker = per_worker
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, stream_id, missing, workers=None, timestamp=None, zone=None):
+        """
+        Feed one frame's result for `stream_id`
+
+        Args:
+            stream_id: Camera / stream identifier
+            missing: Frame-level missing items
+            workers: Optional per-worker dicts; those with an 'id' (tracked)
+                get their own episodes
+            timestamp: Frame time in seconds (default: now)
+            zone: Optional zone name (`missing` and `workers` are then that zone's)
+
+        Returns:
+            list: episode start/end events caused by this frame
+        """
+        now = time.time() if timestamp is None else timestamp
+        scope = (stream_id, zone)
+        observed = {(scope, FRAME_SUBJECT, item) for item in missing}
+        if self.per_worker:
+            for worker in workers or ():
+                if 'id' in worker:
+                    subject = f"worker{worker['id']}"
+                    observed.update((scope, subject, item) for item in worker['missing'])
+
+        events = []
+        with self._lock:
+            for key in observed:
+                if key not in self._states:
+                    self._states[key] = _EpisodeState(self.window)
+            for key, state in list(self._states.items()):
+                if key[0] != scope:
+                    continue
+                state.votes.append(key in observed)
+                event = self._step(key, state, now)
+                if event is not None:
+                    events.append(event)
+                # Forget quiet keys once their cooldown has passed
+                if (state.episode is None and not state.violation_votes()
+                        and (state.last_end is None or now - state.last_end > self.cooldown)):
+                    del self._states[key]
+        return events
+
+    def _step(self, key, state, now):
+        (stream_id, zone), subject, item = key
+        violating = state.violation_votes()
+
+        if state.episode is None:
+            if violating < self.votes:
+                state.pending_since = None
+                return None
+            if state.pending_since is None:
+                state.pending_since = now
+            if now - state.pending_since < self.min_duration:
+                return None
+            started = state.pending_since
+            state.pending_since = None
+            if state.last_end is not None and now - state.last_end <= self.cooldown and state.last_episode:
+                # Same violation resumed within cooldown: extend, don't re-alert
+                state.episode = state.last_episode
+                state.episode['end'] = None
+                return None
+            state.episode = {
+                'stream': stream_id,
+                'zone': zone,
+                'subject': subject,
+                'item': item,
+                'start': started,
+                'end': None,
+            }
+            return dict(state.episode, type='start', duration=0.0)
+
+        if violating <= self.window - self.votes:
+            return self._close(state, now)
+        return None
+
+    def active(self, stream_id, subject=FRAME_SUBJECT, zone=None):
+        """Items with an open episode for this stream/subject (/zone), in REQUIRED_PPE order"""
+        with self._lock:
+            items = {key[2] for key, state in self._states.items()
+                     if key[0] == (stream_id, zone) and key[1] == subject and state.episode is not None}
+        return [item for item in REQUIRED_PPE if item in items]
+
+    def open_episodes(self):
+        with self._lock:
+            return [dict(state.episode) for state in self._states.values() if state.episode is not None]
+
+    def close_all(self, timestamp=None):
+        """End every open episode (e.g. when a stream stops)"""
+        now = time.time() if timestamp is None else timestamp
+        events = []
+        with self._lock:
+            for state in self._states.values():
+                if state.episode is not None:
+                    events.append(self._close(state, now))
+        return events
+
+    @staticmethod
+    def _close(state, now):
+        episode = state.episode
+        episode['end'] = now
+        state.last_end = now
+        state.last_episode = episode
+        state.episode = None
+        return dict(episode, type='end', duration=now - episode['start'])
@@ -0,0 +1,488 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from utils.detection import REQUIRED_PPE, detect_ppe_batch, summarize_detections
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+DEFAULT_SUMMARY_PATH = "models/evaluation.json"
+DEFAULT_CACHE_DIR = ".eval_cache"
+# Predictions are stored down to this score so any sweep threshold can be re-scored from them
+MIN_CONF = 0.001
+
+
+def load_class_names(root):
+    """
+    Class names from data.yaml (`names:` list or dict) or classes.txt in `root`
+
+    Returns:
+        dict: class id -> name, or None when the dataset has no names file
+    """
+    for name in ("data.yaml", "dataset.yaml"):
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            import yaml
+
+            with open(path) as f:
+                names = (yaml.safe_load(f) or {}).get("names")
+            if isinstance(names, list):
+                return dict(enumerate(names))
+            if isinstance(names, dict):
+                return {int(k): v for k, v in names.items()}
+    path = os.path.join(root, "classes.txt")
+    if os.path.exists(path):
+        with open(path) as f:
+            return dict(enumerate(line.strip() for line in f if line.strip()))
+    return None
+
+
+def _label_path(image_path):
+    """YOLO convention: .../images/<rest>.jpg -> .../labels/<rest>.txt, else a .txt beside the image"""
+    stem = os.path.splitext(image_path)[0]
+    parts = stem.split(os.sep)
+    if "images" in parts:
+        index = len(parts) - 1 - parts[::-1].index("images")
+        parts[index] = "labels"
+        candidate = os.sep.join(parts) + ".txt"
+        if os.path.exists(candidate):
+            return candidate
+    return stem + ".txt"
+
+
+def load_dataset(root, split=None, limit=None):
+    """
+    Image paths and their YOLO label files under `root`
+
+    Handles the usual `images/<split>` + `labels/<split>` layout as well as
+    label .txt files next to the images. Images without a label file count
+    as having no objects.
+
+    Returns:
+        list: dicts with 'image' and 'label' paths
+    """
+    base = os.path.join(root, "images", split) if split else root
+    if not os.path.isdir(base):
+        raise FileNotFoundError(f"Dataset folder {base!r} not found")
+    paths = sorted(
+        path for path in glob.glob(os.path.join(base, "**", "*"), recursive=True)
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if limit:
+        paths = paths[:limit]
+    return [{'image': path, 'label': _label_path(path)} for path in paths]
+
+
+def read_labels(path, width, height, names):
+    """
+    One YOLO label file (class cx cy w h, normalized) as pixel xyxy boxes
+
+    Returns:
+        tuple: ((N, 4) float32 xyxy boxes, list of class names)
+    """
+    if not os.path.exists(path):
+        return np.zeros((0, 4), dtype=np.float32), []
+    rows = np.loadtxt(path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.zeros((0, 4), dtype=np.float32), []
+    # Polygon (segmentation) labels: use the bounding box of the points
+    if rows.shape[1] > 5:
+        xs, ys = rows[:, 1::2], rows[:, 2::2]
+        boxes = np.stack([xs.min(1), ys.min(1), xs.max(1), ys.max(1)], axis=1)
+    else:
+        cx, cy, w, h = rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    boxes = boxes * np.array([width, height, width, height], dtype=np.float32)
+    labels = [names.get(int(cls), str(int(cls))) for cls in rows[:, 0]]
+    return boxes.astype(np.float32), labels
+
+
+def iter_images(paths, workers=4, prefetch=4):
+    """
+    Decode images on a thread pool, yielding (path, frame) in order
+
+    cv2.imread releases the GIL, so decoding overlaps with inference on the
+    consuming thread. At most `workers * prefetch` images are held in memory.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="eval-load") as executor:
+        pending = deque()
+        paths = iter(paths)
+        for path in paths:
+            pending.append((path, executor.submit(cv2.imread, path)))
+            if len(pending) >= max(1, workers) * prefetch:
+                break
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(cv2.imread, next_path)))
+            yield path, future.result()
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return path
+
+
+def prediction_key(weights, backend, input_size, batch_size, dataset):
+    """Cache key covering the model file, inference settings and every image/label file"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (_file_signature(weights), backend, input_size, batch_size, MIN_CONF):
+        digest.update(f"{part}\n".encode())
+    for item in dataset:
+        digest.update(f"{_file_signature(item['image'])}\n".encode())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Raw predictions and timings on disk, one .npz per model configuration
+
+    Scoring at another confidence or IoU threshold then needs no inference
+    at all; only a changed model, backend, input size, batch size or image
+    set is re-run.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            offsets = data['offsets']
+            boxes, scores, labels = data['boxes'], data['scores'], data['labels'].tolist()
+            predictions = [
+                (boxes[start:end], scores[start:end], labels[start:end])
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+            shapes = [tuple(shape) for shape in data['shapes'].tolist()]
+            timings = data['batch_times'], data['batch_counts']
+        self.hits += 1
+        return predictions, shapes, timings
+
+    def save(self, key, predictions, shapes, timings):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        offsets = np.cumsum([0] + [len(scores) for _, scores, _ in predictions])
+        labels = [label for _, _, image_labels in predictions for label in image_labels]
+        tmp = self._path(key) + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            boxes=np.concatenate([b for b, _, _ in predictions] or [np.zeros((0, 4))]).astype(np.float32).reshape(-1, 4),
+            scores=np.concatenate([s for _, s, _ in predictions] or [np.zeros(0)]).astype(np.float32),
+            labels=np.array(labels, dtype=str),
+            offsets=offsets,
+            shapes=np.array(shapes, dtype=np.int64).reshape(-1, 2),
+            batch_times=np.asarray(timings[0], dtype=np.float64),
+            batch_counts=np.asarray(timings[1], dtype=np.int64),
+        )
+        os.replace(tmp, self._path(key))
+
+
+def run_predictions(model, dataset, batch_size=8, input_size=640, load_workers=4):
+    """
+    Predict every dataset image at MIN_CONF
+
+    Only the forward pass and post-processing are timed; decoding runs ahead
+    on the loader threads.
+
+    Returns:
+        tuple: (predictions, shapes, (batch_times, batch_counts)) where
+        predictions holds ((N, 4) boxes in image pixels, (N,) scores, labels)
+        per image and shapes holds (height, width)
+    """
+    predictions, shapes, batch_times, batch_counts = [], [], [], []
+
+    def flush(chunk):
+        start = time.perf_counter()
+        outputs = detect_ppe_batch(model, chunk, batch_size=len(chunk), conf_threshold=MIN_CONF, render=False,
+                                   return_detections=True, input_size=input_size)
+        batch_times.append(time.perf_counter() - start)
+        batch_counts.append(len(chunk))
+        for output in outputs:
+            records = output[4]
+            predictions.append((
+                np.array([r['box'] for r in records], dtype=np.float32).reshape(-1, 4),
+                np.array([r['score'] for r in records], dtype=np.float32),
+                [r['label'] for r in records],
+            ))
+
+    chunk = []
+    for path, frame in iter_images([item['image'] for item in dataset], load_workers):
+        if frame is None:
+            print(f"Could not read {path}; scored as an empty prediction")
+            frame = np.zeros((1, 1, 3), dtype=np.uint8)
+        shapes.append(frame.shape[:2])
+        chunk.append(frame)
+        if len(chunk) == batch_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return predictions, shapes, (batch_times, batch_counts)
+
+
+def load_ground_truth(dataset, shapes, names):
+    """Labels for every image as (boxes, labels), boxes in pixels of the matching shape"""
+    return [read_labels(item['label'], width, height, names) for item, (height, width) in zip(dataset, shapes)]
+
+
+def box_iou(a, b):
+    """(N, M) IoU between two xyxy box arrays"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_predictions(pred_boxes, pred_scores, gt_boxes, iou_thresholds=IOU_THRESHOLDS):
+    """
+    Greedy score-ordered matching of one image's predictions of one class
+
+    Returns:
+        np.ndarray: (N, T) bool, True where prediction n is a true positive
+        at IoU threshold t
+    """
+    tp = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+    iou = box_iou(pred_boxes, gt_boxes)
+    taken = np.zeros((len(iou_thresholds), len(gt_boxes)), dtype=bool)
+    thresholds = np.asarray(iou_thresholds)[:, None]
+    for n in np.argsort(-pred_scores, kind="stable"):
+        candidates = np.where((iou[n][None, :] >= thresholds) & ~taken, iou[n][None, :], -1.0)
+        best = candidates.argmax(axis=1)
+        hit = candidates[np.arange(len(best)), best] >= 0
+        tp[n] = hit
+        taken[np.nonzero(hit)[0], best[hit]] = True
+    return tp
+
+
+def average_precision(tp, scores, n_gt):
+    """
+    COCO-style 101-point interpolated AP for each IoU threshold
+
+    Returns:
+        np.ndarray: (T,) AP values (zeros when the class has no labels)
+    """
+    if n_gt == 0 or len(scores) == 0:
+        return np.zeros(tp.shape[1] if tp.ndim == 2 else len(IOU_THRESHOLDS))
+    order = np.argsort(-scores, kind="stable")
+    tp_cum = np.cumsum(tp[order], axis=0)
+    fp_cum = np.cumsum(~tp[order], axis=0)
+    recall = tp_cum / n_gt
+    precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-9)
+    # Precision envelope: best precision at this recall or beyond
+    precision = np.flip(np.maximum.accumulate(np.flip(precision, axis=0), axis=0), axis=0)
+    points = np.linspace(0, 1, 101)
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        index = np.searchsorted(recall[:, t], points, side="left")
+        valid = index < len(recall)
+        ap[t] = precision[index[valid], t].sum() / len(points)
+    return ap
+
+
+def evaluate_detections(predictions, ground_truth, class_names):
+    """
+    Per-class AP@0.5 and AP@0.5:0.95 over the dataset
+
+    Returns:
+        dict: {'classes': {name: {'ap50', 'ap', 'labels', 'predictions'}},
+        'map50', 'map'} where the means cover classes with labels
+    """
+    per_class = {name: {'tp': [], 'scores': [], 'labels': 0} for name in class_names}
+    for (boxes, scores, labels), (gt_boxes, gt_labels) in zip(predictions, ground_truth):
+        labels = np.asarray(labels, dtype=object)
+        gt_labels = np.asarray(gt_labels, dtype=object)
+        for name in set(labels.tolist()) | set(gt_labels.tolist()):
+            entry = per_class.setdefault(name, {'tp': [], 'scores': [], 'labels': 0})
+            pred_mask, gt_mask = labels == name, gt_labels == name
+            entry['labels'] += int(gt_mask.sum())
+            if pred_mask.any():
+                entry['tp'].append(match_predictions(boxes[pred_mask], scores[pred_mask], gt_boxes[gt_mask]))
+                entry['scores'].append(scores[pred_mask])
+
+    classes = {}
+    for name, entry in per_class.items():
+        tp = np.concatenate(entry['tp']) if entry['tp'] else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+        scores = np.concatenate(entry['scores']) if entry['scores'] else np.zeros(0, dtype=np.float32)
+        ap = average_precision(tp, scores, entry['labels'])
+        classes[name] = {
+            'ap50': round(float(ap[0]), 4),
+            'ap': round(float(ap.mean()), 4),
+            'labels': entry['labels'],
+            'predictions': int(len(scores)),
+        }
+    labelled = [c for c in classes.values() if c['labels']]
+    return {
+        'classes': classes,
+        'map50': round(float(np.mean([c['ap50'] for c in labelled])), 4) if labelled else 0.0,
+        'map': round(float(np.mean([c['ap'] for c in labelled])), 4) if labelled else 0.0,
+    }
+
+
+def _precision_recall(tp, fp, fn):
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4),
+            'tp': tp, 'fp': fp, 'fn': fn}
+
+
+def evaluate_compliance(predictions, ground_truth, conf_threshold=0.5):
+    """
+    Frame-level compliance precision/recall for REQUIRED_PPE
+
+    Labels and predictions both go through summarize_detections, so a frame
+    is scored exactly as the app would report it. A "positive" is a frame
+    flagged as a violation; per-item entries score "item reported missing".
+
+    Returns:
+        dict: {'violation': {...}, 'items': {item: {...}}}
+    """
+    counts = {key: [0, 0, 0] for key in ['violation'] + REQUIRED_PPE}
+    for (boxes, scores, labels), (gt_boxes, gt_labels) in zip(predictions, ground_truth):
+        keep = scores >= conf_threshold
+        missing, _, _ = summarize_detections(boxes[keep], [l for l, k in zip(labels, keep) if k])
+        gt_missing, _, _ = summarize_detections(gt_boxes, gt_labels)
+        pairs = [('violation', bool(missing), bool(gt_missing))]
+        pairs += [(item, item in missing, item in gt_missing) for item in REQUIRED_PPE]
+        for key, predicted, actual in pairs:
+            if predicted and actual:
+                counts[key][0] += 1
+            elif predicted:
+                counts[key][1] += 1
+            elif actual:
+                counts[key][2] += 1
+    return {
+        'violation': _precision_recall(*counts['violation']),
+        'items': {item: _precision_recall(*counts[item]) for item in REQUIRED_PPE},
+    }
+
+
+def latency_stats(batch_times, batch_counts):
+    """Per-image latency (ms) and throughput from per-batch timings"""
+    times = np.asarray(batch_times, dtype=np.float64)
+    counts = np.asarray(batch_counts, dtype=np.float64)
+    if not len(times) or not counts.sum():
+        return {'latency_ms': 0.0, 'batch_p95_ms': 0.0, 'fps': 0.0}
+    return {
+        'latency_ms': round(float(times.sum() / counts.sum() * 1000.0), 3),
+        'batch_p95_ms': round(float(np.percentile(times, 95) * 1000.0), 3),
+        'fps': round(float(counts.sum() / times.sum()), 2),
+    }
+
+
+def pareto_front(rows, cost="latency_ms", value="map50"):
+    """
+    Mark rows no other row beats on both lower `cost` and higher `value`
+
+    Sets row['pareto'] in place and returns the front sorted by cost.
+    """
+    ordered = sorted(rows, key=lambda row: (row[cost], -row[value]))
+    best = -np.inf
+    for row in ordered:
+        row['pareto'] = row[value] > best
+        best = max(best, row[value])
+    return [row for row in ordered if row['pareto']]
+
+
+def sweep(dataset, names, weights, backends, input_sizes, batch_sizes, conf_thresholds, model_loader,
+          cache=None, load_workers=4, objective="map50"):
+    """
+    Score every backend x input size x batch size x confidence combination
+
+    Each model configuration is predicted once (or read from `cache`);
+    every confidence threshold is then scored from the same predictions.
+
+    Args:
+        dataset: load_dataset() output
+        names: Class id -> name for the label files
+        model_loader: callable(weights, backend) -> model
+        objective: Row field the Pareto front maximizes
+
+    Returns:
+        dict: {'rows': [...], 'classes': {config: per-class AP}}
+    """
+    rows, classes = [], {}
+    ground_truth = None
+    for backend in backends:
+        model = model_loader(weights, backend)
+        for input_size in input_sizes:
+            for batch_size in batch_sizes:
+                key = prediction_key(weights, backend, input_size, batch_size, dataset)
+                cached = cache.load(key) if cache is not None else None
+                if cached is None:
+                    print(f"Predicting {len(dataset)} images: {backend} @ {input_size}px, batch {batch_size}")
+                    cached = run_predictions(model, dataset, batch_size, input_size, load_workers)
+                    if cache is not None:
+                        cache.save(key, *cached)
+                predictions, shapes, timings = cached
+                if ground_truth is None:
+                    ground_truth = load_ground_truth(dataset, shapes, names)
+                detection = evaluate_detections(predictions, ground_truth, names.values())
+                classes[f"{backend}@{input_size}/b{batch_size}"] = detection['classes']
+                speed = latency_stats(*timings)
+                for conf in conf_thresholds:
+                    compliance = evaluate_compliance(predictions, ground_truth, conf)
+                    rows.append({
+                        'backend': backend,
+                        'input_size': input_size,
+                        'batch_size': batch_size,
+                        'conf': conf,
+                        **speed,
+                        'map50': detection['map50'],
+                        'map': detection['map'],
+                        'compliance_precision': compliance['violation']['precision'],
+                        'compliance_recall': compliance['violation']['recall'],
+                        'compliance_f1': compliance['violation']['f1'],
+                        'items': compliance['items'],
+                    })
+    pareto_front(rows, value=objective)
+    return {'rows': rows, 'classes': classes}
+
+
+def load_summary(path=DEFAULT_SUMMARY_PATH):
+    """Saved evaluation results, or None when no evaluation has been run"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def headline(summary, backend=None, input_size=640, conf=0.5):
+    """
+    Row of a saved evaluation closest to the running configuration
+
+    Prefers an exact backend / input size / confidence match and falls back
+    to the most accurate row.
+    """
+    rows = (summary or {}).get('rows') or []
+    if not rows:
+        return None
+    exact = [row for row in rows
+             if row['backend'] == backend and row['input_size'] == input_size and abs(row['conf'] - conf) < 1e-6]
+    return max(exact or rows, key=lambda row: row['map50'])
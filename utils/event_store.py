@@ -0,0 +1,482 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from utils import metrics
+from utils.detection import REQUIRED_PPE
+
+DEFAULT_DB_PATH = os.path.join("data", "events.db")
+SNAPSHOT_WIDTH = 320
+# Resolution of the pre-aggregated frame counts used by reports; a quarter hour
+# keeps a month of 40 cameras to a few hundred thousand rows
+ROLLUP_SECONDS = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    stream TEXT NOT NULL,
+    ts REAL NOT NULL,
+    missing_mask INTEGER NOT NULL,
+    workers INTEGER NOT NULL,
+    zone TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_frames_stream_ts ON frames (stream, ts);
+CREATE INDEX IF NOT EXISTS idx_frames_ts ON frames (ts);
+
+-- Frame counts per ROLLUP_SECONDS period, kept up to date by the writer so reports never scan raw frames
+CREATE TABLE IF NOT EXISTS frame_rollup (
+    stream TEXT NOT NULL,
+    zone TEXT NOT NULL DEFAULT '',
+    period REAL NOT NULL,
+    missing_mask INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    PRIMARY KEY (stream, zone, period, missing_mask)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_period ON frame_rollup (period);
+
+CREATE TABLE IF NOT EXISTS detections (
+    stream TEXT NOT NULL,
+    ts REAL NOT NULL,
+    item TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    zone TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detections_stream_ts ON detections (stream, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_item_ts ON detections (item, ts);
+
+CREATE TABLE IF NOT EXISTS episodes (
+    stream TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    item TEXT NOT NULL,
+    zone TEXT,
+    start REAL NOT NULL,
+    end REAL,
+    duration REAL,
+    UNIQUE (stream, subject, item, start)
+);
+CREATE INDEX IF NOT EXISTS idx_episodes_stream_start ON episodes (stream, start);
+CREATE INDEX IF NOT EXISTS idx_episodes_item_start ON episodes (item, start);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    stream TEXT NOT NULL,
+    ts REAL NOT NULL,
+    zone TEXT,
+    items TEXT NOT NULL,
+    image BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_stream_ts ON snapshots (stream, ts);
+"""
+
+_INSERTS = {
+    'frames': "INSERT INTO frames (stream, ts, missing_mask, workers, zone) VALUES (?, ?, ?, ?, ?)",
+    'detections': "INSERT INTO detections (stream, ts, item, count, zone) VALUES (?, ?, ?, ?, ?)",
+    # A re-opened episode reports its end again with the same start: keep the latest
+    'episodes': (
+        "INSERT INTO episodes (stream, subject, item, zone, start, end, duration) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (stream, subject, item, start) DO UPDATE SET end = excluded.end, duration = excluded.duration"
+    ),
+    'frame_rollup': (
+        "INSERT INTO frame_rollup (stream, zone, period, missing_mask, frames) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (stream, zone, period, missing_mask) DO UPDATE SET frames = frames + excluded.frames"
+    ),
+    'snapshots': "INSERT INTO snapshots (stream, ts, zone, items, image) VALUES (?, ?, ?, ?, ?)",
+}
+
+
+def missing_mask(missing):
+    """Bitmask of missing items (bit i = REQUIRED_PPE[i])"""
+    mask = 0
+    for item in missing:
+        if item in REQUIRED_PPE:
+            mask |= 1 << REQUIRED_PPE.index(item)
+    return mask
+
+
+def mask_items(mask):
+    """Inverse of missing_mask"""
+    return [item for i, item in enumerate(REQUIRED_PPE) if mask & (1 << i)]
+
+
+def _thumbnail(frame, width=SNAPSHOT_WIDTH, quality=70):
+    """Small JPEG of a BGR frame for report snapshots"""
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def _rollup(frame_rows):
+    """Collapse frame rows into frame_rollup upserts"""
+    counts = Counter(
+        (stream, zone or '', ts - ts % ROLLUP_SECONDS, mask) for stream, ts, mask, _, zone in frame_rows
+    )
+    return [key + (n,) for key, n in counts.items()]
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL: durable on checkpoint, no fsync per transaction
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class EventStore:
+    """
+    Local SQLite (WAL) store for frame results, detections and violation episodes
+
+    `record_*` calls only enqueue rows and never block: a background writer
+    drains the queue in batched transactions (up to `batch_size` rows or every
+    `flush_interval` seconds). When the queue is full rows are dropped and
+    counted rather than stalling inference. Queries use their own per-thread
+    read connections, which WAL lets run alongside the writer.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=1000, flush_interval=0.5, max_queue=200000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = _connect(path)
+        with conn:
+            conn.executescript(SCHEMA)
+            self._backfill_rollup(conn)
+        conn.close()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._local = threading.local()
+        self._closed = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="event-store", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _backfill_rollup(conn):
+        """Build frame_rollup for databases written before it existed"""
+        if conn.execute("SELECT 1 FROM frame_rollup LIMIT 1").fetchone():
+            return
+        if not conn.execute("SELECT 1 FROM frames LIMIT 1").fetchone():
+            return
+        conn.execute(
+            "INSERT INTO frame_rollup (stream, zone, period, missing_mask, frames) "
+            "SELECT stream, COALESCE(zone, ''), CAST(ts / ? AS INTEGER) * ? AS period, missing_mask, COUNT(*) "
+            "FROM frames GROUP BY stream, COALESCE(zone, ''), period, missing_mask",
+            [ROLLUP_SECONDS, ROLLUP_SECONDS])
+
+    # -- writes --------------------------------------------------------------
+
+    def _enqueue(self, table, row):
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_frame(self, stream, ts, missing, counts=None, workers=0, zone=None):
+        """
+        Queue one processed frame
+
+        Args:
+            stream: Stream / camera identifier
+            ts: Capture time (epoch seconds; offline audits offset video time by the recording start)
+            missing: Missing items for the frame
+            counts: Detected class counts ({name: n}); required items are stored
+            workers: Number of persons in the frame
+            zone: Optional zone name. Zoned cameras record each frame once
+                without a zone (stream and site totals count only those rows)
+                and once per zone (for the zone ranking)
+        """
+        self._enqueue('frames', (stream, ts, missing_mask(missing), workers, zone))
+        for item, count in (counts or {}).items():
+            if item in REQUIRED_PPE:
+                self._enqueue('detections', (stream, ts, item, int(count), zone))
+
+    def record_episode(self, event, zone=None):
+        """Queue an episode start/end event from ViolationEpisodes (upserted)"""
+        self._enqueue('episodes', (event['stream'], event['subject'], event['item'], event.get('zone', zone),
+                                   event['start'], event['end'], event['end'] and event['duration']))
+
+    def record_snapshot(self, stream, ts, frame, missing, zone=None):
+        """Queue a thumbnail of a violation frame (encoded on the writer thread)"""
+        if frame is not None and frame.size:
+            self._enqueue('snapshots', (stream, ts, zone, ",".join(missing), frame))
+
+    def _drain(self, first):
+        """Collect up to batch_size rows, waiting at most flush_interval"""
+        rows = {table: [] for table in _INSERTS}
+        table, row = first
+        rows[table].append(row)
+        taken = 1
+        deadline = time.monotonic() + self.flush_interval
+        while taken < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                table, row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            rows[table].append(row)
+            taken += 1
+        return rows, taken
+
+    def _run(self):
+        conn = _connect(self.path)
+        try:
+            while not (self._closed.is_set() and self._queue.empty()):
+                try:
+                    first = self._queue.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                rows, taken = self._drain(first)
+                try:
+                    rows['frame_rollup'] = _rollup(rows['frames'])
+                    if rows['snapshots']:
+                        rows['snapshots'] = [row[:4] + (_thumbnail(row[4]),) for row in rows['snapshots']]
+                    with conn:
+                        for table, batch in rows.items():
+                            if batch:
+                                conn.executemany(_INSERTS[table], batch)
+                    self.written += taken
+                    self.batches += 1
+                except (sqlite3.Error, cv2.error) as e:
+                    print(f"Event store write failed: {e}")
+                    self.dropped += taken
+                finally:
+                    for _ in range(taken):
+                        self._queue.task_done()
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer"""
+        self._closed.set()
+        self._thread.join()
+
+    # -- queries -------------------------------------------------------------
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    @staticmethod
+    def _where(stream=None, start=None, end=None, item=None, ts_column='ts'):
+        clauses, params = [], []
+        if stream is not None:
+            clauses.append("stream = ?")
+            params.append(stream)
+        if item is not None:
+            clauses.append("item = ?")
+            params.append(item)
+        if start is not None:
+            clauses.append(f"{ts_column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{ts_column} < ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _frame_counts(self, stream=None, start=None, end=None, stream_level=False):
+        """
+        Exact frame counts over [start, end) as a (stream, zone, t, missing_mask, frames) subquery
+
+        Whole ROLLUP_SECONDS periods inside the window come from the rollup
+        (t = period start); the partial periods at either edge are counted
+        from raw frames (t = ts), so windows need not be rollup-aligned.
+        `stream_level` keeps only the whole-frame rows (zone unset), which
+        count each frame once even for zoned cameras.
+
+        Returns:
+            tuple: (sql, params)
+        """
+        # Full periods are [first_full, last_full)
+        first_full = None if start is None else -(-start // ROLLUP_SECONDS) * ROLLUP_SECONDS
+        last_full = None if end is None else end - end % ROLLUP_SECONDS
+        if first_full is not None and last_full is not None and last_full < first_full:
+            # Window inside one period: raw frames only
+            last_full = first_full
+
+        def only_streams(where, condition):
+            if not stream_level:
+                return where
+            return where + (" AND " if where else " WHERE ") + condition
+
+        parts, params = [], []
+        where, where_params = self._where(stream, first_full, last_full, ts_column='period')
+        parts.append("SELECT stream, zone, period AS t, missing_mask, frames FROM frame_rollup"
+                     + only_streams(where, "zone = ''"))
+        params += where_params
+        raw = "SELECT stream, COALESCE(zone, '') AS zone, ts AS t, missing_mask, 1 AS frames FROM frames"
+        if start is not None and start < first_full:
+            where, where_params = self._where(stream, start, min(first_full, end) if end is not None else first_full)
+            parts.append(raw + only_streams(where, "zone IS NULL"))
+            params += where_params
+        if end is not None and last_full < end:
+            where, where_params = self._where(stream, max(last_full, start) if start is not None else last_full, end)
+            parts.append(raw + only_streams(where, "zone IS NULL"))
+            params += where_params
+        return " UNION ALL ".join(parts), params
+
+    def episodes(self, start=None, end=None, stream=None, item=None, limit=1000):
+        """Violation episodes that started in [start, end), newest first"""
+        where, params = self._where(stream, start, end, item, ts_column='start')
+        cursor = self._reader().execute(
+            f"SELECT stream, subject, item, zone, start, end, duration FROM episodes{where} "
+            f"ORDER BY start DESC LIMIT ?", params + [limit])
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def item_summary(self, start=None, end=None, stream=None):
+        """
+        Per-item aggregates over [start, end)
+
+        Returns:
+            dict: item -> {'missing_frames', 'detections', 'episodes', 'violation_seconds'}
+        """
+        conn = self._reader()
+        summary = {item: {'missing_frames': 0, 'detections': 0, 'episodes': 0, 'violation_seconds': 0.0}
+                   for item in REQUIRED_PPE}
+
+        source, params = self._frame_counts(stream, start, end, stream_level=True)
+        bits = ", ".join(f"SUM(((missing_mask >> {i}) & 1) * frames)" for i in range(len(REQUIRED_PPE)))
+        row = conn.execute(f"SELECT {bits} FROM ({source})", params).fetchone()
+        for item, n in zip(REQUIRED_PPE, row):
+            summary[item]['missing_frames'] = n or 0
+
+        where, params = self._where(stream, start, end)
+        where += (" AND " if where else " WHERE ") + "zone IS NULL"
+        for item, n in conn.execute(f"SELECT item, SUM(count) FROM detections{where} GROUP BY item", params):
+            summary[item]['detections'] = n
+
+        for item, stats in self.item_episodes(start, end, stream).items():
+            summary[item].update(stats)
+        return summary
+
+    def item_episodes(self, start=None, end=None, stream=None):
+        """Episode count and violation seconds per item"""
+        where, params = self._where(stream, start, end, ts_column='start')
+        return {
+            item: {'episodes': n, 'violation_seconds': seconds or 0.0}
+            for item, n, seconds in self._reader().execute(
+                f"SELECT item, COUNT(*), SUM(COALESCE(duration, 0)) FROM episodes{where} GROUP BY item", params)
+        }
+
+    def stream_counters(self, start=None, end=None):
+        """
+        Per-stream counters over [start, end), from whole-frame rows only
+
+        Returns:
+            dict: stream -> {'frames', 'violation_frames', 'compliance_rate', 'first', 'last'}
+        """
+        where, params = self._where(None, start, end)
+        where += (" AND " if where else " WHERE ") + "zone IS NULL"
+        counters = {}
+        for stream, frames, violations, first, last in self._reader().execute(
+                f"SELECT stream, COUNT(*), SUM(missing_mask != 0), MIN(ts), MAX(ts) FROM frames{where} "
+                f"GROUP BY stream", params):
+            counters[stream] = {
+                'frames': frames,
+                'violation_frames': violations,
+                'compliance_rate': 1.0 - violations / frames if frames else 1.0,
+                'first': first,
+                'last': last,
+            }
+        return counters
+
+    def iter_frame_groups(self, start=None, end=None, stream=None, bucket_seconds=3600.0, chunk_size=50000):
+        """
+        Stream frame counts grouped by (stream, zone, time bucket, missing mask)
+
+        Reads the frame rollup, plus raw frames for the partial periods at
+        the window edges; the groups come back in chunks of numpy arrays so
+        callers can aggregate with bincount instead of Python loops.
+
+        Yields:
+            dict: 'stream', 'zone' (object arrays), 'bucket', 'mask', 'count' (int arrays)
+        """
+        source, params = self._frame_counts(stream, start, end)
+        origin = start if start is not None else 0.0
+        cursor = self._reader().execute(
+            f"SELECT stream, NULLIF(zone, ''), CAST((t - ?) / ? AS INTEGER) AS bucket, missing_mask, "
+            f"SUM(frames) FROM ({source}) GROUP BY stream, zone, bucket, missing_mask",
+            [origin, bucket_seconds] + params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            streams, zones, buckets, masks, counts = zip(*rows)
+            yield {
+                'stream': np.array(streams, dtype=object),
+                'zone': np.array(zones, dtype=object),
+                'bucket': np.array(buckets, dtype=np.int64),
+                'mask': np.array(masks, dtype=np.int64),
+                'count': np.array(counts, dtype=np.int64),
+            }
+
+    def streams(self):
+        """Every stream with recorded frames"""
+        return [row[0] for row in self._reader().execute("SELECT DISTINCT stream FROM frame_rollup ORDER BY stream")]
+
+    def time_range(self, stream=None):
+        """(first, last) frame timestamps, or (None, None) when empty"""
+        where, params = self._where(stream)
+        return tuple(self._reader().execute(f"SELECT MIN(ts), MAX(ts) FROM frames{where}", params).fetchone())
+
+    def zone_episodes(self, start=None, end=None, stream=None):
+        """Episode count and violation seconds per zone (the stream when no zone is set)"""
+        where, params = self._where(stream, start, end, ts_column='start')
+        return {
+            zone: {'episodes': n, 'violation_seconds': seconds or 0.0}
+            for zone, n, seconds in self._reader().execute(
+                f"SELECT COALESCE(zone, stream) AS z, COUNT(*), SUM(COALESCE(duration, 0)) "
+                f"FROM episodes{where} GROUP BY z", params)
+        }
+
+    def snapshots(self, zone, start=None, end=None, limit=1):
+        """Latest violation thumbnails for a zone (or stream): dicts with 'image' JPEG bytes"""
+        where, params = self._where(None, start, end)
+        where += (" AND " if where else " WHERE ") + "COALESCE(zone, stream) = ?"
+        cursor = self._reader().execute(
+            f"SELECT stream, ts, zone, items, image FROM snapshots{where} ORDER BY ts DESC LIMIT ?",
+            params + [zone, limit])
+        return [
+            {'stream': stream, 'ts': ts, 'zone': zone, 'items': items.split(",") if items else [], 'image': image}
+            for stream, ts, zone, items, image in cursor
+        ]
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide event store (path from PPE_EVENT_DB, created on first use)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EventStore(os.environ.get("PPE_EVENT_DB", DEFAULT_DB_PATH))
+                metrics.register_collector("event_store", lambda: [
+                    (f"ppe_event_store_{name}", {}, value) for name, value in _store.stats().items()
+                ])
+    return _store
@@ -0,0 +1,113 @@
+import base64
+import json
+import os
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import cv2
+import numpy as np
+
+DEFAULT_SERVER_URL = os.environ.get("PPE_INFERENCE_URL", "")
+
+
+class InferenceServerError(Exception):
+    """The inference server was unreachable or rejected the request"""
+
+
+def _decode_annotated(body):
+    encoded = body.get('annotated')
+    if not encoded:
+        return None
+    data = np.frombuffer(base64.b64decode(encoded), dtype=np.uint8)
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+class InferenceClient:
+    """
+    Client for inference_server.py
+
+    Results come back in the same shape as detect_ppe, so callers can swap
+    a local model for the server. Concurrent calls (see iter_batches) are
+    what let the server fill its dynamic batches.
+    """
+
+    def __init__(self, url, timeout=30.0, jpeg_quality=90, concurrency=8):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.jpeg_quality = jpeg_quality
+        self.concurrency = concurrency
+
+    def _request(self, path, data=None, content_type=None):
+        request = urllib.request.Request(self.url + path, data=data)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise InferenceServerError(f"{e.code}: {message}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise InferenceServerError(f"Inference server {self.url} unreachable: {e}") from e
+
+    def health(self):
+        return self._request("/health")
+
+    def detect_bytes(self, data, conf_threshold=0.5, annotate=False, content_type="image/jpeg"):
+        """
+        Send already-encoded JPEG/PNG bytes
+
+        Returns:
+            dict: the server's JSON response
+        """
+        query = urlencode({'conf': conf_threshold, 'annotate': int(annotate)})
+        return self._request(f"/detect?{query}", data, content_type)
+
+    def detect(self, frame, conf_threshold=0.5, annotate=True, data=None):
+        """
+        detect_ppe over HTTP
+
+        Args:
+            frame: BGR frame (encoded as JPEG unless `data` is given)
+            conf_threshold: Minimum confidence score (0-1)
+            annotate: Ask for the overlay image
+            data: Original upload bytes, sent as-is to skip re-encoding
+
+        Returns:
+            tuple: (annotated_frame, missing_items, detected_counts, workers);
+            the annotated frame is the input when no overlay was requested
+        """
+        if data is None:
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise InferenceServerError("Could not encode frame as JPEG")
+            data = jpeg.tobytes()
+        body = self.detect_bytes(data, conf_threshold, annotate)
+        annotated = _decode_annotated(body) if annotate else None
+        return (annotated if annotated is not None else frame, body['missing'], body['counts'],
+                body['workers'])
+
+    def iter_batches(self, frames, batch_size=8, conf_threshold=0.5, annotate=True):
+        """
+        Same contract as iter_ppe_batches, with each batch sent as concurrent requests
+
+        Yields:
+            list: (annotated_frame, missing_items, detected_counts) per frame
+        """
+        def run(frame):
+            return self.detect(frame, conf_threshold, annotate)[:3]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            chunk = []
+            for frame in frames:
+                chunk.append(frame)
+                if len(chunk) == batch_size:
+                    yield list(pool.map(run, chunk))
+                    chunk = []
+            if chunk:
+                yield list(pool.map(run, chunk))
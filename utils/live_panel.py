@@ -0,0 +1,115 @@
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import streamlit as st
+
+from utils import metrics
+
+
+def violation_html(missing):
+    return f"""
+    <div style="background: #FFF3E0; padding: 15px; border-radius: 8px;
+                border-left: 4px solid #FFA000; margin: 10px 0;">
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20"
+                viewBox="0 0 24 24" fill="none" stroke="#FFA000"
+                stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                <circle cx="12" cy="12" r="10"></circle>
+                <line x1="12" y1="8" x2="12" y2="12"></line>
+                <line x1="12" y1="16" x2="12" y2="16"></line>
+            </svg>
+            <h4 style="color: #FFA000; margin: 0;">Safety Violation Detected</h4>
+        </div>
+        <p style="color: #5D4037; margin: 8px 0 0 0;">
+            Missing equipment: {', '.join(missing)}
+        </p>
+    </div>
+    """
+
+
+def success_html():
+    return """
+    <div style="background: #E8F5E9; padding: 15px; border-radius: 8px;
+                border-left: 4px solid #4CAF50; margin: 10px 0;">
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20"
+                viewBox="0 0 24 24" fill="none" stroke="#4CAF50"
+                stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                <path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path>
+                <polyline points="22 4 12 14.01 9 11.01"></polyline>
+            </svg>
+            <h4 style="color: #4CAF50; margin: 0;">All PPE Detected</h4>
+        </div>
+        <p style="color: #2E7D32; margin: 8px 0 0 0;">
+            Worker is properly equipped
+        </p>
+    </div>
+    """
+
+
+def encode_jpeg(frame, quality=70):
+    """BGR frame -> JPEG bytes (much smaller over the websocket than a raw array)"""
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+class LiveStatusPanel:
+    """
+    Fixed-size live view: one frame slot, one status card, a bounded event list
+
+    Every element lives in a placeholder that is overwritten in place, so the
+    page never grows. The status card and event list are only re-sent when
+    the compliance state changes, and frames are JPEG-compressed and pushed
+    at most `max_fps` times per second.
+    """
+
+    def __init__(self, max_events=8, max_fps=5.0, jpeg_quality=70, caption="Live PPE Detection - Worker View"):
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+        self.caption = caption
+        self.frame_placeholder = st.empty()
+        self.status_placeholder = st.empty()
+        self.events_placeholder = st.empty()
+        self.events = deque(maxlen=max_events)
+        self._state = None
+        self._last_push = 0.0
+        self.frames_pushed = 0
+        self.bytes_pushed = 0
+
+    def update(self, frame, missing):
+        """
+        Show a new result; returns True if the compliance state changed
+        """
+        now = time.time()
+        if frame is not None and now - self._last_push >= 1.0 / self.max_fps:
+            with metrics.stage_timer("ui_push"):
+                data = encode_jpeg(frame, self.jpeg_quality)
+                self.frame_placeholder.image(data, use_container_width=True, caption=self.caption)
+            metrics.inc("ppe_ui_bytes_total", len(data))
+            self._last_push = now
+            self.frames_pushed += 1
+            self.bytes_pushed += len(data)
+
+        state = tuple(missing)
+        if state == self._state:
+            return False
+
+        self._state = state
+        if missing:
+            self.status_placeholder.markdown(violation_html(missing), unsafe_allow_html=True)
+            event = f"⚠️ Missing: {', '.join(missing)}"
+        else:
+            self.status_placeholder.markdown(success_html(), unsafe_allow_html=True)
+            event = "✅ All PPE detected"
+        self.events.appendleft(f"`{datetime.now().strftime('%H:%M:%S')}` {event}")
+        self.events_placeholder.markdown("**Recent events**\n\n" + "\n".join(f"- {e}" for e in self.events))
+        return True
+
+    def clear(self):
+        self.frame_placeholder.empty()
+        self.status_placeholder.empty()
+        self.events_placeholder.empty()
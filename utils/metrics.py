@@ -0,0 +1,336 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds (Prometheus `le` bounds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STAGES = ("capture", "preprocess", "inference", "postprocess", "render", "ui_push", "alert")
+DEFAULT_PORT = 9108
+
+_enabled = os.environ.get("PPE_METRICS") == "1"
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within the bucket)"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class RateMeter:
+    """Events per second over a sliding window"""
+
+    def __init__(self, window=10.0):
+        self.window = window
+        self._times = deque()
+        self._lock = threading.Lock()
+
+    def tick(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._times.append(now)
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+    def rate(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._trim(now)
+            if len(self._times) < 2:
+                return 0.0
+            return (len(self._times) - 1) / max(self._times[-1] - self._times[0], 1e-6)
+
+
+class Registry:
+    """
+    Stage histograms, counters, rolling rates and pull-style collectors
+
+    Collectors are callables returning (name, labels, value) tuples, read only
+    when metrics are exported, so components like the event store or pipeline
+    report queue depths without doing any work per frame.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._rates = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, **labels):
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def tick(self, name, **labels):
+        key = (name, _label_key(labels))
+        meter = self._rates.get(key)
+        if meter is None:
+            with self._lock:
+                meter = self._rates.setdefault(key, RateMeter())
+        meter.tick()
+
+    def register_collector(self, key, fn):
+        with self._lock:
+            self._collectors[key] = fn
+
+    def unregister_collector(self, key):
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def collect(self):
+        """Current values from every collector as (name, label key, value)"""
+        with self._lock:
+            collectors = list(self._collectors.items())
+        samples = []
+        for key, fn in collectors:
+            try:
+                for name, labels, value in fn():
+                    samples.append((name, _label_key(labels), value))
+            except Exception as e:
+                print(f"Metrics collector {key!r} failed: {e}")
+        return samples
+
+    def render(self):
+        """Prometheus text exposition format (one HELP/TYPE block per metric family)"""
+        families = {}
+
+        def family(name, kind, help_text=None):
+            entry = families.get(name)
+            if entry is None:
+                entry = families[name] = (kind, help_text, [])
+            return entry[2]
+
+        for (name, key), histogram in sorted(list(self._histograms.items()), key=lambda item: item[0]):
+            lines = family(name, "histogram", "Stage latency in seconds")
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, n in zip(histogram.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        with self._lock:
+            counters = list(self._counters.items())
+            rates = list(self._rates.items())
+        for (name, key), value in sorted(counters):
+            family(name, "counter").append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), meter in sorted(rates, key=lambda item: item[0]):
+            family(f"{name}_fps", "gauge").append(f"{name}_fps{_format_labels(key)} {meter.rate():.3f}")
+        for name, key, value in sorted(self.collect(), key=lambda sample: sample[:2]):
+            kind = "counter" if name.endswith("_total") else "gauge"
+            family(name, kind).append(f"{name}{_format_labels(key)} {float(value):g}")
+
+        output = []
+        for name, (kind, help_text, lines) in families.items():
+            if help_text:
+                output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output += lines
+        return "\n".join(output) + "\n"
+
+    def snapshot(self):
+        """Summary for the debug panel"""
+        stages = []
+        for (name, key), histogram in sorted(self._histograms.items()):
+            stages.append({
+                'metric': name,
+                **dict(key),
+                'count': histogram.count,
+                'mean_ms': 1000 * histogram.sum / histogram.count if histogram.count else 0.0,
+                'p50_ms': 1000 * histogram.quantile(0.5),
+                'p95_ms': 1000 * histogram.quantile(0.95),
+            })
+        rates = {f"{name}{_format_labels(key)}": meter.rate() for (name, key), meter in list(self._rates.items())}
+        counters = {f"{name}{_format_labels(key)}": value for (name, key), value in list(self._counters.items())}
+        gauges = {f"{name}{_format_labels(key)}": value for name, key, value in self.collect()}
+        return {'stages': stages, 'rates': rates, 'counters': counters, 'gauges': gauges}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._rates.clear()
+
+
+registry = Registry()
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+class _StageTimer:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe("ppe_stage_seconds", time.perf_counter() - self.start, stage=self.stage, **self.labels)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def stage_timer(stage, **labels):
+    """Context manager timing one pipeline stage; a shared no-op when metrics are off"""
+    if not _enabled:
+        return _NOOP
+    return _StageTimer(stage, labels)
+
+
+def observe_stage(stage, seconds, **labels):
+    if _enabled:
+        registry.observe("ppe_stage_seconds", seconds, stage=stage, **labels)
+
+
+def inc(name, value=1, **labels):
+    if _enabled:
+        registry.inc(name, value, **labels)
+
+
+def tick(name, **labels):
+    """Count one event towards the rolling `<name>_fps` gauge"""
+    if _enabled:
+        registry.tick(name, **labels)
+
+
+def register_collector(key, fn):
+    registry.register_collector(key, fn)
+
+
+def unregister_collector(key):
+    registry.unregister_collector(key)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the console
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=DEFAULT_PORT, host="0.0.0.0"):
+    """Start the Prometheus /metrics endpoint once per process; returns the bound port"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server.server_address[1]
+
+
+def enable(port=None):
+    """Turn instrumentation on (and the HTTP endpoint when `port` is given)"""
+    global _enabled
+    _enabled = True
+    if port:
+        return serve(port)
+    return None
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def endpoint_port():
+    """Port of the running /metrics endpoint, or None"""
+    return _server.server_address[1] if _server is not None else None
+
+
+if _enabled and os.environ.get("PPE_METRICS_PORT"):
+    try:
+        serve(int(os.environ["PPE_METRICS_PORT"]))
+    except (OSError, ValueError) as e:
+        print(f"Metrics endpoint not started: {e}")
@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+
+from utils import metrics
+from utils.backends import configured_backend, load_backend
+
+# Process-wide model cache shared by every Streamlit session and rerun
+_models = {}
+_lock = threading.Lock()
+
+DEFAULT_MODEL_PATH = "models/best.pt"
+WARMUP_SIZE = 640
+
+metrics.register_collector("model_registry", lambda: [("ppe_models_loaded", {}, len(_models))])
+
+
+def _warmup(model):
+    """Run one dummy inference so the first real frame isn't slowed down (and a broken model fails here)"""
+    from utils.detection import detect_ppe
+
+    dummy = np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8)
+    detect_ppe(model, dummy, raise_errors=True)
+
+
+def get_model(path=DEFAULT_MODEL_PATH, warmup=True, backend=None):
+    """
+    Return the model for `path`, loading it once per process
+
+    Args:
+        path: Checkpoint path
+        warmup: Run a dummy 640px inference after the first load
+        backend: "pytorch", "onnx", "openvino" (optionally with "-int8");
+            defaults to the PPE_BACKEND environment variable
+
+    Returns:
+        Loaded model instance (raises on load or warmup failure)
+    """
+    key = f"{path}:{backend or configured_backend()}"
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = load_backend(path, backend)
+            if warmup:
+                # Not cached when this raises, so the next call retries the load
+                _warmup(model)
+            _models[key] = model
+    return model
+
+
+def loaded_models():
+    """Keys ("path:backend") of all models currently held in the registry"""
+    return list(_models)
+
+
+def clear_models():
+    """Drop all cached models (e.g. after exporting a new checkpoint)"""
+    with _lock:
+        _models.clear()
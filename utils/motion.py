@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Decides whether a frame changed enough to be worth running the model on
+
+    Frames are compared as small blurred grayscale images, either against the
+    last frame that went through inference ("diff") or against a running
+    average background ("background"). Skipped frames reuse the last result.
+
+    Args:
+        method: "diff" or "background"
+        pixel_threshold: Per-pixel intensity change counted as motion (0-255)
+        min_changed_ratio: Fraction of changed pixels needed to run inference
+        downscale_width: Width of the comparison image
+        max_skipped: Force inference after this many consecutive skips (0 = never)
+        bg_alpha: Background learning rate for the "background" method
+    """
+
+    def __init__(self, method="diff", pixel_threshold=25, min_changed_ratio=0.002,
+                 downscale_width=160, max_skipped=150, bg_alpha=0.05):
+        if method not in ("diff", "background"):
+            raise ValueError(f"Unknown motion gate method: {method}")
+        self.method = method
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.downscale_width = downscale_width
+        self.max_skipped = max_skipped
+        self.bg_alpha = bg_alpha
+        self._reference = None
+        self._last_result = None
+        self._consecutive_skips = 0
+        self.frames = 0
+        self.skipped = 0
+        self.last_changed_ratio = 0.0
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.downscale_width / width
+        small = cv2.resize(frame, (self.downscale_width, max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed(self, frame):
+        """True if the frame differs enough from the reference to need inference"""
+        gray = self._small_gray(frame)
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = gray.astype(np.float32)
+            self.last_changed_ratio = 1.0
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._reference))
+        self.last_changed_ratio = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        moved = self.last_changed_ratio >= self.min_changed_ratio
+        forced = self.max_skipped and self._consecutive_skips >= self.max_skipped
+
+        if self.method == "background":
+            cv2.accumulateWeighted(gray.astype(np.float32), self._reference, self.bg_alpha)
+        elif moved or forced:
+            # Compare against the last frame we actually ran the model on
+            self._reference = gray.astype(np.float32)
+        return bool(moved or forced)
+
+    def should_process(self, frame):
+        """Gate check with skip accounting; False means reuse the last result"""
+        self.frames += 1
+        if self.changed(frame):
+            self._consecutive_skips = 0
+            return True
+        self.skipped += 1
+        self._consecutive_skips += 1
+        return False
+
+    def run(self, frame, detect):
+        """
+        Return detect(frame), or the previous result when nothing changed
+
+        Args:
+            frame: BGR frame
+            detect: Callable taking the frame and returning a detection result
+        """
+        if self.should_process(frame) or self._last_result is None:
+            self._last_result = detect(frame)
+        return self._last_result
+
+    def reset(self):
+        self._reference = None
+        self._last_result = None
+        self._consecutive_skips = 0
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'skip_rate': self.skipped / self.frames if self.frames else 0.0,
+            'changed_ratio': self.last_changed_ratio,
+        }
@@ -0,0 +1,290 @@
+import threading
+import time
+
+import cv2
+
+from utils import metrics
+from utils.detection import detect_ppe
+from utils.tracker import TrackedDetector
+
+
+class LatestSlot:
+    """
+    Single-slot buffer holding only the newest item
+
+    Writers overwrite whatever is waiting, so a slow consumer always sees
+    the freshest item and stale ones are dropped rather than queued.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._consumed = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._seq > self._consumed:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None, after=None):
+        """
+        Wait for an item newer than sequence `after` (default: last consumed)
+
+        Returns:
+            tuple: (seq, item) or (None, None) on timeout
+        """
+        with self._cond:
+            after = self._consumed if after is None else after
+            if not self._cond.wait_for(lambda: self._seq > after, timeout):
+                return None, None
+            self._consumed = self._seq
+            return self._seq, self._item
+
+    def peek(self):
+        with self._cond:
+            return self._seq, self._item
+
+
+class CaptureThread(threading.Thread):
+    """Reads a video source as fast as it delivers, keeping only the latest frame"""
+
+    def __init__(self, source, slot, name="capture", pace=False, loop=False, stream_id="live"):
+        super().__init__(name=name, daemon=True)
+        self.source = source
+        self.stream_id = stream_id
+        self.slot = slot
+        # Video files: play back at native FPS / restart at EOF to mimic a camera
+        self.pace = pace
+        self.loop = loop
+        self.error = None
+        self.frames_read = 0
+        self._stop_event = threading.Event()
+        self._cam = None
+
+    def run(self):
+        try:
+            self._cam = cv2.VideoCapture(self.source)
+            if not self._cam.isOpened():
+                self.error = f"Failed to open video source {self.source!r}"
+                return
+            fps = self._cam.get(cv2.CAP_PROP_FPS) if self.pace else 0
+            interval = 1.0 / fps if fps and fps > 0 else 0
+            next_frame = time.time()
+            rewound = False
+            while not self._stop_event.is_set():
+                with metrics.stage_timer("capture", stream=self.stream_id):
+                    ret, frame = self._cam.read()
+                if not ret:
+                    if self.loop and self.frames_read and not rewound:
+                        self._cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        rewound = True
+                        continue
+                    self.error = "Camera disconnected"
+                    break
+                rewound = False
+                self.frames_read += 1
+                self.slot.put((time.time(), frame))
+                if interval:
+                    next_frame += interval
+                    delay = next_frame - time.time()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+        except Exception as e:
+            self.error = f"Capture error: {e}"
+        finally:
+            if self._cam is not None:
+                self._cam.release()
+            # Wake consumers so they notice the capture ended
+            self.slot.put(None)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    """Runs detection on the newest captured frame and publishes the result"""
+
+    def __init__(self, model, frame_slot, result_slot, conf_threshold=0.5, detect_interval=1,
+                 motion_gate=None, name="inference", zone_detector=None, controller=None):
+        super().__init__(name=name, daemon=True)
+        self.model = model
+        self.frame_slot = frame_slot
+        self.result_slot = result_slot
+        self.conf_threshold = conf_threshold
+        # With an interval > 1, frames between full detections are tracked only
+        self.tracked = None
+        if detect_interval > 1:
+            self.tracked = TrackedDetector(model, detect_interval, conf_threshold=conf_threshold)
+        # Optional QualityController: its settings override the fixed ones above
+        self.controller = controller
+        self._skipped = 0
+        # Optional MotionGate: unchanged frames keep the last published result
+        self.motion_gate = motion_gate
+        # Optional ZoneDetector (zones of interest / tiling) replaces both of the
+        # above; a controller still sets its resolution and threshold, but it
+        # has no tracking, so detect_interval does not apply to it
+        self.zone_detector = zone_detector
+        self.frames_processed = 0
+        self.last_inference_time = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            seq, item = self.frame_slot.get(timeout=0.5)
+            if seq is None:
+                continue
+            if item is None:
+                # Capture ended
+                break
+
+            captured_at, frame = item
+            settings = self.controller.settings if self.controller is not None else None
+            if settings is not None and settings['stride'] > 1:
+                # Stride: only every Nth captured frame is worth a result
+                self._skipped += 1
+                if self._skipped < settings['stride']:
+                    continue
+                self._skipped = 0
+            if self.motion_gate is not None and not self.motion_gate.should_process(frame):
+                continue
+            start = time.time()
+            try:
+                if self.zone_detector is not None:
+                    if settings is not None:
+                        self.zone_detector.conf_threshold = settings['conf_threshold']
+                        self.zone_detector.input_size = settings['input_size']
+                    output_frame, missing, counts, workers = self.zone_detector.process(frame, return_workers=True)
+                elif settings is not None:
+                    output_frame, missing, counts, workers = self._adaptive_process(frame, settings)
+                elif self.tracked is not None:
+                    output_frame, missing, counts, workers = self.tracked.process(frame, return_workers=True)
+                else:
+                    output_frame, missing, counts, workers = detect_ppe(self.model, frame, self.conf_threshold,
+                                                                         return_workers=True, raise_errors=True)
+            except Exception as e:
+                print(f"Inference worker error: {e}")
+                metrics.inc("ppe_inference_errors_total", stream="live")
+                continue
+            now = time.time()
+            self.last_inference_time = now - start
+            self.frames_processed += 1
+            if self.controller is not None:
+                self.controller.observe(self.last_inference_time, now - captured_at, now)
+            metrics.tick("ppe_inference", stream="live")
+            result = {
+                'frame': output_frame,
+                'missing': missing,
+                'counts': counts,
+                'workers': workers,
+                'captured_at': captured_at,
+                'latency': now - captured_at,
+            }
+            if self.zone_detector is not None and self.zone_detector.zones:
+                result['zones'] = self.zone_detector.last_zones
+            self.result_slot.put(result)
+
+    def _adaptive_process(self, frame, settings):
+        """
+        One frame at the controller's current resolution, threshold and detection interval
+
+        Every level runs through the tracker, even detecting every frame, so
+        worker ids (and per-worker episodes) survive quality steps.
+        """
+        if self.tracked is None or self.tracked.input_size != settings['input_size']:
+            previous = self.tracked
+            self.tracked = TrackedDetector(self.model, settings['detect_interval'],
+                                           conf_threshold=settings['conf_threshold'],
+                                           input_size=settings['input_size'])
+            if previous is not None:
+                # Track boxes live in the letterboxed input's coordinates, whose scale is
+                # proportional to the input size; rescaling keeps worker ids (and so
+                # per-worker episodes) across quality steps
+                previous.tracker.rescale(settings['input_size'] / previous.input_size)
+                self.tracked.tracker = previous.tracker
+        self.tracked.detect_interval = max(1, settings['detect_interval'])
+        self.tracked.conf_threshold = settings['conf_threshold']
+        return self.tracked.process(frame, return_workers=True)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class LivePipeline:
+    """
+    Decoupled capture -> inference -> render pipeline
+
+    Capture and inference each run on their own thread and hand off through
+    single-slot buffers, so end-to-end latency is bounded by one inference
+    time regardless of camera FPS. The caller is the render stage and pulls
+    results with `get_result()`.
+    """
+
+    def __init__(self, model, source=0, conf_threshold=0.5, detect_interval=1, motion_gate=None,
+                 zone_detector=None, controller=None):
+        self.frame_slot = LatestSlot()
+        self.result_slot = LatestSlot()
+        self.capture = CaptureThread(source, self.frame_slot)
+        self.controller = controller
+        self.worker = InferenceWorker(model, self.frame_slot, self.result_slot, conf_threshold,
+                                      detect_interval, motion_gate, zone_detector=zone_detector,
+                                      controller=controller)
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.time()
+        self.capture.start()
+        self.worker.start()
+        metrics.register_collector(f"pipeline-{id(self)}", self._metrics)
+        return self
+
+    def _metrics(self):
+        stats = self.stats()
+        return [
+            ("ppe_frames_read_total", {}, stats['frames_read']),
+            ("ppe_frames_processed_total", {}, stats['frames_processed']),
+            ("ppe_frames_dropped_total", {}, stats['frames_dropped']),
+            ("ppe_inference_seconds_last", {}, stats['inference_time']),
+            ("ppe_motion_skip_rate", {}, stats['motion_skip_rate']),
+        ]
+
+    def get_result(self, timeout=1.0):
+        """Newest result not yet rendered, or None on timeout"""
+        _, result = self.result_slot.get(timeout=timeout)
+        return result
+
+    @property
+    def running(self):
+        return self.worker.is_alive()
+
+    @property
+    def error(self):
+        return self.capture.error
+
+    def stop(self, timeout=2.0):
+        metrics.unregister_collector(f"pipeline-{id(self)}")
+        if self.controller is not None:
+            self.controller.close()
+        self.capture.stop()
+        self.worker.stop()
+        self.capture.join(timeout)
+        self.worker.join(timeout)
+
+    def stats(self):
+        elapsed = max(time.time() - (self.started_at or time.time()), 1e-6)
+        return {
+            'frames_read': self.capture.frames_read,
+            'frames_processed': self.worker.frames_processed,
+            'frames_dropped': self.frame_slot.dropped,
+            'inference_fps': self.worker.frames_processed / elapsed,
+            'inference_time': self.worker.last_inference_time,
+            'model_calls': (self.worker.tracked.detections_run if self.worker.tracked
+                            else self.worker.frames_processed),
+            'motion_skip_rate': (self.worker.motion_gate.stats()['skip_rate']
+                                 if self.worker.motion_gate else 0.0),
+            'quality': self.controller.stats() if self.controller else None,
+        }
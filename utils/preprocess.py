@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+
+PAD_VALUE = 114
+
+
+class Letterboxer:
+    """
+    Letterbox frames straight into preallocated, stride-aligned buffers
+
+    Each output shape gets one buffer per slot that is reused on every call,
+    so steady-state preprocessing does a single resize (plus an optional
+    in-place RGB->BGR swap) and no allocations. Because the output is already
+    stride aligned and no larger than `size`, the predictor's own letterbox
+    step becomes a no-op.
+
+    The returned buffer is only valid until the next call for the same slot;
+    copy anything that must outlive it. Not thread-safe: use one instance per
+    thread (see utils.detection).
+    """
+
+    def __init__(self, size=640, stride=32):
+        self.size = size
+        self.stride = stride
+        self._buffers = {}
+        # Content region last written per buffer; padding is refilled only when it moves
+        self._regions = {}
+
+    def output_shape(self, height, width, square=False):
+        """(out_h, out_w, new_h, new_w, scale) for an input of this size"""
+        scale = min(self.size / height, self.size / width)
+        new_h = max(1, int(round(height * scale)))
+        new_w = max(1, int(round(width * scale)))
+        if square:
+            return self.size, self.size, new_h, new_w, scale
+        out_h = -(-new_h // self.stride) * self.stride
+        out_w = -(-new_w // self.stride) * self.stride
+        return out_h, out_w, new_h, new_w, scale
+
+    def __call__(self, frame, rgb=False, square=False, slot=0):
+        """
+        Args:
+            frame: HxWx3 uint8 image
+            rgb: Input is RGB; swap to BGR inside the buffer
+            square: Pad to size x size (for stacking into a batch)
+            slot: Buffer slot, so several letterboxed frames can coexist
+
+        Returns:
+            tuple: (buffer, meta) where meta holds 'scale', 'left', 'top',
+            'width', 'height' (content size) and 'src_shape'
+        """
+        height, width = frame.shape[:2]
+        out_h, out_w, new_h, new_w, scale = self.output_shape(height, width, square)
+        key = (slot, out_h, out_w)
+
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = np.full((out_h, out_w, 3), PAD_VALUE, dtype=np.uint8)
+            self._buffers[key] = buffer
+
+        left = (out_w - new_w) // 2
+        top = (out_h - new_h) // 2
+        region = (left, top, new_w, new_h)
+        if self._regions.get(key, region) != region:
+            buffer.fill(PAD_VALUE)
+        self._regions[key] = region
+
+        content = buffer[top:top + new_h, left:left + new_w]
+        if (new_h, new_w) == (height, width):
+            np.copyto(content, frame)
+        else:
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            cv2.resize(frame, (new_w, new_h), dst=content, interpolation=interpolation)
+        if rgb:
+            cv2.cvtColor(content, cv2.COLOR_RGB2BGR, dst=content)
+
+        meta = {
+            'scale': scale,
+            'left': left,
+            'top': top,
+            'width': new_w,
+            'height': new_h,
+            'src_shape': (height, width),
+        }
+        return buffer, meta
+
+
+def content_view(buffer, meta):
+    """The letterboxed image without its padding (a view into the buffer)"""
+    top, left = meta['top'], meta['left']
+    return buffer[top:top + meta['height'], left:left + meta['width']]
+
+
+def unpad_boxes(boxes, meta):
+    """Map xyxy boxes from buffer coordinates to content (resized frame) coordinates"""
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] -= meta['left']
+    boxes[:, [1, 3]] -= meta['top']
+    return boxes
+
+
+def to_source_boxes(boxes, meta):
+    """Map xyxy boxes from buffer coordinates back to the original frame"""
+    boxes = unpad_boxes(boxes, meta) / meta['scale']
+    height, width = meta['src_shape']
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+    return boxes
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+
+from utils import metrics
+from utils.detection import INPUT_SIZE
+
+DEFAULT_INPUT_SIZES = (640, 512, 416, 320)
+
+
+def quality_ladder(input_sizes=DEFAULT_INPUT_SIZES, max_detect_interval=6, max_stride=3, conf_threshold=0.5,
+                   max_conf_threshold=0.65, conf_step=0.05):
+    """
+    Settings from best quality (level 0) to cheapest, one knob step per level
+
+    Knobs are spent cheapest-to-lose first: tracking between detections,
+    then input resolution, then frame stride, and raising the confidence
+    threshold (fewer boxes to post-process and draw) last.
+
+    Returns:
+        list: dicts with 'input_size', 'detect_interval', 'stride', 'conf_threshold'
+    """
+    current = {
+        'input_size': input_sizes[0],
+        'detect_interval': 1,
+        'stride': 1,
+        'conf_threshold': conf_threshold,
+    }
+    levels = [dict(current)]
+
+    def step(**changes):
+        current.update(changes)
+        levels.append(dict(current))
+
+    for interval in (2, 3, 4, 6, 8):
+        if interval <= max_detect_interval:
+            step(detect_interval=interval)
+    for size in input_sizes[1:]:
+        step(input_size=size)
+    for stride in range(2, max_stride + 1):
+        step(stride=stride)
+    conf = conf_threshold
+    while conf + conf_step <= max_conf_threshold + 1e-9:
+        conf = round(conf + conf_step, 3)
+        step(conf_threshold=conf)
+    return levels
+
+
+class QualityController:
+    """
+    Feedback controller that trades detection quality for a latency / FPS budget
+
+    Callers report each processed frame with `observe(processing_time, lag)`
+    - processing_time is the inference cost of that frame, lag the time from
+    capture to result. Every `interval` seconds the controller compares the
+    recent measurements against the budget:
+
+    - over budget (processing slower than 1 / target_fps, or lag above
+      target_latency) for `patience` checks in a row -> one level cheaper
+    - below `headroom` x budget for `recover_patience` checks -> one level
+      better, so quality comes back when the load drops
+
+    Level changes wait `cooldown` seconds to let the new setting show up in
+    the measurements. A level that had to be abandoned right after an upgrade
+    is not retried for `retry_after` seconds (doubling on each failure), so a
+    step that more than doubles the cost does not oscillate. Decisions are
+    printed, counted in metrics and kept in `decisions`.
+    """
+
+    def __init__(self, target_fps=None, target_latency=None, levels=None, name="live", interval=1.0,
+                 patience=2, recover_patience=5, headroom=0.6, cooldown=3.0, window=30, start_level=0,
+                 retry_after=30.0):
+        """
+        Args:
+            target_fps: Inference rate to sustain per stream
+            target_latency: Capture-to-result budget in seconds
+            levels: Settings ladder (default: quality_ladder())
+            name: Stream name for logs and metrics
+        """
+        if not target_fps and not target_latency:
+            raise ValueError("QualityController needs target_fps or target_latency")
+        self.target_fps = target_fps
+        self.target_latency = target_latency
+        self.levels = levels or quality_ladder()
+        self.name = name
+        self.interval = interval
+        self.patience = patience
+        self.recover_patience = recover_patience
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.retry_after = retry_after
+        self.level = min(max(start_level, 0), len(self.levels) - 1)
+        self.decisions = deque(maxlen=100)
+        self._processing = deque(maxlen=window)
+        self._lag = deque(maxlen=window)
+        self._over = 0
+        self._under = 0
+        self._next_check = None
+        self._last_change = 0.0
+        self._upgraded = False
+        self._backoff = {}
+        self._blocked_until = {}
+        self._lock = threading.Lock()
+        metrics.register_collector(f"quality-{id(self)}", self._metrics)
+
+    @property
+    def settings(self):
+        """Current knob values (a dict from the ladder; do not mutate)"""
+        return self.levels[self.level]
+
+    def _load(self):
+        """Worst ratio of measurement to budget (> 1 means over budget)"""
+        ratios = []
+        if self.target_fps and self._processing:
+            # Mean rather than median: with tracking most frames are cheap and
+            # the occasional full detection is what the budget has to absorb.
+            # A stride of N only runs inference on every Nth frame.
+            per_frame = sum(self._processing) / len(self._processing) / self.settings['stride']
+            ratios.append(per_frame * self.target_fps)
+        if self.target_latency and self._lag:
+            ratios.append(sorted(self._lag)[len(self._lag) // 2] / self.target_latency)
+        return max(ratios) if ratios else None
+
+    def observe(self, processing_time, lag=None, now=None):
+        """
+        Record one processed frame and adjust the level when due
+
+        Returns:
+            dict: settings to use for the next frame
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._processing.append(processing_time)
+            if lag is not None:
+                self._lag.append(lag)
+            if self._next_check is None:
+                self._next_check = now + self.interval
+            if now < self._next_check:
+                return self.settings
+            self._next_check = now + self.interval
+
+            load = self._load()
+            if load is None:
+                return self.settings
+            self._over = self._over + 1 if load > 1.0 else 0
+            self._under = self._under + 1 if load < self.headroom else 0
+            if now - self._last_change < self.cooldown:
+                return self.settings
+            if self._over >= self.patience and self.level < len(self.levels) - 1:
+                self._change(self.level + 1, now, load, "over budget")
+            elif (self._under >= self.recover_patience and self.level > 0
+                  and now >= self._blocked_until.get(self.level - 1, 0.0)):
+                self._change(self.level - 1, now, load, "headroom")
+            return self.settings
+
+    def _change(self, level, now, load, reason):
+        before, after = self.levels[self.level], self.levels[level]
+        changed = {key: (before[key], after[key]) for key in after if before[key] != after[key]}
+        decision = {
+            'time': now,
+            'stream': self.name,
+            'from_level': self.level,
+            'to_level': level,
+            'reason': reason,
+            'load': round(load, 3),
+            'changes': changed,
+        }
+        self.decisions.append(decision)
+        if level > self.level and self._upgraded:
+            # The level just recovered into could not hold the budget
+            backoff = min(self._backoff.get(self.level, self.retry_after / 2) * 2, 600.0)
+            self._backoff[self.level] = backoff
+            self._blocked_until[self.level] = now + backoff
+        self._upgraded = level < self.level
+        self.level = level
+        self._over = self._under = 0
+        self._last_change = now
+        # Measurements taken at the old setting no longer describe the new one
+        self._processing.clear()
+        self._lag.clear()
+        metrics.inc("ppe_quality_changes_total", stream=self.name, direction="down" if reason == "over budget" else "up")
+        summary = ", ".join(f"{key} {old}->{new}" for key, (old, new) in changed.items())
+        print(f"Quality [{self.name}]: level {decision['from_level']} -> {level} ({reason}, load {load:.2f}): {summary}")
+
+    def _metrics(self):
+        return [("ppe_quality_level", {'stream': self.name}, self.level)]
+
+    def close(self):
+        metrics.unregister_collector(f"quality-{id(self)}")
+
+    def stats(self):
+        return {
+            'level': self.level,
+            'levels': len(self.levels),
+            'settings': dict(self.settings),
+            'decisions': list(self.decisions)[-5:],
+        }
+
+
+def default_settings(conf_threshold=0.5, detect_interval=1):
+    """Fixed settings in the controller's format, for code paths without one"""
+    return {'input_size': INPUT_SIZE, 'detect_interval': detect_interval, 'stride': 1,
+            'conf_threshold': conf_threshold}
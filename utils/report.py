@@ -1,116 +1,426 @@
-import cv2
-import numpy as np
-from datetime import datetime
-from fpdf import FPDF
-import tempfile
-import os
-import base64
-from PIL import Image
-import atexit
-import shutil
-
-class PPE_Reporter:
-    def __init__(self):
-        # Create temp directory that auto-cleans
-        self.temp_dir = tempfile.mkdtemp()
-        atexit.register(self._cleanup)
-        
-        # Load configurable logo
-        self.logo_path = self._get_logo()
-        self.template = self._load_template()
-    
-    def _cleanup(self):
-        """Remove temp directory on exit"""
-        try:
-            shutil.rmtree(self.temp_dir)
-        except:
-            pass
-            
-    def _get_logo(self):
-        """Load logo from file or generate default"""
-        try:
-            if os.path.exists("assets/logo.png"):
-                with open("assets/logo.png", "rb") as img_file:
-                    return base64.b64encode(img_file.read()).decode('utf-8')
-        except:
-            pass
-        
-        # Fallback: Generate simple logo
-        logo = np.zeros((100, 300, 3), dtype=np.uint8)
-        cv2.putText(logo, "SAFETYGUARD", (50, 60), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 95, 135), 3)
-        _, buffer = cv2.imencode('.png', logo)
-        return base64.b64encode(buffer).decode('utf-8')
-    
-    def _load_template(self):
-        return {
-            'title': "PPE Compliance Report",
-            'subtitle': "Generated by SafetyGuard AI",
-            'footer': f"© {datetime.now().year} SafetyGuard - Confidential",
-            'required_ppe': ["Helmet", "Safety Vest", "Gloves", "Safety Boots"]
-        }
-    
-    def generate_report(self, output_frame, missing_items, detected_items, report_format='pdf'):
-        """Main report generation with proper cleanup"""
-        try:
-            # Save detection image
-            img_path = os.path.join(self.temp_dir, f"detection_{datetime.now().timestamp()}.png")
-            cv2.imwrite(img_path, cv2.cvtColor(output_frame, cv2.COLOR_RGB2BGR))
-            
-            if not os.path.exists(img_path):
-                raise FileNotFoundError("Failed to save detection image")
-                
-            if report_format.lower() == 'pdf':
-                report_path, mime_type = self._generate_pdf(img_path, missing_items, detected_items)
-            else:
-                report_path, mime_type = self._generate_html(img_path, missing_items, detected_items)
-                
-            return report_path, mime_type
-            
-        except Exception as e:
-            print(f"Report generation failed: {e}")
-            raise
-            
-    def _generate_pdf(self, image_path, missing_items, detection_data):
-        """PDF-specific generation"""
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-            
-            # Add Unicode-compatible font
-            pdf.add_font('DejaVu', '', 'assets/DejaVuSans.ttf', uni=True)
-            pdf.set_font('DejaVu', '', 12)
-            
-            # Header
-            pdf.set_font('DejaVu', '', 16)
-            pdf.cell(0, 10, self.template['title'], 0, 1, 'C')
-            
-            # ... rest of PDF generation code ...
-            
-            # Save to temp file
-            report_path = os.path.join(self.temp_dir, f"report_{datetime.now().timestamp()}.pdf")
-            pdf.output(report_path)
-            
-            return report_path, 'application/pdf'
-            
-        except Exception as e:
-            print(f"PDF generation failed: {e}")
-            raise
-
-    def _generate_html(self, image_path, missing_items, detection_data):
-        """HTML-specific generation"""
-        try:
-            with open(image_path, "rb") as img_file:
-                img_base64 = base64.b64encode(img_file.read()).decode('utf-8')
-                
-            # ... rest of HTML generation code ...
-            
-            report_path = os.path.join(self.temp_dir, f"report_{datetime.now().timestamp()}.html")
-            with open(report_path, 'w') as f:
-                f.write(html_content)
-                
-            return report_path, 'text/html'
-            
-        except Exception as e:
-            print(f"HTML generation failed: {e}")
-            raise
\ No newline at end of file
+import base64
+import html
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+from fpdf import FPDF
+
+from utils.detection import REQUIRED_PPE
+
+LOGO_PATH = "assets/logo.png"
+FONT_PATH = "assets/DejaVuSans.ttf"
+
+ITEM_LABELS = {
+    'helmet': "Helmet",
+    'vest': "Safety Vest",
+    'gloves': "Gloves",
+    'boots': "Safety Boots",
+}
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+  body {{ font-family: -apple-system, "Segoe UI", Roboto, sans-serif; color: #212529; max-width: 900px; margin: 24px auto; }}
+  header {{ display: flex; align-items: center; gap: 16px; border-bottom: 2px solid #005F87; padding-bottom: 12px; }}
+  header img {{ height: 48px; }}
+  h1 {{ color: #005F87; margin: 0; }}
+  .subtitle {{ color: #6c757d; margin: 0; }}
+  .status {{ padding: 12px 16px; border-radius: 8px; margin: 20px 0; font-weight: 600; }}
+  .ok {{ background: #E8F5E9; color: #2E7D32; }}
+  .bad {{ background: #FFEBEE; color: #C62828; }}
+  img.frame {{ width: 100%; border-radius: 8px; }}
+  table {{ border-collapse: collapse; width: 100%; margin: 16px 0; }}
+  th, td {{ border: 1px solid #dee2e6; padding: 8px; text-align: left; }}
+  th {{ background: #f1f3f5; }}
+  footer {{ color: #6c757d; font-size: 0.85em; margin-top: 24px; border-top: 1px solid #dee2e6; padding-top: 8px; }}
+</style>
+</head>
+<body>
+<header>
+  <img src="data:image/png;base64,{logo}" alt="logo">
+  <div><h1>{title}</h1><p class="subtitle">{subtitle} &middot; {generated}</p></div>
+</header>
+{body}
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+
+def encode_image(frame, ext=".jpg", quality=90):
+    """Encode a BGR frame straight to image bytes (no temp file)"""
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if ext == ".jpg" else []
+    ok, buffer = cv2.imencode(ext, frame, params)
+    if not ok:
+        raise ValueError("Failed to encode image")
+    return buffer.tobytes()
+
+
+def _html_table(headers, rows):
+    head = "".join(f"<th>{html.escape(str(h))}</th>" for h in headers)
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in row) + "</tr>" for row in rows)
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+class PPE_Reporter:
+    """
+    Builds single-inspection PDF/HTML reports entirely in memory
+
+    Logo, template and font lookup happen once per reporter, so one instance
+    (see `get_reporter()`) serves every request. Reports come back as bytes.
+    """
+
+    def __init__(self, logo_path=LOGO_PATH, font_path=FONT_PATH):
+        self.logo_png = self._get_logo(logo_path)
+        self.logo_base64 = base64.b64encode(self.logo_png).decode('ascii')
+        self.template = self._load_template()
+        # fpdf subsets a document's parsed font in place on output, so each PDF
+        # registers its own; only the lookup is cached. Without the TTF the
+        # built-in Helvetica is used.
+        self.font_path = font_path if os.path.isfile(font_path) else None
+        self.font_family = 'DejaVu' if self.font_path else 'Helvetica'
+        # The single TTF has no bold face; registering it twice only embedded it twice
+        self.bold = '' if self.font_path else 'B'
+
+
+    def _get_logo(self, path):
+        """Logo PNG bytes from file, or a generated default"""
+        try:
+            if os.path.exists(path):
+                with open(path, "rb") as img_file:
+                    return img_file.read()
+        except OSError:
+            pass
+
+        # Fallback: Generate simple logo
+        logo = np.full((100, 300, 3), 255, dtype=np.uint8)
+        cv2.putText(logo, "SAFETYGUARD", (30, 62),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (135, 95, 0), 3)
+        return encode_image(logo, ".png")
+
+    def _load_template(self):
+        return {
+            'title': "PPE Compliance Report",
+            'subtitle': "Generated by SafetyGuard AI",
+            'footer': f"© {datetime.now().year} SafetyGuard - Confidential",
+            'required_ppe': [ITEM_LABELS[item] for item in REQUIRED_PPE],
+        }
+
+    def generate_report(self, output_frame, missing_items, detected_items, report_format='pdf', workers=None):
+        """
+        Build a report for one inspected frame
+
+        Args:
+            output_frame: Annotated BGR frame
+            missing_items: Missing PPE items
+            detected_items: Detected class counts
+            report_format: 'pdf' or 'html'
+            workers: Optional per-worker compliance dicts
+
+        Returns:
+            tuple: (report bytes, mime type)
+        """
+        try:
+            image = encode_image(output_frame)
+            if report_format.lower() == 'pdf':
+                return self._generate_pdf(image, missing_items, detected_items, workers or [])
+            return self._generate_html(image, missing_items, detected_items, workers or [])
+        except Exception as e:
+            print(f"Report generation failed: {e}")
+            raise
+
+    def _item_rows(self, missing_items, detection_data):
+        return [
+            (ITEM_LABELS[item], detection_data.get(item, 0), "Missing" if item in missing_items else "OK")
+            for item in REQUIRED_PPE
+        ]
+
+    @staticmethod
+    def _worker_rows(workers):
+        return [
+            (i + 1, "Compliant" if not worker['missing'] else "Violation", ", ".join(worker['missing']) or "-")
+            for i, worker in enumerate(workers)
+        ]
+
+    def _new_pdf(self):
+        pdf = FPDF()
+        pdf.set_auto_page_break(True, margin=15)
+        if self.font_path:
+            pdf.add_font(self.font_family, '', self.font_path)
+        return pdf
+
+    def _pdf_header(self, pdf, title=None):
+        pdf.add_page()
+        family = self.font_family
+        pdf.image(io.BytesIO(self.logo_png), x=10, y=8, h=14)
+        pdf.set_font(family, self.bold, 16)
+        pdf.set_text_color(0, 95, 135)
+        pdf.cell(0, 10, title or self.template['title'], align='R', new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font(family, '', 10)
+        pdf.set_text_color(108, 117, 125)
+        pdf.cell(0, 6, f"{self.template['subtitle']} - {datetime.now():%Y-%m-%d %H:%M}", align='R',
+                 new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(8)
+        pdf.set_text_color(33, 37, 41)
+
+    def _pdf_table(self, pdf, headers, rows, widths):
+        family = self.font_family
+        pdf.set_font(family, self.bold, 10)
+        pdf.set_fill_color(241, 243, 245)
+        for header, width in zip(headers, widths):
+            pdf.cell(width, 8, str(header), border=1, fill=True)
+        pdf.ln()
+        pdf.set_font(family, '', 10)
+        for row in rows:
+            for value, width in zip(row, widths):
+                pdf.cell(width, 8, str(value), border=1)
+            pdf.ln()
+        pdf.ln(4)
+
+    def _pdf_footer(self, pdf):
+        pdf.set_font(self.font_family, '', 8)
+        pdf.set_text_color(108, 117, 125)
+        pdf.cell(0, 8, self.template['footer'], align='C')
+
+    def _generate_pdf(self, image, missing_items, detection_data, workers):
+        """PDF-specific generation"""
+        pdf = self._new_pdf()
+        self._pdf_header(pdf)
+
+        pdf.set_font(self.font_family, self.bold, 12)
+        if missing_items:
+            pdf.set_text_color(198, 40, 40)
+            pdf.cell(0, 8, f"Violation - missing: {', '.join(missing_items)}", new_x="LMARGIN", new_y="NEXT")
+        else:
+            pdf.set_text_color(46, 125, 50)
+            pdf.cell(0, 8, "Compliant - all required PPE detected", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_text_color(33, 37, 41)
+        pdf.ln(2)
+
+        pdf.image(io.BytesIO(image), w=pdf.epw)
+        pdf.ln(4)
+        self._pdf_table(pdf, ["Required PPE", "Detected", "Status"],
+                        self._item_rows(missing_items, detection_data), [80, 40, 60])
+        if workers:
+            self._pdf_table(pdf, ["Worker", "Status", "Missing"], self._worker_rows(workers), [30, 50, 100])
+        self._pdf_footer(pdf)
+        return bytes(pdf.output()), 'application/pdf'
+
+    def _render_html(self, body, title=None):
+        return HTML_TEMPLATE.format(
+            title=html.escape(title or self.template['title']),
+            subtitle=html.escape(self.template['subtitle']),
+            generated=f"{datetime.now():%Y-%m-%d %H:%M}",
+            logo=self.logo_base64,
+            body=body,
+            footer=html.escape(self.template['footer']),
+        )
+
+    def _generate_html(self, image, missing_items, detection_data, workers):
+        """HTML-specific generation"""
+        if missing_items:
+            status = f'<div class="status bad">Violation &ndash; missing: {html.escape(", ".join(missing_items))}</div>'
+        else:
+            status = '<div class="status ok">Compliant &ndash; all required PPE detected</div>'
+        parts = [
+            status,
+            f'<img class="frame" src="data:image/jpeg;base64,{base64.b64encode(image).decode("ascii")}" '
+            f'alt="Inspected frame">',
+            "<h2>Required PPE</h2>",
+            _html_table(["Required PPE", "Detected", "Status"], self._item_rows(missing_items, detection_data)),
+        ]
+        if workers:
+            parts += ["<h2>Workers</h2>", _html_table(["Worker", "Status", "Missing"], self._worker_rows(workers))]
+        return self._render_html("\n".join(parts)).encode('utf-8'), 'text/html'
+
+    # -- aggregate (shift / site) reports --------------------------------------
+
+    def generate_site_report(self, summary, report_format='pdf', title="Site Compliance Report"):
+        """
+        Build a report from `utils.analytics.aggregate_events` output
+
+        Returns:
+            tuple: (report bytes, mime type)
+        """
+        try:
+            chart = timeline_chart(summary['timeline'])
+            if report_format.lower() == 'pdf':
+                return self._site_pdf(summary, chart, title)
+            return self._site_html(summary, chart, title)
+        except Exception as e:
+            print(f"Site report generation failed: {e}")
+            raise
+
+    @staticmethod
+    def _period(summary):
+        start = datetime.fromtimestamp(summary['start']).strftime('%Y-%m-%d %H:%M')
+        end = datetime.fromtimestamp(summary['end']).strftime('%Y-%m-%d %H:%M')
+        scope = f" - camera {summary['stream']}" if summary['stream'] else ""
+        return f"{start} to {end}{scope}"
+
+    @staticmethod
+    def _site_item_rows(summary):
+        return [
+            (ITEM_LABELS[item], f"{stats['compliance_rate']:.1%}", stats['missing_frames'], stats['episodes'],
+             f"{stats['violation_seconds'] / 60:.1f}")
+            for item, stats in summary['items'].items()
+        ]
+
+    @staticmethod
+    def _site_zone_rows(summary):
+        return [
+            (zone['zone'], f"{zone['violation_rate']:.1%}", zone['violation_frames'], zone['episodes'],
+             f"{zone['violation_seconds'] / 60:.1f}")
+            for zone in summary['zones']
+        ]
+
+    def _site_pdf(self, summary, chart, title):
+        pdf = self._new_pdf()
+        self._pdf_header(pdf, title)
+        pdf.set_font(self.font_family, self.bold, 12)
+        pdf.cell(0, 8, self._period(summary), new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font(self.font_family, '', 11)
+        pdf.cell(0, 8, f"Overall compliance {summary['compliance_rate']:.1%} over {summary['frames']} frames "
+                       f"({summary['violation_frames']} with violations)", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+        pdf.image(io.BytesIO(chart), w=pdf.epw)
+        pdf.ln(4)
+        self._pdf_table(pdf, ["Item", "Compliance", "Missing frames", "Episodes", "Minutes"],
+                        self._site_item_rows(summary), [45, 35, 40, 35, 35])
+        if summary['zones']:
+            self._pdf_table(pdf, ["Top zones", "Violation rate", "Frames", "Episodes", "Minutes"],
+                            self._site_zone_rows(summary), [45, 35, 40, 35, 35])
+        if summary['snapshots']:
+            pdf.set_font(self.font_family, self.bold, 11)
+            pdf.cell(0, 8, "Snapshots", new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font(self.font_family, '', 8)
+            width = (pdf.epw - 10) / 3
+            for i, snap in enumerate(summary['snapshots']):
+                if i % 3 == 0:
+                    if pdf.get_y() + width > pdf.page_break_trigger:
+                        pdf.add_page()
+                    row_y = pdf.get_y()
+                x = pdf.l_margin + (i % 3) * (width + 5)
+                pdf.image(io.BytesIO(snap['image']), x=x, y=row_y, w=width)
+                pdf.set_xy(x, row_y + width * 0.75 + 1)
+                pdf.cell(width, 4, f"{snap['zone'] or snap['stream']} {datetime.fromtimestamp(snap['ts']):%m-%d %H:%M}"
+                                   f" - {', '.join(snap['items'])}")
+                if i % 3 == 2 or i == len(summary['snapshots']) - 1:
+                    pdf.set_xy(pdf.l_margin, row_y + width * 0.75 + 8)
+        self._pdf_footer(pdf)
+        return bytes(pdf.output()), 'application/pdf'
+
+    def _site_html(self, summary, chart, title):
+        status_class = "ok" if summary['compliance_rate'] >= 0.95 else "bad"
+        parts = [
+            f"<p><strong>{html.escape(self._period(summary))}</strong></p>",
+            f'<div class="status {status_class}">Overall compliance {summary["compliance_rate"]:.1%} over '
+            f'{summary["frames"]} frames ({summary["violation_frames"]} with violations)</div>',
+            f'<img class="frame" src="data:image/png;base64,{base64.b64encode(chart).decode("ascii")}" '
+            f'alt="Violation timeline">',
+            "<h2>Compliance per item</h2>",
+            _html_table(["Item", "Compliance", "Missing frames", "Episodes", "Minutes"],
+                        self._site_item_rows(summary)),
+        ]
+        if summary['zones']:
+            parts += ["<h2>Top offending zones</h2>",
+                      _html_table(["Zone", "Violation rate", "Frames", "Episodes", "Minutes"],
+                                  self._site_zone_rows(summary))]
+        if summary['snapshots']:
+            parts.append("<h2>Snapshots</h2><div style=\"display: flex; flex-wrap: wrap; gap: 8px;\">")
+            for snap in summary['snapshots']:
+                caption = (f"{snap['zone'] or snap['stream']} · {datetime.fromtimestamp(snap['ts']):%Y-%m-%d %H:%M}"
+                           f" · {', '.join(snap['items'])}")
+                parts.append(
+                    f'<figure style="margin: 0; width: 32%;"><img style="width: 100%;" '
+                    f'src="data:image/jpeg;base64,{base64.b64encode(snap["image"]).decode("ascii")}">'
+                    f'<figcaption>{html.escape(caption)}</figcaption></figure>')
+            parts.append("</div>")
+        return self._render_html("\n".join(parts), title).encode('utf-8'), 'text/html'
+
+
+def timeline_chart(timeline, width=900, height=260):
+    """PNG bar chart of the violation rate per timeline bucket"""
+    chart = np.full((height, width, 3), 255, dtype=np.uint8)
+    frames = timeline['frames']
+    rate = np.divide(timeline['violation_frames'], frames, out=np.zeros(len(frames)), where=frames > 0)
+    left, bottom, top = 40, height - 30, 20
+    plot_h = bottom - top
+    for level in (0.0, 0.5, 1.0):
+        y = int(bottom - level * plot_h)
+        cv2.line(chart, (left, y), (width - 10, y), (222, 226, 230), 1)
+        cv2.putText(chart, f"{level:.0%}", (2, y + 4), cv2.FONT_HERSHEY_SIMPLEX, 0.35, (108, 117, 125), 1)
+    n = len(rate)
+    step = (width - 10 - left) / max(n, 1)
+    for i, value in enumerate(rate):
+        x0 = int(left + i * step + step * 0.1)
+        x1 = max(x0 + 1, int(left + (i + 1) * step - step * 0.1))
+        color = (40, 40, 198) if value > 0.1 else (50, 125, 46)
+        if frames[i]:
+            cv2.rectangle(chart, (x0, int(bottom - value * plot_h)), (x1, bottom), color, -1)
+    label_every = max(1, n // 8)
+    fmt = '%H:%M' if timeline['bucket_seconds'] < 86400 else '%m-%d'
+    for i in range(0, n, label_every):
+        label = datetime.fromtimestamp(timeline['bucket_start'][i]).strftime(fmt)
+        cv2.putText(chart, label, (int(left + i * step), height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.35,
+                    (108, 117, 125), 1)
+    return encode_image(chart, ".png")
+
+
+_reporter = None
+_executor = None
+_reporter_lock = threading.Lock()
+
+
+def get_reporter():
+    """Process-wide reporter (logo/template/font resolved once)"""
+    global _reporter
+    if _reporter is None:
+        with _reporter_lock:
+            if _reporter is None:
+                _reporter = PPE_Reporter()
+    return _reporter
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _reporter_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+    return _executor
+
+
+def submit_report(output_frame, missing_items, detected_items, report_format='pdf', workers=None):
+    """
+    Generate a report on the background pool
+
+    Returns:
+        concurrent.futures.Future resolving to (report bytes, mime type)
+    """
+    return _get_executor().submit(get_reporter().generate_report, output_frame, missing_items,
+                                  detected_items, report_format, workers)
+
+
+def submit_site_report(store, start=None, end=None, stream=None, report_format='pdf'):
+    """
+    Aggregate stored events and build a site report on the background pool
+
+    Returns:
+        concurrent.futures.Future resolving to (report bytes, mime type)
+    """
+    from utils.analytics import aggregate_events
+
+    def build():
+        summary = aggregate_events(store, start, end, stream)
+        return get_reporter().generate_site_report(summary, report_format)
+
+    return _get_executor().submit(build)
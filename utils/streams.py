@@ -0,0 +1,311 @@
+import os
+import threading
+import time
+
+from utils import metrics
+from utils.detection import INPUT_SIZE, detect_ppe_batch
+from utils.motion import MotionGate
+from utils.pipeline import CaptureThread, LatestSlot
+from utils.quality import QualityController, quality_ladder
+from utils.tracker import IoUTracker, assign_worker_ids
+from utils.zones import ZoneDetector, zones_for
+
+# Seconds to wait for a pool slot and for a pool result before failing the frame
+POOL_TIMEOUT = 30.0
+
+
+def parse_source(text):
+    """Turn a UI/CLI source string into a cv2.VideoCapture argument"""
+    text = str(text).strip()
+    return int(text) if text.isdigit() else text
+
+
+def is_file_source(source):
+    return isinstance(source, str) and os.path.isfile(source)
+
+
+class _Stream:
+    """Per-source capture state and scheduling bookkeeping"""
+
+    def __init__(self, stream_id, source, target_fps, motion_gating=False):
+        self.stream_id = stream_id
+        self.source = source
+        self.target_fps = target_fps
+        self.motion_gate = MotionGate() if motion_gating else None
+        self.slot = LatestSlot()
+        file_source = is_file_source(source)
+        self.capture = CaptureThread(source, self.slot, name=f"capture-{stream_id}",
+                                     pace=file_source, loop=file_source, stream_id=stream_id)
+        # Zone-restricted / tiled streams get their own detector
+        self.zone_detector = None
+        # Matches workers across this stream's frames so they carry track ids
+        self.worker_tracker = IoUTracker()
+        # Optional QualityController (adaptive=True)
+        self.controller = None
+        self.due_at = 0.0
+        self.next_due = 0.0
+        self.last_seq = 0
+        self.last_result = None
+        self.frames_processed = 0
+
+    def ready(self, now):
+        """New frame available and this stream's FPS budget allows another inference"""
+        seq, item = self.slot.peek()
+        return item is not None and seq > self.last_seq and now >= self.next_due
+
+
+class StreamManager:
+    """
+    Schedules many video sources onto one shared model
+
+    Each source gets its own capture thread with a single-slot buffer. A
+    scheduler thread walks the streams round-robin, gathers the latest frame
+    from every stream that is due (per-stream FPS target) into a cross-stream
+    micro-batch and runs one batched forward pass for it.
+
+    Results are kept per stream (`latest_results()`) and pushed to listeners
+    registered with `add_listener(callback)`; callbacks get (stream_id, result).
+    Workers in a result carry per-stream track ids, so per-worker episodes
+    work here as they do with a TrackedDetector.
+
+    With an InferencePool (utils.worker_pool) the due frames are spread over
+    its worker processes instead, each camera pinned to one worker.
+
+    Cameras with zones of interest (a load_zones() config keyed by stream id
+    or source) or with `tiled=True` run through a per-stream ZoneDetector
+    instead of the shared batch; their results carry a per-zone breakdown
+    under 'zones'.
+
+    With `adaptive=True` each stream gets a QualityController that holds its
+    FPS target by stepping the frame stride and confidence threshold. Input
+    resolution and tracking stay fixed here because streams share batches.
+    """
+
+    def __init__(self, model, sources, batch_size=8, target_fps=5.0, conf_threshold=0.5,
+                 motion_gating=False, pool=None, zones=None, tiled=False, adaptive=False):
+        self.model = model
+        self.pool = pool
+        self.batch_size = batch_size
+        self.conf_threshold = conf_threshold
+        if not isinstance(target_fps, (list, tuple)):
+            target_fps = [target_fps] * len(sources)
+        self.streams = [
+            _Stream(f"cam{i}", parse_source(source), fps, motion_gating)
+            for i, (source, fps) in enumerate(zip(sources, target_fps))
+        ]
+        for stream in self.streams:
+            stream_zones = zones_for(zones or {}, stream.stream_id, stream.source)
+            if stream_zones or tiled:
+                stream.zone_detector = ZoneDetector(model, stream_zones, tiled=tiled, conf_threshold=conf_threshold)
+            if adaptive and stream.target_fps:
+                ladder = quality_ladder(input_sizes=(INPUT_SIZE,), max_detect_interval=1,
+                                        conf_threshold=conf_threshold)
+                stream.controller = QualityController(target_fps=stream.target_fps, levels=ladder,
+                                                      name=stream.stream_id)
+        self._listeners = []
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._scheduler = threading.Thread(target=self._run, name="stream-scheduler", daemon=True)
+        self.batches_run = 0
+        self.errors = 0
+        self.started_at = None
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def start(self):
+        self.started_at = time.time()
+        for stream in self.streams:
+            stream.capture.start()
+        self._scheduler.start()
+        metrics.register_collector(f"streams-{id(self)}", self._metrics)
+        return self
+
+    def _metrics(self):
+        stats = self.stats()
+        samples = [("ppe_batches_total", {}, stats['batches'])]
+        for stream_id, s in stats['streams'].items():
+            samples += [
+                ("ppe_frames_read_total", {'stream': stream_id}, s['frames_read']),
+                ("ppe_frames_dropped_total", {'stream': stream_id}, s['frames_dropped']),
+                ("ppe_frames_motion_skipped_total", {'stream': stream_id}, s['motion_skipped']),
+                ("ppe_stream_up", {'stream': stream_id}, int(s['error'] is None)),
+            ]
+        return samples
+
+    def stop(self, timeout=2.0):
+        metrics.unregister_collector(f"streams-{id(self)}")
+        for stream in self.streams:
+            if stream.controller is not None:
+                stream.controller.close()
+        self._stop_event.set()
+        for stream in self.streams:
+            stream.capture.stop()
+        self._scheduler.join(timeout)
+        for stream in self.streams:
+            stream.capture.join(timeout)
+
+    @property
+    def running(self):
+        return self._scheduler.is_alive()
+
+    def _next_batch(self):
+        """Round-robin pick of up to batch_size due streams, starting after the last one served"""
+        now = time.time()
+        count = len(self.streams)
+        picked = []
+        for offset in range(count):
+            index = (self._cursor + offset) % count
+            stream = self.streams[index]
+            if stream.ready(now):
+                picked.append(stream)
+                if len(picked) == self.batch_size:
+                    break
+        if picked:
+            self._cursor = (self.streams.index(picked[-1]) + 1) % count
+        return picked
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not any(stream.capture.is_alive() for stream in self.streams):
+                break
+
+            picked = self._next_batch()
+            if not picked:
+                self._stop_event.wait(0.005)
+                continue
+
+            frames = []
+            now = time.time()
+            for stream in list(picked):
+                # Taking the frame marks it consumed, so slot.dropped only counts overwritten frames
+                seq, item = stream.slot.get(timeout=0, after=stream.last_seq)
+                if item is None:
+                    # Capture ended between the readiness check and now
+                    picked.remove(stream)
+                    continue
+                stream.last_seq = seq
+                if stream.target_fps:
+                    interval = 1.0 / stream.target_fps
+                    if stream.controller is not None:
+                        interval *= stream.controller.settings['stride']
+                    stream.due_at = max(stream.next_due, now - interval)
+                    stream.next_due = stream.due_at + interval
+                if (stream.motion_gate is not None and stream.last_result is not None
+                        and not stream.motion_gate.should_process(item[1])):
+                    # Static scene: keep the previous result, spend no batch slot on it
+                    picked.remove(stream)
+                    continue
+                frames.append(item)
+            if not picked:
+                continue
+
+            outputs = [None] * len(picked)
+            confs = [self._conf(stream) for stream in picked]
+            shared = [i for i, stream in enumerate(picked) if stream.zone_detector is None]
+            # A failed inference publishes nothing for its streams (their last
+            # result stands) rather than a fabricated "everything missing" one
+            if self.pool is not None:
+                # A closed pool or dead workers fail these streams, never the scheduler thread
+                futures = {}
+                for i in shared:
+                    try:
+                        futures[i] = self.pool.submit(frames[i][1], confs[i], key=picked[i].stream_id,
+                                                      return_workers=True, timeout=POOL_TIMEOUT)
+                    except Exception as e:
+                        self._failed([picked[i]], e)
+                for i, future in futures.items():
+                    try:
+                        outputs[i] = future.result(timeout=POOL_TIMEOUT)
+                    except Exception as e:
+                        self._failed([picked[i]], e)
+            elif shared:
+                # One forward pass even when controllers' thresholds diverge:
+                # it runs at the lowest and each stream keeps detections meeting its own
+                try:
+                    batch = detect_ppe_batch(self.model, [frames[i][1] for i in shared],
+                                             batch_size=self.batch_size,
+                                             conf_threshold=[confs[i] for i in shared], return_workers=True)
+                except Exception as e:
+                    self._failed([picked[i] for i in shared], e)
+                else:
+                    for i, output in zip(shared, batch):
+                        outputs[i] = output
+            for i, stream in enumerate(picked):
+                if stream.zone_detector is not None:
+                    stream.zone_detector.conf_threshold = confs[i]
+                    try:
+                        outputs[i] = stream.zone_detector.process(frames[i][1], return_workers=True)
+                    except Exception as e:
+                        self._failed([stream], e)
+            self.batches_run += 1
+            now = time.time()
+
+            for stream, (captured_at, _), output in zip(picked, frames, outputs):
+                if output is None:
+                    continue
+                output_frame, missing, counts, workers = output
+                assign_worker_ids(stream.worker_tracker, workers)
+                result = {
+                    'stream_id': stream.stream_id,
+                    'frame': output_frame,
+                    'missing': missing,
+                    'counts': counts,
+                    'workers': workers,
+                    'captured_at': captured_at,
+                    'latency': now - captured_at,
+                }
+                if stream.zone_detector is not None and stream.zone_detector.zones:
+                    result['zones'] = stream.zone_detector.last_zones
+                with self._lock:
+                    stream.last_result = result
+                    stream.frames_processed += 1
+                if stream.controller is not None:
+                    # Due-to-result time: the batch cost plus however late the scheduler got to this stream
+                    stream.controller.observe(now - stream.due_at, now - captured_at, now)
+                metrics.tick("ppe_inference", stream=stream.stream_id)
+                for callback in self._listeners:
+                    try:
+                        callback(stream.stream_id, result)
+                    except Exception as e:
+                        print(f"Stream listener error: {e}")
+
+    def _failed(self, streams, error):
+        self.errors += len(streams)
+        print(f"Inference error ({', '.join(stream.stream_id for stream in streams)}): {error}")
+        for stream in streams:
+            metrics.inc("ppe_inference_errors_total", stream=stream.stream_id)
+
+    def _conf(self, stream):
+        if stream.controller is not None:
+            return stream.controller.settings['conf_threshold']
+        return self.conf_threshold
+
+    def latest_results(self):
+        """Most recent result per stream id (None until first inference)"""
+        with self._lock:
+            return {stream.stream_id: stream.last_result for stream in self.streams}
+
+    def stats(self):
+        elapsed = max(time.time() - (self.started_at or time.time()), 1e-6)
+        per_stream = {}
+        for stream in self.streams:
+            per_stream[stream.stream_id] = {
+                'source': str(stream.source),
+                'fps': stream.frames_processed / elapsed,
+                'frames_read': stream.capture.frames_read,
+                'frames_processed': stream.frames_processed,
+                # Overwritten before the scheduler took them; static frames are counted separately
+                'frames_dropped': stream.slot.dropped,
+                'motion_skipped': stream.motion_gate.stats()['skipped'] if stream.motion_gate else 0,
+                'error': stream.capture.error,
+                'motion_skip_rate': stream.motion_gate.stats()['skip_rate'] if stream.motion_gate else 0.0,
+                'quality': stream.controller.stats() if stream.controller else None,
+            }
+        return {
+            'batches': self.batches_run,
+            'errors': self.errors,
+            'throughput_fps': sum(s.frames_processed for s in self.streams) / elapsed,
+            'streams': per_stream,
+        }
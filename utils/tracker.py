@@ -0,0 +1,247 @@
+import numpy as np
+
+from utils.detection import (
+    INPUT_SIZE,
+    PERSON_CLASSES,
+    REQUIRED_PPE,
+    draw_detections,
+    extract_detections,
+    prepare_frame,
+    summarize_detections,
+)
+from utils import metrics
+from utils.preprocess import content_view, unpad_boxes
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy arrays"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    inter_w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class IoUTracker:
+    """
+    Lightweight multi-object tracker (IoU matching + constant-velocity filter)
+
+    Tracks are held as parallel NumPy arrays. `update()` matches new
+    detections to existing tracks by IoU (same class only) and corrects
+    position/velocity with an alpha-beta filter; `predict()` advances every
+    track one frame along its velocity and decays its confidence, which is
+    what fills the frames between full detections.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=3, alpha=0.6, beta=0.2, decay=0.85):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.alpha = alpha
+        self.beta = beta
+        self.decay = decay
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.velocity = np.zeros((0, 4), dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.confidence = np.zeros(0, dtype=np.float32)
+        self.missed = np.zeros(0, dtype=np.int64)
+        self.since_update = np.zeros(0, dtype=np.int64)
+        self.labels = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predict(self):
+        """Propagate all tracks by one frame"""
+        self.boxes = self.boxes + self.velocity
+        self.confidence = self.confidence * self.decay
+        self.since_update = self.since_update + 1
+
+    def update(self, boxes, scores, labels):
+        """
+        Correct tracks with a fresh set of detections
+
+        Returns:
+            np.ndarray: the track id given to each detection, in input order
+        """
+        labels = list(labels)
+        iou = iou_matrix(self.boxes, boxes)
+        if iou.size:
+            same_class = np.array(self.labels, dtype=object)[:, None] == np.array(labels, dtype=object)[None, :]
+            iou = np.where(same_class, iou, 0.0)
+
+        # Greedy matching, best IoU first
+        matched_tracks, matched_dets = [], []
+        if iou.size:
+            order = np.argsort(-iou, axis=None)
+            used_t, used_d = set(), set()
+            for flat in order:
+                t, d = divmod(int(flat), iou.shape[1])
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if t in used_t or d in used_d:
+                    continue
+                used_t.add(t)
+                used_d.add(d)
+                matched_tracks.append(t)
+                matched_dets.append(d)
+
+        t_idx = np.array(matched_tracks, dtype=np.int64)
+        d_idx = np.array(matched_dets, dtype=np.int64)
+        det_ids = np.zeros(len(boxes), dtype=np.int64)
+        det_ids[d_idx] = self.ids[t_idx]
+        if len(t_idx):
+            steps = np.maximum(self.since_update[t_idx], 1)[:, None]
+            residual = boxes[d_idx] - self.boxes[t_idx]
+            self.boxes[t_idx] += self.alpha * residual
+            self.velocity[t_idx] += self.beta * residual / steps
+            self.scores[t_idx] = scores[d_idx]
+            self.confidence[t_idx] = scores[d_idx]
+            self.missed[t_idx] = 0
+            self.since_update[t_idx] = 0
+
+        unmatched_t = np.setdiff1d(np.arange(len(self.ids)), t_idx)
+        self.missed[unmatched_t] += 1
+
+        # Drop tracks that were missed by too many consecutive detections
+        keep = self.missed <= self.max_missed
+        self._select(keep)
+
+        unmatched_d = np.setdiff1d(np.arange(len(boxes)), d_idx)
+        if len(unmatched_d):
+            count = len(unmatched_d)
+            det_ids[unmatched_d] = np.arange(self.next_id, self.next_id + count)
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+            self.next_id += count
+            self.boxes = np.concatenate([self.boxes, boxes[unmatched_d]])
+            self.velocity = np.concatenate([self.velocity, np.zeros((count, 4), dtype=np.float32)])
+            self.scores = np.concatenate([self.scores, scores[unmatched_d]])
+            self.confidence = np.concatenate([self.confidence, scores[unmatched_d]])
+            self.missed = np.concatenate([self.missed, np.zeros(count, dtype=np.int64)])
+            self.since_update = np.concatenate([self.since_update, np.zeros(count, dtype=np.int64)])
+            self.labels.extend(labels[i] for i in unmatched_d)
+        return det_ids
+
+    def rescale(self, factor):
+        """Move every track into coordinates scaled by `factor` (e.g. a new letterbox size)"""
+        self.boxes = self.boxes * factor
+        self.velocity = self.velocity * factor
+
+    def _select(self, mask):
+        self.ids = self.ids[mask]
+        self.boxes = self.boxes[mask]
+        self.velocity = self.velocity[mask]
+        self.scores = self.scores[mask]
+        self.confidence = self.confidence[mask]
+        self.missed = self.missed[mask]
+        self.since_update = self.since_update[mask]
+        self.labels = [label for label, keep in zip(self.labels, mask) if keep]
+
+    def active(self):
+        """Tracks worth drawing: still matched recently"""
+        mask = self.missed == 0
+        return self.ids[mask], self.boxes[mask], self.scores[mask], [
+            label for label, keep in zip(self.labels, mask) if keep
+        ]
+
+
+def assign_worker_ids(tracker, workers):
+    """
+    Give per-frame worker dicts stable 'id's by tracking their person boxes
+
+    For paths that detect every frame (no TrackedDetector) but still want
+    per-worker episodes; `tracker` is one IoUTracker per stream.
+    """
+    boxes = np.array([worker['box'] for worker in workers], dtype=np.float32).reshape(-1, 4)
+    tracker.predict()
+    ids = tracker.update(boxes, np.ones(len(boxes), dtype=np.float32), ['person'] * len(boxes))
+    for worker, tid in zip(workers, ids):
+        worker['id'] = int(tid)
+    return workers
+
+
+class TrackedDetector:
+    """
+    Runs the full model only every `detect_interval` frames (or when track
+    confidence has decayed below `min_confidence`) and propagates tracked
+    boxes in between, so every frame still gets boxes and stable IDs.
+    """
+
+    def __init__(self, model, detect_interval=5, min_confidence=0.3, conf_threshold=0.5, render=True,
+                 input_size=INPUT_SIZE):
+        self.model = model
+        self.render = render
+        self.input_size = input_size
+        self.detect_interval = max(1, detect_interval)
+        self.min_confidence = min_confidence
+        self.conf_threshold = conf_threshold
+        self.tracker = IoUTracker()
+        self.frames = 0
+        self.detections_run = 0
+        self._since_detect = 0
+
+    def _needs_detection(self):
+        if self._since_detect >= self.detect_interval or len(self.tracker) == 0:
+            return True
+        live = self.tracker.missed == 0
+        return not live.any() or bool(self.tracker.confidence[live].min() < self.min_confidence)
+
+    def process(self, frame, return_workers=False):
+        """
+        Same contract as detect_ppe, with boxes labelled by track ID
+
+        Returns:
+            tuple: (annotated_frame, missing_items, detected_counts[, workers])
+        """
+        if frame is None or frame.size == 0:
+            return (frame, [], {}, []) if return_workers else (frame, [], {})
+
+        with metrics.stage_timer("preprocess"):
+            buffer, meta = prepare_frame(frame, input_size=self.input_size)
+        self.frames += 1
+        self.tracker.predict()
+
+        if self._needs_detection():
+            # Model errors propagate, like detect_ppe(raise_errors=True); stale tracks are not a result
+            with metrics.stage_timer("inference"):
+                results = self.model.predict(buffer, conf=self.conf_threshold, imgsz=self.input_size, verbose=False)
+            if results:
+                boxes, scores, labels = extract_detections(self.model, results[0])
+                boxes = unpad_boxes(boxes, meta)
+            else:
+                boxes, scores, labels = np.zeros((0, 4), np.float32), np.zeros(0, np.float32), []
+            self.tracker.update(boxes, scores, labels)
+            self.detections_run += 1
+            self._since_detect = 0
+        self._since_detect += 1
+
+        ids, boxes, scores, labels = self.tracker.active()
+        if labels:
+            missing, item_counts, workers = summarize_detections(boxes, labels)
+            # Workers come out in person order, so their track IDs line up
+            person_ids = [tid for tid, label in zip(ids, labels) if label in PERSON_CLASSES]
+            for worker, tid in zip(workers, person_ids):
+                worker['id'] = int(tid)
+        else:
+            missing, item_counts, workers = list(REQUIRED_PPE), {}, []
+
+        frame = None
+        if self.render:
+            with metrics.stage_timer("render"):
+                frame = content_view(buffer, meta).copy()
+                draw_detections(frame, boxes, labels, scores, ids, workers, names=self.model.names)
+
+        output = (frame, missing, item_counts, workers)
+        return output if return_workers else output[:3]
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'detections': self.detections_run,
+            'skip_ratio': 1 - self.detections_run / self.frames if self.frames else 0.0,
+            'tracks': len(self.tracker),
+        }
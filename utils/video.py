@@ -0,0 +1,56 @@
+import cv2
+
+
+def video_info(path):
+    """Basic properties of a video file"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video: {path}")
+        return {
+            'fps': cap.get(cv2.CAP_PROP_FPS) or 25.0,
+            'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def iter_video_frames(path, stride=1, start=0.0, end=None):
+    """
+    Lazily decode a video, one frame in memory at a time
+
+    Args:
+        path: Video file path
+        stride: Keep every Nth frame (skipped frames are grabbed, not decoded)
+        start: Seek position in seconds
+        end: Stop position in seconds (None = until the end)
+
+    Yields:
+        tuple: (frame_index, timestamp_seconds, frame)
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        first_index = int(start * fps) if start > 0 else 0
+        if first_index:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_index)
+        last_index = int(end * fps) if end is not None else None
+
+        index = first_index
+        while last_index is None or index <= last_index:
+            if (index - first_index) % stride:
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield index, index / fps, frame
+            index += 1
+    finally:
+        cap.release()
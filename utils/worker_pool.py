@@ -0,0 +1,417 @@
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from utils import metrics
+from utils.detection import INPUT_SIZE
+from utils.model_registry import DEFAULT_MODEL_PATH
+
+# Frames larger than this are downscaled before they enter a ring slot
+MAX_FRAME_SHAPE = (1080, 1920, 3)
+# Annotated output is the letterboxed content, never larger than the model input
+OUTPUT_SHAPE = (INPUT_SIZE, INPUT_SIZE, 3)
+
+
+def default_workers():
+    """One worker per two cores (each gets two intra-op threads), at least one"""
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def _slot_views(shm, slots, slot_bytes):
+    return [np.ndarray((slot_bytes,), dtype=np.uint8, buffer=shm.buf, offset=i * slot_bytes)
+            for i in range(slots)]
+
+
+def _load_model(model_path, backend, model_factory):
+    if model_factory is not None:
+        return model_factory()
+    from utils.model_registry import get_model
+    return get_model(model_path, backend=backend)
+
+
+def _worker_main(worker_id, model_path, backend, model_factory, threads, in_name, out_name, slots,
+                 in_bytes, out_bytes, tasks, results):
+    """Worker process: load the model once, then serve frames from the shared-memory ring"""
+    # Must be set before torch / OpenMP initialise their thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+    from utils.detection import detect_ppe
+
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    inputs = _slot_views(in_shm, slots, in_bytes)
+    outputs = _slot_views(out_shm, slots, out_bytes)
+    try:
+        model = _load_model(model_path, backend, model_factory)
+    except Exception as e:
+        results.put(("error", worker_id, None, None, f"model load failed: {e}"))
+        del inputs, outputs
+        in_shm.close()
+        out_shm.close()
+        return
+    results.put(("ready", worker_id, None, None, None))
+
+    frame = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, slot, shape, conf, render, rgb = task
+            frame = inputs[slot][:int(np.prod(shape))].reshape(shape)
+            try:
+                annotated, missing, counts, workers = detect_ppe(model, frame, conf, return_workers=True,
+                                                                 rgb=rgb, render=render, raise_errors=True)
+            except Exception as e:
+                results.put(("failed", worker_id, request_id, slot, str(e)))
+                continue
+            out_shape = None
+            if render and annotated is not None and annotated.nbytes <= out_bytes:
+                out_shape = annotated.shape
+                np.copyto(outputs[slot][:annotated.nbytes].reshape(out_shape), annotated)
+            results.put(("result", worker_id, request_id, slot, (out_shape, missing, counts, workers)))
+    finally:
+        del inputs, outputs, frame
+        in_shm.close()
+        out_shm.close()
+
+
+class _Worker:
+    """Parent-side handle: process, ring buffers, free slots and in-flight requests"""
+
+    def __init__(self, worker_id, slots, in_bytes, out_bytes):
+        self.worker_id = worker_id
+        self.in_shm = shared_memory.SharedMemory(create=True, size=slots * in_bytes)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=slots * out_bytes)
+        self.inputs = _slot_views(self.in_shm, slots, in_bytes)
+        self.outputs = _slot_views(self.out_shm, slots, out_bytes)
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.pending = {}
+        self.process = None
+        self.tasks = None
+        self.ready = False
+        self.alive = True
+        self.completed = 0
+
+    def release(self):
+        del self.inputs, self.outputs
+        for shm in (self.in_shm, self.out_shm):
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class InferencePool:
+    """
+    detect_ppe on a pool of worker processes, one model copy each
+
+    Frames never get pickled: each worker owns a ring of shared-memory input
+    and output slots. `submit()` copies the frame into a free slot of the
+    chosen worker and sends only (slot, shape, options) through its task
+    queue; the worker writes the annotated frame back into the matching
+    output slot. A free slot is taken per in-flight frame, so a slow worker
+    applies backpressure instead of growing a queue.
+
+    Frames submitted with the same `key` (e.g. a stream id) always go to
+    the same worker, which keeps each camera's frames in order and its
+    working set on one core group; keys are spread so every worker gets a
+    similar number of streams. Frames without a key go to the least busy
+    worker.
+
+    Each worker pins torch / OpenMP / OpenCV to `threads_per_worker`
+    intra-op threads so workers x threads matches the core count instead of
+    every process spawning a thread per core.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, backend=None, workers=None, threads_per_worker=None,
+                 slots_per_worker=4, max_frame_shape=MAX_FRAME_SHAPE, model_factory=None):
+        """
+        Args:
+            model_path: Checkpoint each worker loads through get_model
+            backend: Inference backend name (default: PPE_BACKEND)
+            workers: Worker processes (default: one per two cores)
+            threads_per_worker: Intra-op threads per worker (default: cores / workers)
+            slots_per_worker: Frames in flight per worker
+            max_frame_shape: Largest (H, W, 3) frame a slot holds; bigger frames are downscaled
+            model_factory: Picklable zero-argument callable returning a model,
+                instead of loading `model_path`
+        """
+        self.model_path = model_path
+        self.backend = backend
+        self.num_workers = workers or default_workers()
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.slots_per_worker = slots_per_worker
+        self.max_frame_shape = tuple(max_frame_shape)
+        self.model_factory = model_factory
+        self._in_bytes = int(np.prod(self.max_frame_shape))
+        self._out_bytes = int(np.prod(OUTPUT_SHAPE))
+        self._ctx = mp.get_context("spawn")
+        self._results = None
+        self._workers = []
+        self._affinity = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._collector = None
+        self._stop_event = threading.Event()
+        self._closed = False
+        self.error = None
+
+    def start(self, timeout=120.0):
+        """Spawn the workers and wait until every model is loaded"""
+        self._results = self._ctx.Queue()
+        for worker_id in range(self.num_workers):
+            worker = _Worker(worker_id, self.slots_per_worker, self._in_bytes, self._out_bytes)
+            worker.tasks = self._ctx.Queue()
+            worker.process = self._ctx.Process(
+                target=_worker_main,
+                args=(worker_id, self.model_path, self.backend, self.model_factory, self.threads_per_worker,
+                      worker.in_shm.name, worker.out_shm.name, self.slots_per_worker, self._in_bytes,
+                      self._out_bytes, worker.tasks, self._results),
+                name=f"ppe-worker-{worker_id}",
+                daemon=True,
+            )
+            worker.process.start()
+            self._workers.append(worker)
+        self._collector = threading.Thread(target=self._collect, name="pool-results", daemon=True)
+        self._collector.start()
+        metrics.register_collector(f"pool-{id(self)}", self._metrics)
+        if not self._ready.wait(timeout):
+            self.close()
+            raise RuntimeError(f"Inference workers not ready after {timeout:.0f}s")
+        if self.error:
+            self.close()
+            raise RuntimeError(self.error)
+        return self
+
+    def _route(self, key):
+        live = [worker for worker in self._workers if worker.alive]
+        if not live:
+            raise RuntimeError("No live inference workers")
+        with self._lock:
+            if key is None:
+                return min(live, key=lambda w: len(w.pending))
+            worker = self._affinity.get(key)
+            if worker is None or not worker.alive:
+                load = {w.worker_id: 0 for w in live}
+                for assigned in self._affinity.values():
+                    if assigned.alive:
+                        load[assigned.worker_id] += 1
+                worker = min(live, key=lambda w: (load[w.worker_id], len(w.pending)))
+                self._affinity[key] = worker
+            return worker
+
+    def submit(self, frame, conf_threshold=0.5, key=None, render=True, return_workers=False, rgb=False,
+               timeout=None):
+        """
+        Queue one frame; blocks while the target worker has no free slot
+
+        Returns:
+            Future resolving to what detect_ppe would return for the same arguments
+        """
+        if self._closed:
+            raise RuntimeError("Inference pool is closed")
+        if frame is None or frame.size == 0:
+            future = Future()
+            future.set_result((frame, [], {}, []) if return_workers else (frame, [], {}))
+            return future
+
+        height, width = frame.shape[:2]
+        max_h, max_w = self.max_frame_shape[:2]
+        if height > max_h or width > max_w:
+            scale = min(max_h / height, max_w / width)
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+        worker = self._route(key)
+        try:
+            slot = worker.free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free slot on worker {worker.worker_id}") from None
+        np.copyto(worker.inputs[slot][:frame.nbytes].reshape(frame.shape), frame)
+
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            worker.pending[request_id] = (future, slot, return_workers)
+        worker.tasks.put((request_id, slot, frame.shape, conf_threshold, render, rgb))
+        return future
+
+    def detect(self, frame, conf_threshold=0.5, key=None, render=True, return_workers=False, rgb=False):
+        """Blocking detect_ppe through the pool"""
+        return self.submit(frame, conf_threshold, key, render, return_workers, rgb).result()
+
+    def map(self, frames, conf_threshold=0.5, key=None, render=True):
+        """
+        Detect an iterable of frames across the pool, yielding results in input order
+
+        Keeps every slot busy: up to workers x slots frames are in flight.
+        With a `key` all frames go to one worker; leave it None to spread them.
+        """
+        in_flight = []
+        limit = self.num_workers * self.slots_per_worker
+        for frame in frames:
+            in_flight.append(self.submit(frame, conf_threshold, key, render))
+            if len(in_flight) >= limit:
+                yield in_flight.pop(0).result()
+        for future in in_flight:
+            yield future.result()
+
+    def _collect(self):
+        """Resolve futures from worker messages; copy annotated frames out before freeing slots"""
+        waiting = set(range(self.num_workers))
+        while not self._stop_event.is_set():
+            try:
+                kind, worker_id, request_id, slot, payload = self._results.get(timeout=0.5)
+            except queue.Empty:
+                self._check_workers(waiting)
+                continue
+            except (EOFError, OSError):
+                break
+            worker = self._workers[worker_id]
+
+            if kind in ("ready", "error"):
+                if kind == "error":
+                    self.error = f"Worker {worker_id}: {payload}"
+                    worker.alive = False
+                else:
+                    worker.ready = True
+                waiting.discard(worker_id)
+                if not waiting or self.error:
+                    self._ready.set()
+                continue
+
+            with self._lock:
+                future, _, return_workers = worker.pending.pop(request_id, (None, slot, False))
+            if kind == "failed":
+                worker.free.put(slot)
+                if future is not None:
+                    future.set_exception(RuntimeError(payload))
+                continue
+
+            out_shape, missing, counts, workers = payload
+            annotated = worker.outputs[slot][:int(np.prod(out_shape))].reshape(out_shape).copy() \
+                if out_shape is not None else None
+            worker.free.put(slot)
+            worker.completed += 1
+            metrics.tick("ppe_pool_inference", worker=worker_id)
+            if future is not None:
+                output = (annotated, missing, counts, workers)
+                future.set_result(output if return_workers else output[:3])
+
+    def _check_workers(self, waiting):
+        """Fail the in-flight requests of workers that died"""
+        for worker in self._workers:
+            if worker.alive and worker.process is not None and not worker.process.is_alive():
+                worker.alive = False
+                with self._lock:
+                    pending, worker.pending = worker.pending, {}
+                for future, slot, _ in pending.values():
+                    future.set_exception(RuntimeError(f"Inference worker {worker.worker_id} exited"))
+                    worker.free.put(slot)
+                if worker.worker_id in waiting:
+                    self.error = f"Worker {worker.worker_id} exited during startup"
+                    self._ready.set()
+
+    def stats(self):
+        return {
+            'workers': self.num_workers,
+            'threads_per_worker': self.threads_per_worker,
+            'alive': sum(worker.alive for worker in self._workers),
+            'in_flight': sum(len(worker.pending) for worker in self._workers),
+            'completed': [worker.completed for worker in self._workers],
+            'streams': {key: worker.worker_id for key, worker in self._affinity.items()},
+        }
+
+    def _metrics(self):
+        samples = []
+        for worker in self._workers:
+            labels = {'worker': worker.worker_id}
+            samples += [
+                ("ppe_pool_in_flight", labels, len(worker.pending)),
+                ("ppe_pool_completed_total", labels, worker.completed),
+                ("ppe_pool_worker_up", labels, int(worker.alive)),
+            ]
+        return samples
+
+    def close(self, timeout=5.0):
+        """Stop the workers and free the shared memory"""
+        if self._closed:
+            return
+        self._closed = True
+        metrics.unregister_collector(f"pool-{id(self)}")
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.tasks.put(None)
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(timeout)
+        # The collector may still be copying out of output slots
+        self._stop_event.set()
+        if self._collector is not None:
+            self._collector.join(timeout)
+        for worker in self._workers:
+            for future, slot, _ in worker.pending.values():
+                future.set_exception(RuntimeError("Inference pool closed"))
+            worker.pending.clear()
+            worker.release()
+
+    def __enter__(self):
+        return self.start() if not self._workers else self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# (model path, backend, workers) -> pool
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(model_path=DEFAULT_MODEL_PATH, backend=None, workers=None):
+    """
+    Process-wide pool for this checkpoint / backend / worker count, started on first use
+
+    Pools are shared by every caller (e.g. all Streamlit sessions) asking for
+    the same configuration. Asking for another configuration starts another
+    pool rather than closing one that other callers may still be using;
+    every pool is stopped at exit by close_pools().
+    """
+    key = (model_path, backend, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = InferencePool(model_path, backend, workers).start()
+    return pool
+
+
+@atexit.register
+def close_pools():
+    """Stop every pool started by get_pool()"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,355 @@
+import json
+
+import cv2
+import numpy as np
+
+from utils import metrics
+from utils.detection import (
+    INPUT_SIZE,
+    REQUIRED_PPE,
+    draw_detections,
+    extract_detections,
+    summarize_detections,
+)
+from utils.preprocess import Letterboxer, to_source_boxes
+
+DEFAULT_TILE_OVERLAP = 0.2
+# Cross-tile duplicates are matched on intersection over the smaller box, so a
+# box cut off at a tile edge still matches the full box from the next tile
+MERGE_THRESHOLD = 0.5
+ZONE_COLOR = (0, 200, 255)
+
+
+class Zone:
+    """
+    Named polygon region of interest
+
+    Points are (x, y) pixels, or fractions of the frame size when every
+    coordinate is within [0, 1], so one config works at any resolution.
+    """
+
+    def __init__(self, name, polygon):
+        self.name = name
+        self.polygon = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            raise ValueError(f"Zone {name!r} needs at least 3 points")
+        self.normalized = bool(self.polygon.max() <= 1.0)
+
+    def points(self, height, width):
+        """Polygon in pixel coordinates for a frame of this size"""
+        if self.normalized:
+            return self.polygon * np.array([width, height], dtype=np.float32)
+        return self.polygon
+
+    def bounds(self, height, width):
+        """Integer (x0, y0, x1, y1) bounding rectangle clipped to the frame"""
+        points = self.points(height, width)
+        x0, y0 = np.floor(points.min(axis=0)).astype(int)
+        x1, y1 = np.ceil(points.max(axis=0)).astype(int)
+        return max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+
+    def __repr__(self):
+        return f"<Zone {self.name} ({len(self.polygon)} points)>"
+
+
+def load_zones(path):
+    """
+    Read per-camera zones from JSON
+
+    Format: {"cam0": [{"name": "loading-bay", "polygon": [[x, y], ...]}, ...], ...}
+    keyed by stream id or source string; "default" applies to any other camera.
+
+    Returns:
+        dict: camera key -> list of Zone
+    """
+    with open(path) as f:
+        config = json.load(f)
+    return {
+        camera: [Zone(zone['name'], zone['polygon']) for zone in zones]
+        for camera, zones in config.items()
+    }
+
+
+def zones_for(config, *keys):
+    """First zone list in `config` matching one of `keys`, else "default", else []"""
+    for key in keys:
+        if key is not None and str(key) in config:
+            return config[str(key)]
+    return config.get("default", [])
+
+
+def points_in_polygon(points, polygon):
+    """
+    Even-odd ray casting for many points at once
+
+    Args:
+        points: (N, 2) x, y
+        polygon: (E, 2) vertices
+
+    Returns:
+        np.ndarray: (N,) bool
+    """
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x0, y0 = polygon[:, 0], polygon[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    crosses = (y0 > y) != (y1 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
+
+
+def tile_grid(x0, y0, x1, y1, tile_size=INPUT_SIZE, overlap=DEFAULT_TILE_OVERLAP):
+    """
+    Overlapping tile rectangles covering a region; edge tiles are shifted inwards
+    so every tile is full size when the region allows it
+
+    Returns:
+        list: (x0, y0, x1, y1) per tile
+    """
+    step = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(low, high):
+        if high - low <= tile_size:
+            return [low]
+        positions = list(range(low, high - tile_size, step))
+        positions.append(high - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, x1), min(y + tile_size, y1))
+        for y in starts(y0, y1)
+        for x in starts(x0, x1)
+    ]
+
+
+def merge_detections(boxes, scores, labels, threshold=MERGE_THRESHOLD, sources=None):
+    """
+    Class-aware cross-tile merging without Python loops over boxes
+
+    Fast-NMS formulation: with boxes sorted by score, a box is suppressed
+    when any higher scoring box of the same class overlaps it by more than
+    `threshold` (intersection over the smaller box), all from one (N, N)
+    matrix instead of a sequential greedy pass. Each suppressed box is then
+    merged into the best kept box that covers it (union of the two), so a
+    person cut in half at a tile edge still ends up with one full-size box.
+
+    Args:
+        sources: Optional (N,) region / tile index per box. Boxes from the
+            same source are never merged - the model's own NMS already
+            handled them, and two workers standing one behind the other
+            must stay two workers.
+
+    Returns:
+        tuple: (boxes, scores, labels) of the merged detections
+    """
+    if len(boxes) == 0:
+        return boxes, scores, list(labels)
+    order = np.argsort(-scores, kind='stable')
+    boxes, scores = boxes[order].copy(), scores[order]
+    labels = [labels[i] for i in order]
+    classes = np.unique(np.asarray(labels, dtype=object), return_inverse=True)[1]
+    if sources is not None:
+        sources = np.asarray(sources)[order]
+
+    x0 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y0 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x1 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y1 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    overlap = inter / np.maximum(np.minimum(area[:, None], area[None, :]), 1e-6)
+    overlap[classes[:, None] != classes[None, :]] = 0.0
+    if sources is not None:
+        overlap[sources[:, None] == sources[None, :]] = 0.0
+    # Only higher scoring boxes (upper triangle) can suppress
+    matches = np.triu(overlap, k=1) > threshold
+    keep = ~matches.any(axis=0)
+
+    # Highest scoring kept box that matches each suppressed one
+    owned = matches & keep[:, None]
+    merged = ~keep & owned.any(axis=0)
+    owner = owned.argmax(axis=0)[merged]
+    np.minimum.at(boxes[:, 0], owner, boxes[merged, 0])
+    np.minimum.at(boxes[:, 1], owner, boxes[merged, 1])
+    np.maximum.at(boxes[:, 2], owner, boxes[merged, 2])
+    np.maximum.at(boxes[:, 3], owner, boxes[merged, 3])
+    return boxes[keep], scores[keep], [label for label, flag in zip(labels, keep) if flag]
+
+
+class ZoneDetector:
+    """
+    PPE detection restricted to polygon zones, optionally tiled
+
+    Each zone's bounding rectangle is cropped out (the rest of the frame is
+    never inferred). With `tiled=True`, crops larger than one model input
+    are cut into overlapping `tile_size` tiles so small items like gloves and
+    boots keep their native resolution, and a downscaled view of each crop is
+    added for objects larger than a tile. All crops and tiles of a frame go
+    through one batched forward pass; detections are mapped back to frame
+    coordinates and de-duplicated with merge_detections.
+
+    A zone's missing items are the union over the workers whose feet
+    (bottom centre of the person box) are inside its polygon, so with people
+    elsewhere in the frame an empty zone has nothing missing. Without any
+    person detections, summarize_detections' frame-level rule is applied to
+    the items whose box centre is inside the zone. Item counts go by centre.
+    `process()` returns the same shape as detect_ppe, and the per-zone
+    breakdown of the last frame is kept in `last_zones`.
+
+    With no zones the whole frame is one region, which gives plain tiled
+    inference for high resolution cameras. `conf_threshold` and `input_size`
+    (the letterbox edge per crop / tile) may be changed between frames, e.g.
+    by a QualityController; there is no tracking between detections.
+    """
+
+    def __init__(self, model, zones=None, tiled=False, tile_size=INPUT_SIZE, overlap=DEFAULT_TILE_OVERLAP,
+                 conf_threshold=0.5, batch_size=8, render=True, merge_threshold=MERGE_THRESHOLD,
+                 input_size=INPUT_SIZE):
+        self.model = model
+        self.zones = list(zones or [])
+        self.tiled = tiled
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.conf_threshold = conf_threshold
+        self.batch_size = batch_size
+        self.render = render
+        self.merge_threshold = merge_threshold
+        self.input_size = input_size
+        self.last_zones = {}
+        self._letterboxer = Letterboxer(input_size)
+        self.frames = 0
+        self.inputs = 0
+
+    def regions(self, height, width):
+        """(x0, y0, x1, y1) rectangles to infer for a frame of this size"""
+        rects = [zone.bounds(height, width) for zone in self.zones] or [(0, 0, width, height)]
+        regions = []
+        for x0, y0, x1, y1 in rects:
+            if x1 <= x0 or y1 <= y0:
+                continue
+            regions.append((x0, y0, x1, y1))
+            if self.tiled and max(x1 - x0, y1 - y0) > self.tile_size:
+                regions.extend(tile_grid(x0, y0, x1, y1, self.tile_size, self.overlap))
+        return regions
+
+    def _infer(self, frame, regions):
+        """
+        One batched pass over all regions
+
+        Returns:
+            tuple: (boxes in frame coordinates, scores, labels, region index per box)
+        """
+        if self._letterboxer.size != self.input_size:
+            self._letterboxer = Letterboxer(self.input_size)
+        letterboxer = self._letterboxer
+        all_boxes, all_scores, all_labels, all_sources = [], [], [], []
+        for start in range(0, len(regions), self.batch_size):
+            chunk = regions[start:start + self.batch_size]
+            buffers, metas = [], []
+            with metrics.stage_timer("preprocess"):
+                for slot, (x0, y0, x1, y1) in enumerate(chunk):
+                    buffer, meta = letterboxer(frame[y0:y1, x0:x1], square=True, slot=slot)
+                    buffers.append(buffer)
+                    metas.append(meta)
+            with metrics.stage_timer("inference"):
+                results = self.model.predict(buffers, conf=self.conf_threshold, imgsz=self.input_size, verbose=False)
+            with metrics.stage_timer("postprocess"):
+                for index, ((x0, y0, _, _), meta, result) in enumerate(zip(chunk, metas, results), start):
+                    if result is None or len(result) == 0:
+                        continue
+                    boxes, scores, labels = extract_detections(self.model, result)
+                    boxes = to_source_boxes(boxes, meta)
+                    boxes[:, [0, 2]] += x0
+                    boxes[:, [1, 3]] += y0
+                    all_boxes.append(boxes)
+                    all_scores.append(scores)
+                    all_labels.extend(labels)
+                    all_sources.append(np.full(len(labels), index, dtype=np.int64))
+        self.inputs += len(regions)
+        if not all_boxes:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), [], np.zeros(0, np.int64)
+        return np.concatenate(all_boxes), np.concatenate(all_scores), all_labels, np.concatenate(all_sources)
+
+    def _zone_summary(self, zone, height, width, boxes, labels, workers):
+        polygon = zone.points(height, width)
+        members = []
+        if workers:
+            feet = np.array([[(w['box'][0] + w['box'][2]) / 2, w['box'][3]] for w in workers], dtype=np.float32)
+            # A person cut off at the frame edge still stands inside a zone drawn up to that edge
+            feet = np.clip(feet, 0, [width - 1, height - 1])
+            inside = points_in_polygon(feet, polygon)
+            members = [worker for worker, flag in zip(workers, inside) if flag]
+        centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+        inside = points_in_polygon(centers, polygon)
+        counts = {}
+        for label, flag in zip(labels, inside):
+            if flag:
+                counts[label] = counts.get(label, 0) + 1
+        if workers:
+            missing_any = {item for worker in members for item in worker['missing']}
+            missing = [item for item in REQUIRED_PPE if item in missing_any]
+        else:
+            missing = [item for item in REQUIRED_PPE if item not in counts]
+        return {'missing': missing, 'counts': counts, 'workers': members}
+
+    def process(self, frame, return_workers=False):
+        """
+        Detect PPE inside the zones of one BGR frame
+
+        Returns:
+            tuple: (annotated_frame, missing_items, detected_counts), plus
+            workers when return_workers is True - like detect_ppe. Boxes and
+            the annotated frame are at detect_ppe's display size.
+        """
+        if frame is None or frame.size == 0:
+            return (frame, [], {}, []) if return_workers else (frame, [], {})
+        self.frames += 1
+        height, width = frame.shape[:2]
+        regions = self.regions(height, width)
+        boxes, scores, labels, sources = self._infer(frame, regions)
+        if len(regions) > 1:
+            # Only duplicates seen by different regions / tiles need merging
+            boxes, scores, labels = merge_detections(boxes, scores, labels, self.merge_threshold, sources)
+        missing, counts, workers = summarize_detections(boxes, labels)
+
+        if self.zones:
+            self.last_zones = {
+                zone.name: self._zone_summary(zone, height, width, boxes, labels, workers)
+                for zone in self.zones
+            }
+            missing_any = {item for zone in self.last_zones.values() for item in zone['missing']}
+            missing = [item for item in REQUIRED_PPE if item in missing_any]
+            # A worker inside overlapping zones is still one worker
+            members = {id(worker) for zone in self.last_zones.values() for worker in zone['workers']}
+            workers = [worker for worker in workers if id(worker) in members]
+            counts = {}
+            for zone in self.last_zones.values():
+                for label, count in zone['counts'].items():
+                    counts[label] = counts.get(label, 0) + count
+
+        # Same display size as detect_ppe; boxes and workers are scaled to it
+        scale = min(INPUT_SIZE / height, INPUT_SIZE / width)
+        display = [{**worker, 'box': [v * scale for v in worker['box']]} for worker in workers]
+        annotated = None
+        if self.render:
+            with metrics.stage_timer("render"):
+                size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+                # Preview only; linear is several times cheaper than area averaging at 4K
+                annotated = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+                for zone in self.zones:
+                    points = np.round(zone.points(height, width) * scale).astype(np.int32)
+                    cv2.polylines(annotated, [points], True, ZONE_COLOR, 2)
+                draw_detections(annotated, boxes * scale, labels, scores, workers=display, names=self.model.names)
+        output = (annotated, missing, counts, display)
+        return output if return_workers else output[:3]
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'inputs_per_frame': self.inputs / self.frames if self.frames else 0.0,
+            'zones': [zone.name for zone in self.zones],
+            'tiled': self.tiled,
+        }
+